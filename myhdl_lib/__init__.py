@@ -1,22 +1,30 @@
 __version__ = "0.1.0"
 
-from myhdl_lib.mem import rom, ram_sp_rf, ram_sp_wf, ram_sp_ar,ram_sdp_rf, ram_sdp_wf, ram_sdp_ar, ram_dp_rf, ram_dp_wf, ram_dp_ar
+from myhdl_lib.mem import rom, ram_sp_rf, ram_sp_wf, ram_sp_ar,ram_sdp_rf, ram_sdp_wf, ram_sdp_ar, ram_dp_rf, ram_dp_wf, ram_dp_ar, ram_mp
+from myhdl_lib.mem_image import mem_image
 from myhdl_lib.fifo import fifo
 from myhdl_lib.fifo_speculative import fifo_speculative
+from myhdl_lib.fifo_multi import fifo_multi
+from myhdl_lib.fifo_asym import fifo_asym
+from myhdl_lib.fifo_packet import fifo_packet
 from myhdl_lib.mux import mux, demux, ls_mux, ls_demux, bitslice_select, byteslice_select
-from myhdl_lib.handshake import hs_join, hs_fork, hs_mux, hs_demux, hs_arbmux, hs_arbdemux
-from myhdl_lib.arbiter import arbiter, arbiter_priority, arbiter_roundrobin
+from myhdl_lib.handshake import hs_join, hs_fork, hs_fork_eager, hs_mux, hs_demux, hs_arbmux, hs_arbdemux, hs_register
+from myhdl_lib.arbiter import arbiter, arbiter_priority, arbiter_roundrobin, arbiter_roundrobin_pp, arbiter_matrix, arbiter_weighted_rr, arbiter_deficit_rr, arbiter_multi
 from myhdl_lib.pipeline_control import pipeline_control
 from myhdl_lib.utils import assign, byteorder
 from myhdl_lib.stream import bytecount, checksum
 
 __all__ = [
-           "rom", "ram_sp_rf", "ram_sp_wf", "ram_sp_ar", "ram_sdp_rf", "ram_sdp_wf", "ram_sdp_ar", "ram_dp_rf", "ram_dp_wf", "ram_dp_ar",
+           "rom", "ram_sp_rf", "ram_sp_wf", "ram_sp_ar", "ram_sdp_rf", "ram_sdp_wf", "ram_sdp_ar", "ram_dp_rf", "ram_dp_wf", "ram_dp_ar", "ram_mp",
+           "mem_image",
            "fifo",
            "fifo_speculative",
+           "fifo_multi",
+           "fifo_asym",
+           "fifo_packet",
            "mux", "demux", "ls_mux", "ls_demux", "bitslice_select", "byteslice_select",
-           "hs_join", "hs_fork", "hs_mux", "hs_demux", "hs_arbmux", "hs_arbdemux",
-           "arbiter", "arbiter_priority", "arbiter_roundrobin",
+           "hs_join", "hs_fork", "hs_fork_eager", "hs_mux", "hs_demux", "hs_arbmux", "hs_arbdemux", "hs_register",
+           "arbiter", "arbiter_priority", "arbiter_roundrobin", "arbiter_roundrobin_pp", "arbiter_matrix", "arbiter_weighted_rr", "arbiter_deficit_rr", "arbiter_multi",
            "pipeline_control",
            "assign", "byteorder",
            "bytecount", "checksum"
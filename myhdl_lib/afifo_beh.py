@@ -0,0 +1,99 @@
+from collections import deque
+
+
+class afifo_beh:
+    ''' Asynchronous FIFO: behavioral model of fifo_async
+
+        The model is driven by clock edges: call wclk_edge at each write clock rising edge, rclk_edge at each read clock
+        rising edge, and edge when both edges occur at the same time. The inputs passed with an edge are the values
+        sampled at that edge. After the call the model state equals the state of the RTL outputs after the edge,
+        including the clock domain synchronization latency of the full and empty flags.
+
+        The pointers are kept in binary, modulo 2*depth, as the Gray-coded pointers of the RTL. The data are kept in a
+        preallocated ring buffer, the synchronizers in deques; all operations are O(1).
+
+        sync_stages - number of synchronizer registers, as fifo_async; default SYNC_STAGES
+        afull_th, aempty_th - almost full/empty thresholds, as wafull_th/raempty_th of fifo_async; default depth/2
+    '''
+
+    SYNC_STAGES = 2
+
+    def __init__(self, depth, sync_stages=None, afull_th=None, aempty_th=None):
+        self.depth = depth
+        if sync_stages != None:
+            self.SYNC_STAGES = sync_stages
+        self.afull_th = afull_th if afull_th != None else depth//2
+        self.aempty_th = aempty_th if aempty_th != None else depth//2
+        self.buf = depth*[None]
+        self.wreset()
+        self.rreset()
+
+    def wreset(self):
+        ''' Write side reset '''
+        self.wr_ptr = 0
+        self.full = False
+        self.afull = False
+        self.rd_ptr_sync = deque(self.SYNC_STAGES*[0]) # Read pointer synchronized to the write clock, [sync1, sync2,...]
+
+    def rreset(self):
+        ''' Read side reset '''
+        self.rd_ptr = 0
+        self.empty = True
+        self.aempty = True
+        self.wr_ptr_sync = deque(self.SYNC_STAGES*[0]) # Write pointer synchronized to the read clock, [sync1, sync2,...]
+
+    def isFull(self):
+        return self.full
+
+    def isEmpty(self):
+        return self.empty
+
+    def isAFull(self):
+        return self.afull
+
+    def isAEmpty(self):
+        return self.aempty
+
+    def getWCount(self):
+        ''' Count seen from the write side '''
+        return (self.wr_ptr - self.rd_ptr_sync[-1]) % (2*self.depth)
+
+    def getRCount(self):
+        ''' Count seen from the read side '''
+        return (self.wr_ptr_sync[-1] - self.rd_ptr) % (2*self.depth)
+
+    def getDout(self):
+        return self.buf[self.rd_ptr % self.depth]
+
+    def edge(self, wclk=False, rclk=False, we=False, wdata=None, re=False):
+        ''' Models simultaneous rising edges of the write and the read clocks; both sides sample pre-edge state '''
+        wr_ptr, rd_ptr = self.wr_ptr, self.rd_ptr
+
+        if wclk:
+            we_safe = we and not self.full
+            wr_ptr_new = (wr_ptr + 1) % (2*self.depth) if we_safe else wr_ptr
+            if we_safe:
+                self.buf[wr_ptr % self.depth] = wdata
+            self.full = ((wr_ptr_new - self.rd_ptr_sync[-1]) % (2*self.depth) == self.depth)
+            self.afull = ((wr_ptr_new - self.rd_ptr_sync[-1]) % (2*self.depth) >= self.depth - self.afull_th)
+            self.rd_ptr_sync.pop()
+            self.rd_ptr_sync.appendleft(rd_ptr)
+            self.wr_ptr = wr_ptr_new
+
+        if rclk:
+            re_safe = re and not self.empty
+            rd_ptr_new = (rd_ptr + 1) % (2*self.depth) if re_safe else rd_ptr
+            self.empty = (rd_ptr_new == self.wr_ptr_sync[-1])
+            self.aempty = ((self.wr_ptr_sync[-1] - rd_ptr_new) % (2*self.depth) <= self.aempty_th)
+            self.wr_ptr_sync.pop()
+            self.wr_ptr_sync.appendleft(wr_ptr)
+            self.rd_ptr = rd_ptr_new
+
+    def wclk_edge(self, we=False, wdata=None):
+        self.edge(wclk=True, we=we, wdata=wdata)
+
+    def rclk_edge(self, re=False):
+        self.edge(rclk=True, re=re)
+
+    def status(self):
+        return "WFULL = {:}, REMPTY = {:}, RDATA = {:}".format(int(self.isFull()), int(self.isEmpty()), self.getDout() if not self.empty else None)
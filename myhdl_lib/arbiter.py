@@ -1,42 +1,122 @@
 from myhdl import *
 from myhdl_lib.utils import assign
+from myhdl_lib.mux import mux
+from myhdl_lib.mem import rom
+from myhdl_lib import behavioral
 
 
-def arbiter(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None, ARBITER_TYPE="priority"):
-    ''' Wrapper that provides common interface to all arbiters '''
+def arbiter(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None, ARBITER_TYPE="priority", REGISTERED=False, weights=None, quantums=None, pkt_len=None):
+    ''' Wrapper that provides common interface to all arbiters
+            ARBITER_TYPE - "priority", "roundrobin", "roundrobin_pp", "matrix", "weighted_rr" or "deficit_rr", see
+                           arbiter_priority, arbiter_roundrobin, arbiter_roundrobin_pp, arbiter_matrix,
+                           arbiter_weighted_rr and arbiter_deficit_rr
+            REGISTERED   - "roundrobin_pp" only, see arbiter_roundrobin_pp
+            weights      - "weighted_rr" only, see arbiter_weighted_rr
+            quantums, pkt_len - "deficit_rr" only, see arbiter_deficit_rr
+    '''
+    assert (not REGISTERED) or (ARBITER_TYPE == "roundrobin_pp"), "Arbiter: REGISTERED is supported by the roundrobin_pp arbiter only"
+    assert (weights == None) or (ARBITER_TYPE == "weighted_rr"), "Arbiter: weights are supported by the weighted_rr arbiter only"
+    assert (quantums == None and pkt_len == None) or (ARBITER_TYPE == "deficit_rr"), "Arbiter: quantums and pkt_len are supported by the deficit_rr arbiter only"
     if ARBITER_TYPE == "priority":
         _arb = arbiter_priority(req_vec, gnt_vec, gnt_idx, gnt_vld)
     elif (ARBITER_TYPE == "roundrobin"):
         _arb = arbiter_roundrobin(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy)
+    elif (ARBITER_TYPE == "roundrobin_pp"):
+        _arb = arbiter_roundrobin_pp(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, REGISTERED)
+    elif (ARBITER_TYPE == "matrix"):
+        _arb = arbiter_matrix(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy)
+    elif (ARBITER_TYPE == "weighted_rr"):
+        _arb = arbiter_weighted_rr(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, weights)
+    elif (ARBITER_TYPE == "deficit_rr"):
+        _arb = arbiter_deficit_rr(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, quantums, pkt_len)
     else:
-        assert "Arbiter: Unknown arbiter type: {}".format(ARBITER_TYPE)
+        assert False, "Arbiter: Unknown arbiter type: {}".format(ARBITER_TYPE)
 
     return _arb
 
 
+def _prio_tree(req, vld, idx, LO=0, N=None):
+    ''' Priority encoder tree over req[LO+N:LO], N a power of 2: vld - there is a request, idx - index of the lowest
+        request relative to LO, 0 if no request. Each node selects the low or the high half with a 2:1 mux, log2(N)
+        levels. The bits above len(req) are not implemented, so idx is always < len(req) - LO
+    '''
+    REQ_NUM = len(req)
+    if (N == None):
+        N = 1
+        while N < REQ_NUM:
+            N *= 2
+
+    H = N//2
+    if (N > 1) and (LO + H >= REQ_NUM):
+        # The high half is above len(req)
+        return _prio_tree(req, vld, idx, LO, H)
+
+    if (N == 1):
+        @always_comb
+        def prio_leaf():
+            vld.next = req[LO]
+            idx.next = 0
+        return prio_leaf
+
+    if (N == 2):
+        @always_comb
+        def prio_leaf():
+            vld.next = req[LO] or req[LO+1]
+            idx.next = req[LO+1] and not req[LO]
+        return prio_leaf
+
+    LW = len(intbv(0, min=0, max=H))
+    vld_lo = Signal(bool(0))
+    vld_hi = Signal(bool(0))
+    idx_lo = Signal(intbv(0)[LW:])
+    idx_hi = Signal(intbv(0)[LW:])
+
+    tree_lo = _prio_tree(req, vld_lo, idx_lo, LO, H)
+    tree_hi = _prio_tree(req, vld_hi, idx_hi, LO+H, H)
+
+    @always_comb
+    def prio_node():
+        vld.next = vld_lo or vld_hi
+        if (vld_lo):
+            idx.next = idx_lo
+        elif (vld_hi):
+            idx.next = concat(intbv(1)[1:], idx_hi)
+        else:
+            idx.next = 0
+
+    return instances()
+
+
 def arbiter_priority(req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None):
     """ Static priority arbiter: grants the request with highest priority, which is the lower index
             req_vec - (i) vector of request signals, req_vec[0] is with the highest priority
             gnt_vec - (o) optional, vector of grants, one grant per request, only one grant can be active at at time
             gnt_idx - (o) optional, grant index, index of the granted request
             gnt_vld - (o) optional, grant valid, indicate that there is a granted request
+
+        The grant index is found by a tree of 2:1 muxes, see _prio_tree, with logic depth O(log(len(req_vec))), and is
+        decoded to gnt_vec. The behavioral model finds the lowest request with integer bit operations.
     """
+    if behavioral.is_enabled():
+        return behavioral.arbiter_priority(req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld)
+
     REQ_NUM = len(req_vec)
     gnt_vec_s = Signal(intbv(0)[REQ_NUM:])
     gnt_idx_s = Signal(intbv(0, min=0, max=REQ_NUM))
     gnt_vld_s = Signal(bool(0))
 
+    tree_vld = Signal(bool(0))
+    tree_idx = Signal(intbv(0)[max(1, len(gnt_idx_s)):])
+
+    priority_encoder = _prio_tree(req_vec, tree_vld, tree_idx)
+
     @always_comb
-    def prioroty_encoder():
+    def gnt_comb():
+        gnt_vld_s.next = tree_vld
+        gnt_idx_s.next = tree_idx
         gnt_vec_s.next = 0
-        gnt_idx_s.next = 0
-        gnt_vld_s.next = 0
-        for i in range(REQ_NUM):
-            if ( req_vec[i]==1 ):
-                gnt_vec_s.next[i] = 1
-                gnt_idx_s.next = i
-                gnt_vld_s.next = 1
-                break
+        if (tree_vld):
+            gnt_vec_s.next[tree_idx] = 1
 
     if gnt_vec!=None: _vec = assign(gnt_vec, gnt_vec_s)
     if gnt_idx!=None: _idx = assign(gnt_idx, gnt_idx_s)
@@ -57,6 +137,9 @@ def arbiter_roundrobin(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=No
                           req_vec[gnt_idx+1] gets the highest priority.
                           gnt_rdy should be activated in the same clock cycle when output the grant is used
     """
+    if behavioral.is_enabled():
+        return behavioral.arbiter_roundrobin(rst, clk, req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy)
+
     REQ_NUM = len(req_vec)
     ptr = Signal(intbv(0, min=0, max=REQ_NUM))
 
@@ -97,5 +180,550 @@ def arbiter_roundrobin(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=No
     return instances()
 
 
+def _onehot2bin(vec, idx):
+    ''' One-hot to binary encoder, a tree of OR gates per bit of idx '''
+    N = len(vec)
+    IW = len(idx)
+
+    @always_comb
+    def onehot2bin():
+        x = intbv(0)[IW:]
+        for b in range(IW):
+            v = bool(0)
+            for i in range(N):
+                if ((i >> b) & 1) == 1:
+                    v = v | vec[i]
+            x[b] = v
+        idx.next = x
+
+    return onehot2bin
+
+
+def arbiter_roundrobin_pp(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None, REGISTERED=False):
+    """ Round Robin arbiter with parallel prefix logic: the interface and the arbitration of arbiter_roundrobin, with
+        logic depth O(log(len(req_vec))) instead of O(len(req_vec))
+            req_vec - (i) vector of request signals, priority changes dynamically
+            gnt_vec - (o) optional, vector of grants, one grant per request, only one grant can be active at at time
+            gnt_idx - (o) optional, grant index, index of the granted request
+            gnt_vld - (o) optional, grant valid, indicate that there is a granted request
+            gnt_rdy - (i) grant ready, as arbiter_roundrobin
+            REGISTERED - False (default): the grant is combinatorial from req_vec, as arbiter_roundrobin
+                         True: the grant is registered, i.e. granted in the clock cycle after the request, and the
+                         request path has no logic after the registers. When the grant is consumed (gnt_rdy and
+                         gnt_vld), its request is excluded from the next grant, as it is still active in the clock
+                         cycle of the consumption
+
+        The requests above the last granted are masked with a thermometer mask. A parallel prefix OR (Kogge-Stone) over
+        the vector {req_vec, req_vec & mask} finds its lowest request, i.e. the first masked request or, if none, the
+        first request. The grant index is encoded from the one-hot grant with trees of OR gates. The prefix and the
+        grant are computed in one process, so the grant is one-hot in every delta cycle of the simulation.
+    """
+    if behavioral.is_enabled() and not REGISTERED:
+        return behavioral.arbiter_roundrobin(rst, clk, req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy)
+
+    REQ_NUM = len(req_vec)
+    gnt_rdy = gnt_rdy if (gnt_rdy != None) else Signal(bool(0))
+
+    # Thermometer mask: mask[i] = (i > index of the last consumed grant)
+    mask = Signal(intbv(0)[REQ_NUM:])
+    mask_eff = Signal(intbv(0)[REQ_NUM:])
+    req_eff = Signal(intbv(0)[REQ_NUM:])
+    req_msk = Signal(intbv(0)[REQ_NUM:])
+
+    # Double vector and the levels of its parallel prefix OR
+    req_dbl = Signal(intbv(0)[2*REQ_NUM:])
+    LEVELS = 0
+    while 2**LEVELS < 2*REQ_NUM:
+        LEVELS += 1
+
+    gnt_vec_c = Signal(intbv(0)[REQ_NUM:])
+    gnt_idx_c = Signal(intbv(0, min=0, max=REQ_NUM))
+    gnt_vld_c = Signal(bool(0))
+
+    if REGISTERED:
+        gnt_vec_s = Signal(intbv(0)[REQ_NUM:])
+        gnt_idx_s = Signal(intbv(0, min=0, max=REQ_NUM))
+        gnt_vld_s = Signal(bool(0))
+    else:
+        gnt_vec_s = gnt_vec_c
+        gnt_idx_s = gnt_idx_c
+        gnt_vld_s = gnt_vld_c
+
+    # The mask of the next grant: updated with the consumed grant, if registered
+    mask_new = Signal(intbv(0)[REQ_NUM:])
+
+    @always_comb
+    def mask_comb():
+        for i in range(REQ_NUM):
+            mask_new.next[i] = (i > gnt_idx_s)
+
+    if REGISTERED:
+        @always_comb
+        def req_comb():
+            if (gnt_rdy and gnt_vld_s):
+                mask_eff.next = mask_new
+                req_eff.next = req_vec & ~gnt_vec_s
+            else:
+                mask_eff.next = mask
+                req_eff.next = req_vec
+    else:
+        @always_comb
+        def req_comb():
+            mask_eff.next = mask
+            req_eff.next = req_vec
+
+    @always_comb
+    def msk_comb():
+        req_msk.next = req_eff & mask_eff
+
+    @always_comb
+    def dbl_comb():
+        req_dbl.next = concat(req_eff, req_msk)
+
+    @always_comb
+    def gnt_comb():
+        # Parallel prefix OR, pre[i] = req_dbl[0] or ... req_dbl[i]; each level goes downwards, so it reads the bits
+        # of the previous level
+        pre = intbv(0)[2*REQ_NUM:]
+        pre[:] = req_dbl
+        for l in range(LEVELS):
+            for i in downrange(2*REQ_NUM, 2**l):
+                pre[i] = pre[i] | pre[i - 2**l]
+        # Lowest request: the request with no requests below it
+        gnt = intbv(0)[REQ_NUM:]
+        gnt[0] = req_dbl[0]
+        for i in range(1, REQ_NUM):
+            gnt[i] = req_dbl[i] and not pre[i-1]
+        for i in range(REQ_NUM):
+            gnt[i] = gnt[i] | (req_dbl[REQ_NUM+i] and not pre[REQ_NUM+i-1])
+        gnt_vec_c.next = gnt
+        gnt_vld_c.next = (req_eff != 0)
+
+    encoder = _onehot2bin(gnt_vec_c, gnt_idx_c)
+
+    @always(clk.posedge)
+    def mask_proc():
+        if (rst):
+            mask.next = 0
+        elif (gnt_rdy and gnt_vld_s):
+            mask.next = mask_new
+
+    if REGISTERED:
+        @always(clk.posedge)
+        def gnt_proc():
+            if (rst):
+                gnt_vec_s.next = 0
+                gnt_idx_s.next = 0
+                gnt_vld_s.next = 0
+            else:
+                gnt_vec_s.next = gnt_vec_c
+                gnt_idx_s.next = gnt_idx_c
+                gnt_vld_s.next = gnt_vld_c
+
+    if gnt_vec!=None: _vec = assign(gnt_vec, gnt_vec_s)
+    if gnt_idx!=None: _idx = assign(gnt_idx, gnt_idx_s)
+    if gnt_vld!=None: _vld = assign(gnt_vld, gnt_vld_s)
+
+    return instances()
+
+
+def arbiter_matrix(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None):
+    """ Matrix arbiter: grants the least recently granted active request
+            req_vec - (i) vector of request signals, priority changes dynamically
+            gnt_vec - (o) optional, vector of grants, one grant per request, only one grant can be active at at time
+            gnt_idx - (o) optional, grant index, index of the granted request
+            gnt_vld - (o) optional, grant valid, indicate that there is a granted request
+            gnt_rdy - (i) grant ready, indicates that the current grant is consumed and priority should be updated.
+                          When priority is updated, the currently granted req_vec[gnt_idx] gets the lowest priority,
+                          the priority order of the other requests does not change.
+                          After reset the priority is as arbiter_priority, req_vec[0] is with the highest priority
+
+        The priority order is a precedence matrix, prec[i][j] = 1 when req_vec[i] has priority over req_vec[j]. Only the
+        bits i < j are stored, prec[j][i] = not prec[i][j]. A request is granted when no active request has priority
+        over it, in one clock cycle. Unlike arbiter_roundrobin, a burst of grants to one request moves only this request
+        to the lowest priority, so every active request is granted before a request is granted twice.
+    """
+    if behavioral.is_enabled():
+        return behavioral.arbiter_matrix(rst, clk, req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy)
+
+    REQ_NUM = len(req_vec)
+    gnt_rdy = gnt_rdy if (gnt_rdy != None) else Signal(bool(0))
+
+    # prec[i][j], i < j, is the bit i*REQ_NUM+j, the other bits are not used
+    PREC_INIT = 0
+    for i in range(REQ_NUM):
+        for j in range(i+1, REQ_NUM):
+            PREC_INIT |= 1 << (i*REQ_NUM+j)
+    prec = Signal(intbv(PREC_INIT)[REQ_NUM*REQ_NUM:])
+
+    gnt_vec_s = Signal(intbv(0)[REQ_NUM:])
+    gnt_idx_s = Signal(intbv(0, min=0, max=REQ_NUM))
+    gnt_vld_s = Signal(bool(0))
+
+    @always_comb
+    def matrix_comb():
+        gnt = intbv(0)[REQ_NUM:]
+        for i in range(REQ_NUM):
+            g = bool(req_vec[i])
+            for j in range(REQ_NUM):
+                if (j < i):
+                    if (req_vec[j] and prec[j*REQ_NUM+i]):
+                        g = False
+                elif (j > i):
+                    if (req_vec[j] and not prec[i*REQ_NUM+j]):
+                        g = False
+            gnt[i] = g
+        gnt_vec_s.next = gnt
+        gnt_vld_s.next = (gnt != 0)
+
+    encoder = _onehot2bin(gnt_vec_s, gnt_idx_s)
+
+    @always(clk.posedge)
+    def prec_proc():
+        if (rst):
+            prec.next = PREC_INIT
+        elif (gnt_rdy and gnt_vld_s):
+            for i in range(REQ_NUM):
+                for j in range(i+1, REQ_NUM):
+                    if (gnt_vec_s[i]):
+                        prec.next[i*REQ_NUM+j] = 0
+                    elif (gnt_vec_s[j]):
+                        prec.next[i*REQ_NUM+j] = 1
+
+    if gnt_vec!=None: _vec = assign(gnt_vec, gnt_vec_s)
+    if gnt_idx!=None: _idx = assign(gnt_idx, gnt_idx_s)
+    if gnt_vld!=None: _vld = assign(gnt_vld, gnt_vld_s)
+
+    return instances()
+
+
+def _multi_stage(req, mask, gnt_vec, gnt_idx, gnt_vld, ROUNDROBIN):
+    ''' Stage of arbiter_multi: grants the lowest request, if ROUNDROBIN the lowest of the masked requests first '''
+    if not ROUNDROBIN:
+        return arbiter_priority(req, gnt_vec, gnt_idx, gnt_vld)
+
+    N = len(req)
+    req_msk = Signal(intbv(0)[N:])
+    req_dbl = Signal(intbv(0)[2*N:])
+    dbl_vec = Signal(intbv(0)[2*N:])
+    dbl_idx = Signal(intbv(0, min=0, max=2*N))
+
+    @always_comb
+    def msk_comb():
+        req_msk.next = req & mask
+
+    @always_comb
+    def dbl_comb():
+        req_dbl.next = concat(req, req_msk)
+
+    prio = arbiter_priority(req_dbl, gnt_vec=dbl_vec, gnt_idx=dbl_idx, gnt_vld=gnt_vld)
+
+    @always_comb
+    def gnt_comb():
+        gnt_vec.next = dbl_vec[N:] | dbl_vec[2*N:N]
+        if (dbl_idx >= N):
+            gnt_idx.next = dbl_idx - N
+        else:
+            gnt_idx.next = dbl_idx
+
+    return instances()
+
+
+def _multi_req(req_in, gnt_vec, req_out):
+    ''' Requests left for the next stage of arbiter_multi '''
+    @always_comb
+    def req_comb():
+        req_out.next = req_in & ~gnt_vec
+
+    return req_comb
+
+
+def _multi_ptr(gnt_idx, gnt_vld, gnt_rdy, ptr_in, upd_in, ptr_out, upd_out):
+    ''' Index of the last consumed grant up to a stage of arbiter_multi '''
+    @always_comb
+    def ptr_comb():
+        if (gnt_rdy and gnt_vld):
+            ptr_out.next = gnt_idx
+            upd_out.next = 1
+        else:
+            ptr_out.next = ptr_in
+            upd_out.next = upd_in
+
+    return ptr_comb
+
+
+def arbiter_multi(rst, clk, req_vec, gnt_vec=None, ls_gnt_idx=None, ls_gnt_vld=None, ls_gnt_rdy=None, K=None, ARBITER_TYPE="priority"):
+    """ Multi-grant arbiter: grants up to K different requests per clock cycle
+            req_vec    - (i) vector of request signals
+            gnt_vec    - (o) optional, vector of grants, up to K grants can be active at a time
+            ls_gnt_idx - (o) optional, list of K grant indexes, ls_gnt_idx[k] is the index of the k-th granted request
+            ls_gnt_vld - (o) optional, list of K grant valids, ls_gnt_vld[k] indicates that there is a k-th granted
+                             request; the grants are filled in order, i.e. if ls_gnt_vld[k], then ls_gnt_vld[k-1]
+            ls_gnt_rdy - (i) "roundrobin" only, list of K grant readies, indicate that the k-th grant is consumed and
+                             the priority should be updated. The last consumed grant (in priority order) gets the lowest
+                             priority, see arbiter_roundrobin
+            K          - number of grants, >= 1; if not set or set to `None` len(ls_gnt_idx) or len(ls_gnt_vld) is used
+            ARBITER_TYPE - "priority": the K requests with the lowest indexes are granted, see arbiter_priority
+                           "roundrobin": the K requests next to the last consumed grant are granted, see
+                           arbiter_roundrobin
+
+        The grants are issued by a chain of K stages, each stage grants the highest priority request not granted by
+        the previous stages with a priority tree, see arbiter_priority.
+    """
+    assert ARBITER_TYPE in ("priority", "roundrobin"), "Arbiter_multi: Unknown arbiter type: {}".format(ARBITER_TYPE)
+    if (K == None):
+        K = len(ls_gnt_idx) if (ls_gnt_idx != None) else len(ls_gnt_vld)
+    assert K >= 1, "Arbiter_multi parameter 'K' must be >= 1, detected K={}".format(K)
+    assert (ls_gnt_idx == None) or (len(ls_gnt_idx) == K), "Arbiter_multi: Expected {} gnt_idx, detected {}".format(K, len(ls_gnt_idx))
+    assert (ls_gnt_vld == None) or (len(ls_gnt_vld) == K), "Arbiter_multi: Expected {} gnt_vld, detected {}".format(K, len(ls_gnt_vld))
+    ROUNDROBIN = (ARBITER_TYPE == "roundrobin")
+
+    REQ_NUM = len(req_vec)
+    ls_req = [Signal(intbv(0)[REQ_NUM:]) for _ in range(K+1)]
+    ls_vec = [Signal(intbv(0)[REQ_NUM:]) for _ in range(K)]
+    ls_idx = [Signal(intbv(0, min=0, max=REQ_NUM)) for _ in range(K)]
+    ls_vld = [Signal(bool(0)) for _ in range(K)]
+
+    mask = Signal(intbv(0)[REQ_NUM:])
+
+    _req = assign(ls_req[0], req_vec)
+    stages = [_multi_stage(ls_req[k], mask, ls_vec[k], ls_idx[k], ls_vld[k], ROUNDROBIN) for k in range(K)]
+    reqs = [_multi_req(ls_req[k], ls_vec[k], ls_req[k+1]) for k in range(K)]
+
+    if ROUNDROBIN:
+        ls_rdy = ls_gnt_rdy if (ls_gnt_rdy != None) else [Signal(bool(0)) for _ in range(K)]
+        assert len(ls_rdy) == K, "Arbiter_multi: Expected {} gnt_rdy, detected {}".format(K, len(ls_rdy))
+        ptr = Signal(intbv(REQ_NUM-1, min=0, max=REQ_NUM))
+        ls_ptr = [Signal(intbv(0, min=0, max=REQ_NUM)) for _ in range(K+1)]
+        ls_upd = [Signal(bool(0)) for _ in range(K+1)]
+
+        _ptr = assign(ls_ptr[0], ptr)
+        ptrs = [_multi_ptr(ls_idx[k], ls_vld[k], ls_rdy[k], ls_ptr[k], ls_upd[k], ls_ptr[k+1], ls_upd[k+1]) for k in range(K)]
+
+        @always(clk.posedge)
+        def ptr_proc():
+            if (rst):
+                ptr.next = REQ_NUM-1
+            elif (ls_upd[K]):
+                ptr.next = ls_ptr[K]
+
+        @always_comb
+        def mask_comb():
+            for i in range(REQ_NUM):
+                mask.next[i] = (i > ptr)
+
+    if gnt_vec != None:
+        @always_comb
+        def gnt_vec_comb():
+            gnt_vec.next = ls_req[0] & ~ls_req[K]
+
+    if ls_gnt_idx!=None: _idx = [assign(ls_gnt_idx[k], ls_idx[k]) for k in range(K)]
+    if ls_gnt_vld!=None: _vld = [assign(ls_gnt_vld[k], ls_vld[k]) for k in range(K)]
+
+    return instances()
+
+
+def _param_max(ls_param):
+    ''' Maximal value of a list of per request parameters, integers or signals '''
+    return max([(p if isinstance(p, int) else p.max - 1) for p in ls_param])
+
+
+def _param_sel(sel, ls_param, do):
+    ''' Selects do = ls_param[sel] from a list of per request parameters: constants, a ROM, or signals, a mux '''
+    if all([isinstance(p, int) for p in ls_param]):
+        return rom(sel, do, tuple(ls_param))
+
+    assert all([not isinstance(p, int) for p in ls_param]), "Arbiter: parameters must be all integers or all signals"
+    # Needed to avoid: "myhdl.ConversionError: Signal in multiple list is not supported:"
+    ls_p = [Signal(intbv(0)[len(p):]) for p in ls_param]
+    _a = [assign(ls_p[i], ls_param[i]) for i in range(len(ls_param))]
+    _mux = mux(sel, ls_p, do)
+
+    return instances()
+
+
+def arbiter_weighted_rr(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None, weights=None):
+    """ Weighted Round Robin arbiter: as arbiter_roundrobin, but a granted request keeps the grant for up to weights[i]
+        consecutive consumed grants (gnt_rdy and gnt_vld) before the priority is updated
+            req_vec - (i) vector of request signals
+            gnt_vec - (o) optional, vector of grants, one grant per request, only one grant can be active at at time
+            gnt_idx - (o) optional, grant index, index of the granted request
+            gnt_vld - (o) optional, grant valid, indicate that there is a granted request
+            gnt_rdy - (i) grant ready, indicates that the current grant is consumed, see arbiter_roundrobin
+            weights - optional, list of len(req_vec) weights, integers or signals (programmable at run time);
+                      default 1 for all requests, i.e. arbiter_roundrobin. A weight 0 is handled as weight 1.
+                      The grant moves on as soon as its request is deactivated, the rest of its weight is lost
+    """
+    REQ_NUM = len(req_vec)
+    if (weights == None):
+        weights = [1 for _ in range(REQ_NUM)]
+    assert len(weights) == REQ_NUM, "Arbiter_weighted_rr: Expected {} weights, detected {}".format(REQ_NUM, len(weights))
+    gnt_rdy = gnt_rdy if (gnt_rdy != None) else Signal(bool(0))
+
+    WMAX = max(_param_max(weights), 1)
+
+    # Round robin arbitration of the next request
+    rr_idx = Signal(intbv(0, min=0, max=REQ_NUM))
+    rr_vld = Signal(bool(0))
+    rr_rdy = Signal(bool(0))
+    rr = arbiter_roundrobin(rst, clk, req_vec, gnt_idx=rr_idx, gnt_vld=rr_vld, gnt_rdy=rr_rdy)
+
+    w_sel = Signal(intbv(0, min=0, max=WMAX+1))
+    w_sel_i = _param_sel(rr_idx, weights, w_sel)
+
+    # The current request and its number of grants left
+    cur = Signal(intbv(0, min=0, max=REQ_NUM))
+    credit = Signal(intbv(0, min=0, max=WMAX))
+    hold = Signal(bool(0))
+
+    gnt_vec_s = Signal(intbv(0)[REQ_NUM:])
+    gnt_idx_s = Signal(intbv(0, min=0, max=REQ_NUM))
+    gnt_vld_s = Signal(bool(0))
+
+    @always_comb
+    def hold_comb():
+        hold.next = req_vec[cur] and (credit != 0)
+
+    @always_comb
+    def gnt_comb():
+        if (hold):
+            gnt_idx_s.next = cur
+            gnt_vld_s.next = 1
+        else:
+            gnt_idx_s.next = rr_idx
+            gnt_vld_s.next = rr_vld
+        rr_rdy.next = gnt_rdy and not hold
+
+    @always_comb
+    def gnt_vec_comb():
+        gnt_vec_s.next = 0
+        if (gnt_vld_s):
+            gnt_vec_s.next[gnt_idx_s] = 1
+
+    @always(clk.posedge)
+    def credit_proc():
+        if (rst):
+            cur.next = 0
+            credit.next = 0
+        elif (gnt_rdy and gnt_vld_s):
+            if (hold):
+                credit.next = credit - 1
+            else:
+                cur.next = rr_idx
+                if (w_sel > 1):
+                    credit.next = w_sel - 1
+                else:
+                    credit.next = 0
+        elif (not req_vec[cur]):
+            credit.next = 0
+
+    if gnt_vec!=None: _vec = assign(gnt_vec, gnt_vec_s)
+    if gnt_idx!=None: _idx = assign(gnt_idx, gnt_idx_s)
+    if gnt_vld!=None: _vld = assign(gnt_vld, gnt_vld_s)
+
+    return instances()
+
+
+def arbiter_deficit_rr(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None, quantums=None, pkt_len=None):
+    """ Deficit Round Robin arbiter: shares the bandwidth between the requests in proportion to their quantums, for
+        packets of different lengths
+            req_vec  - (i) vector of request signals
+            gnt_vec  - (o) optional, vector of grants, one grant per request, only one grant can be active at at time
+            gnt_idx  - (o) optional, grant index, index of the granted request
+            gnt_vld  - (o) optional, grant valid, indicate that there is a granted request
+            gnt_rdy  - (i) grant ready, indicates that the current grant (a packet) is consumed
+            pkt_len  - (i) optional, length of the packet of request gnt_idx; default 1, i.e. all packets are equal.
+                           The grant does not depend on pkt_len, so pkt_len can be selected from gnt_idx with no
+                           combinatorial loop
+            quantums - optional, list of len(req_vec) quantums, integers or signals (programmable at run time);
+                       default the maximal pkt_len for all requests
+
+        Each request has a deficit counter. The turn goes round robin over the active requests; a request gets its
+        quantum added to its deficit when it gets the turn, and is granted while its deficit > 0, every consumed grant
+        subtracts pkt_len. The deficit can become negative, the overdraft is paid back from the next quantum. When the
+        deficit is <= 0 the next active request gets the turn and is granted in the same clock cycle, so with quantums
+        >= the maximal pkt_len a grant is never skipped. A request that is not active when it loses the turn gets its
+        positive deficit cleared.
+    """
+    REQ_NUM = len(req_vec)
+    gnt_rdy = gnt_rdy if (gnt_rdy != None) else Signal(bool(0))
+    if (pkt_len == None):
+        pkt_len = Signal(intbv(1, min=0, max=2))
+    LMAX = pkt_len.max - 1
+    if (quantums == None):
+        quantums = [LMAX for _ in range(REQ_NUM)]
+    assert len(quantums) == REQ_NUM, "Arbiter_deficit_rr: Expected {} quantums, detected {}".format(REQ_NUM, len(quantums))
+
+    QMAX = _param_max(quantums)
+    DMIN = min(1 - LMAX, 0)
+
+    # Round robin arbitration of the next turn
+    rr_idx = Signal(intbv(0, min=0, max=REQ_NUM))
+    rr_vld = Signal(bool(0))
+    rr_rdy = Signal(bool(0))
+    rr = arbiter_roundrobin(rst, clk, req_vec, gnt_idx=rr_idx, gnt_vld=rr_vld, gnt_rdy=rr_rdy)
+
+    q_sel = Signal(intbv(0, min=0, max=QMAX+1))
+    q_sel_i = _param_sel(rr_idx, quantums, q_sel)
+
+    # The request that has the turn and the deficit counters
+    cur = Signal(intbv(REQ_NUM-1, min=0, max=REQ_NUM))
+    deficit = [Signal(intbv(0, min=DMIN, max=QMAX+1)) for _ in range(REQ_NUM)]
+    hold = Signal(bool(0))
+    # The deficit of the next turn, with its quantum; also computed when not used, for the request that has the turn
+    rr_deficit = Signal(intbv(0, min=DMIN, max=2*QMAX+1))
+
+    gnt_vec_s = Signal(intbv(0)[REQ_NUM:])
+    gnt_idx_s = Signal(intbv(0, min=0, max=REQ_NUM))
+    gnt_vld_s = Signal(bool(0))
+
+    @always_comb
+    def hold_comb():
+        hold.next = req_vec[cur] and (deficit[cur] > 0)
+
+    @always_comb
+    def rr_deficit_comb():
+        rr_deficit.next = deficit[rr_idx] + q_sel
+
+    @always_comb
+    def gnt_comb():
+        if (hold):
+            gnt_idx_s.next = cur
+            gnt_vld_s.next = 1
+        else:
+            gnt_idx_s.next = rr_idx
+            gnt_vld_s.next = rr_vld and (rr_deficit > 0)
+        rr_rdy.next = rr_vld and not hold
+
+    @always_comb
+    def gnt_vec_comb():
+        gnt_vec_s.next = 0
+        if (gnt_vld_s):
+            gnt_vec_s.next[gnt_idx_s] = 1
+
+    @always(clk.posedge)
+    def deficit_proc():
+        if (rst):
+            cur.next = REQ_NUM-1
+            for i in range(REQ_NUM):
+                deficit[i].next = 0
+        elif (hold):
+            if (gnt_rdy):
+                deficit[cur].next = deficit[cur] - pkt_len
+        elif (rr_vld):
+            if (not req_vec[cur] and deficit[cur] > 0):
+                deficit[cur].next = 0
+            if (gnt_rdy and gnt_vld_s):
+                deficit[rr_idx].next = rr_deficit - pkt_len
+            else:
+                deficit[rr_idx].next = rr_deficit
+            cur.next = rr_idx
+
+    if gnt_vec!=None: _vec = assign(gnt_vec, gnt_vec_s)
+    if gnt_idx!=None: _idx = assign(gnt_idx, gnt_idx_s)
+    if gnt_vld!=None: _vld = assign(gnt_vld, gnt_vld_s)
+
+    return instances()
+
 if __name__ == '__main__':
     pass
\ No newline at end of file
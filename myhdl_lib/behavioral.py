@@ -0,0 +1,529 @@
+'''
+    Behavioral simulation models
+
+    When behavioral simulation is enabled, the library components listed below are elaborated as a single generator
+    that drives the same ports with the same cycle behavior as the RTL, but keeps its state in plain Python variables
+    instead of Signals. This cuts the number of generators, signals and scheduler events, and speeds up the simulation
+    of designs that use many library instances.
+
+        fifo
+        ram_sp_rf, ram_sp_wf, ram_sp_ar, ram_sdp_rf, ram_sdp_wf, ram_sdp_ar, ram_dp_rf, ram_dp_wf, ram_dp_ar
+        arbiter_priority, arbiter_roundrobin, arbiter_matrix
+        hs_arbmux, hs_arbdemux  (ARBITER_TYPE in ARBITER_TYPES)
+
+    The RAM models keep the memory in a compact array, they are also the "packed" memory backend of the RAMs, see
+    mem.set_mem_backend.
+    The other components (e.g. hs_join, hs_fork, hs_mux, hs_demux, rom) are already a single generator.
+    The models are simulation only, they are not convertible. Enable behavioral simulation only while elaborating
+    designs for MyHDL simulation, e.g. via DUTer.enableBehavioral(), or:
+
+        behavioral.enable()
+        top_inst = top(...)
+        behavioral.disable()
+        Simulation(top_inst, ...).run()
+'''
+from myhdl import *
+from myhdl_lib.mem_image import _storage, _depth
+from myhdl_lib.utils import is_converting
+
+
+ARBITER_TYPES = ("priority", "roundrobin", "matrix")
+
+_enabled = False
+
+
+def enable():
+    ''' Library components elaborated from now on use their behavioral models '''
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    ''' Library components elaborated from now on use their RTL '''
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _mem(depth, width, INIT=None):
+    ''' Storage of depth words of width bits, initialized from the mem_image INIT, or with zeros; see mem_image.storage '''
+    if INIT == None:
+        return _storage(depth, width)
+    mem = INIT.storage(depth, width)
+    # A converted memory is not simulated, only the simulated ones can be dumped
+    if not is_converting():
+        INIT.bind(mem, width)
+    return mem
+
+
+def _lsb_index(x):
+    ''' Index of the lowest set bit of x, x > 0 '''
+    return (x & -x).bit_length() - 1
+
+
+def _arbitrate(req, ptr, ROUNDROBIN):
+    ''' Returns (gnt_idx, gnt_vld) of a priority or a round robin arbiter for the request vector req (int) '''
+    if not req:
+        return 0, False
+    if ROUNDROBIN:
+        # Requests above ptr have priority
+        req_hi = req & ~((2 << ptr) - 1)
+        if req_hi:
+            return _lsb_index(req_hi), True
+    return _lsb_index(req), True
+
+
+def _arbitrate_lrg(req, order):
+    ''' Returns (gnt_idx, gnt_vld) of a matrix arbiter for the request vector req (int), order - request indexes,
+        the least recently granted first '''
+    for i in order:
+        if (req >> i) & 1:
+            return i, True
+    return 0, False
+
+
+#===============================================================================
+# FIFO
+#===============================================================================
+
+def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, afull_th=None, aempty_th=None, ovf=None, udf=None, count=None, count_max=None, depth=None, width=None, read_latency=None):
+    ''' Behavioral model of fifo '''
+    if (width == None):
+        width = 0
+        if din is not None:
+            width = len(din)
+    if (depth == None):
+        depth = 2
+    if (afull_th == None):
+        afull_th = depth//2
+    if (aempty_th == None):
+        aempty_th = depth//2
+    if (read_latency == None) or (width == 0):
+        read_latency = 0
+    # Prefetch stage: words in the output buffer, and (valid, word) of the RAM reads in progress, see fifo._prefetch
+    L = read_latency
+    PF_DEPTH = L + 1
+
+    @instance
+    def _fifo():
+        mem = _mem(depth, width)
+        rd_ptr, wr_ptr = 0, 0
+        full_flg, empty_flg = True, True
+        cnt, cnt_max = 0, 0
+        buf = PF_DEPTH*[0]
+        pipe = L*[(False, 0)]
+        pf_ptr, pf_empty, pf_cnt = 0, True, 0
+        buf_wr, buf_rd, buf_cnt = 0, 0, 0
+
+        full.next = full_flg
+        empty.next = empty_flg
+        if count != None: count.next = 0
+        if count_max != None: count_max.next = 0
+        if width > 0: dout.next = 0
+
+        while True:
+            yield clk.posedge
+            rd_empty = (buf_cnt == 0) if L else empty_flg
+            if L:
+                # The RAM and the output buffer have no reset
+                arrive, word = pipe[-1]
+                if arrive:
+                    buf[buf_wr] = word
+                pipe_word = mem[pf_ptr]
+            # The memory is written also during reset, as in the RTL
+            if width > 0 and we and not full_flg:
+                mem[wr_ptr] = int(din)
+
+            if rst:
+                rd_ptr, wr_ptr = 0, 0
+                full_flg, empty_flg = False, True
+                cnt, cnt_max = 0, 0
+                if L:
+                    pipe = L*[(False, 0)]
+                    pf_ptr, pf_empty, pf_cnt = 0, True, 0
+                    buf_wr, buf_rd, buf_cnt = 0, 0, 0
+                if afull != None: afull.next = 0
+                if aempty != None: aempty.next = 1
+                if ovf != None: ovf.next = 0
+                if udf != None: udf.next = 0
+            else:
+                we_safe = bool(we) and not full_flg
+                re_safe = bool(re) and not rd_empty
+
+                if ovf != None and we and full_flg: ovf.next = 1
+                if udf != None and re and rd_empty: udf.next = 1
+
+                if L:
+                    pf_re = not pf_empty and ((pf_cnt < PF_DEPTH) or re_safe)
+                    pf_ptr_new = (pf_ptr + 1) % depth
+                    if we_safe:
+                        pf_empty = False
+                    elif pf_re and (pf_ptr_new == wr_ptr):
+                        pf_empty = True
+                    if pf_re:
+                        pf_ptr = pf_ptr_new
+                    pipe = [(pf_re, pipe_word)] + pipe[:-1]
+                    if arrive:
+                        buf_wr = (buf_wr + 1) % PF_DEPTH
+                    if re_safe:
+                        buf_rd = (buf_rd + 1) % PF_DEPTH
+                    buf_cnt += int(arrive) - int(re_safe)
+                    pf_cnt += int(pf_re) - int(re_safe)
+
+                rd_ptr_new = (rd_ptr + 1) % depth
+                wr_ptr_new = (wr_ptr + 1) % depth
+                if we_safe:
+                    empty_flg = False
+                elif re_safe and (rd_ptr_new == wr_ptr):
+                    empty_flg = True
+                if re_safe:
+                    full_flg = False
+                elif we_safe and (wr_ptr_new == rd_ptr):
+                    full_flg = True
+
+                if we_safe:
+                    wr_ptr = wr_ptr_new
+                if re_safe:
+                    rd_ptr = rd_ptr_new
+
+                cnt = cnt + int(we_safe) - int(re_safe)
+                if cnt_max < cnt: cnt_max = cnt
+                if afull != None: afull.next = (cnt >= depth - afull_th)
+                if aempty != None: aempty.next = (cnt <= aempty_th)
+
+            full.next = full_flg
+            empty.next = (buf_cnt == 0) if L else empty_flg
+            if count != None: count.next = cnt
+            if count_max != None: count_max.next = cnt_max
+            if width > 0: dout.next = buf[buf_rd] if L else mem[rd_ptr]
+
+    return _fifo
+
+
+#===============================================================================
+# RAM
+#===============================================================================
+
+def _writer(mem, we, di):
+    ''' Returns a function write(a) that writes di in mem[a] if we is active
+            we - write enable, or byte-enable vector with a bit per byte of di
+    '''
+    assert len(we) == 1 or 8*len(we) == len(di), "RAM: A byte-enable needs a bit per byte of data: len(we)={}, len(di)={}".format(len(we), len(di))
+    if len(we) == 1:
+        def write(a):
+            if we:
+                mem[a] = int(di)
+    else:
+        NB = len(we)
+        masks = [sum(0xFF << 8*i for i in range(NB) if (m >> i) & 1) for m in range(2**NB)] if (NB <= 8) else None
+
+        def write(a):
+            if we:
+                m = masks[int(we)] if masks else sum(0xFF << 8*i for i in range(NB) if we[i])
+                mem[a] = (mem[a] & ~m) | (int(di) & m)
+    return write
+
+
+def ram_sp_rf(clk, we, addr, di, do, INIT=None):
+    ''' Behavioral model of ram_sp_rf '''
+    mem = _mem(_depth(addr), len(di), INIT)
+    write = _writer(mem, we, di)
+
+    @always(clk.posedge)
+    def _ram():
+        a = int(addr)
+        do.next = mem[a]
+        write(a)
+
+    return _ram
+
+
+def ram_sp_wf(clk, we, addr, di, do, INIT=None):
+    ''' Behavioral model of ram_sp_wf '''
+    mem = _mem(_depth(addr), len(di), INIT)
+    write = _writer(mem, we, di)
+
+    @always(clk.posedge)
+    def _ram():
+        a = int(addr)
+        write(a)
+        do.next = mem[a]
+
+    return _ram
+
+
+def ram_sp_ar(clk, we, addr, di, do, INIT=None):
+    ''' Behavioral model of ram_sp_ar '''
+    mem = _mem(_depth(addr), len(di), INIT)
+    write = _writer(mem, we, di)
+
+    @instance
+    def _ram():
+        clk_prev = bool(clk)
+        while True:
+            if clk and not clk_prev:
+                write(int(addr))
+            clk_prev = bool(clk)
+            do.next = mem[int(addr)]
+            yield clk, addr
+
+    return _ram
+
+
+def ram_sdp_rf(clk, we, addrw, addrr, di, do, INIT=None):
+    ''' Behavioral model of ram_sdp_rf '''
+    mem = _mem(_depth(addrr), len(di), INIT)
+    write = _writer(mem, we, di)
+
+    @always(clk.posedge)
+    def _ram():
+        do.next = mem[int(addrr)]
+        write(int(addrw))
+
+    return _ram
+
+
+def ram_sdp_wf(clk, we, addrw, addrr, di, do, INIT=None):
+    ''' Behavioral model of ram_sdp_wf '''
+    mem = _mem(_depth(addrr), len(di), INIT)
+    write = _writer(mem, we, di)
+
+    @instance
+    def _ram():
+        do.next = mem[0]
+        while True:
+            yield clk.posedge
+            write(int(addrw))
+            do.next = mem[int(addrr)]
+
+    return _ram
+
+
+def ram_sdp_ar(clk, we, addrw, addrr, di, do, INIT=None):
+    ''' Behavioral model of ram_sdp_ar '''
+    mem = _mem(_depth(addrr), len(di), INIT)
+    write = _writer(mem, we, di)
+
+    @instance
+    def _ram():
+        clk_prev = bool(clk)
+        while True:
+            if clk and not clk_prev:
+                write(int(addrw))
+            clk_prev = bool(clk)
+            do.next = mem[int(addrr)]
+            yield clk, addrr
+
+    return _ram
+
+
+def _ram_dp(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, READ, INIT=None):
+    ''' Behavioral model of the dual-port RAMs; READ in ("rf", "wf", "ar") '''
+    mem = _mem(_depth(addra), len(dia), INIT)
+    writea = _writer(mem, wea, dia)
+    writeb = _writer(mem, web, dib)
+
+    @instance
+    def _ram():
+        clka_prev, clkb_prev = bool(clka), bool(clkb)
+        if READ == "ar":
+            doa.next = mem[int(addra)]
+            dob.next = mem[int(addrb)]
+        while True:
+            if READ == "ar":
+                yield clka, clkb, addra, addrb
+            else:
+                yield clka, clkb
+            edge_a = clka and not clka_prev
+            edge_b = clkb and not clkb_prev
+            clka_prev, clkb_prev = bool(clka), bool(clkb)
+            a, b = int(addra), int(addrb)
+            # A port that does not write reads the memory content before the clock edges
+            rda, rdb = mem[a], mem[b]
+            if edge_a:
+                if READ == "rf": doa.next = rda
+                writea(a)
+                if READ == "wf": doa.next = mem[a] if wea else rda
+            if edge_b:
+                if READ == "rf": dob.next = rdb
+                writeb(b)
+                if READ == "wf": dob.next = mem[b] if web else rdb
+            if READ == "ar":
+                doa.next = mem[a]
+                dob.next = mem[b]
+
+    return _ram
+
+
+def ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT=None):
+    ''' Behavioral model of ram_dp_rf '''
+    return _ram_dp(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, READ="rf", INIT=INIT)
+
+
+def ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT=None):
+    ''' Behavioral model of ram_dp_wf '''
+    return _ram_dp(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, READ="wf", INIT=INIT)
+
+
+def ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT=None):
+    ''' Behavioral model of ram_dp_ar '''
+    return _ram_dp(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, READ="ar", INIT=INIT)
+
+
+#===============================================================================
+# Arbiters
+#===============================================================================
+
+def arbiter_priority(req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None):
+    ''' Behavioral model of arbiter_priority '''
+
+    @instance
+    def _arb():
+        while True:
+            idx, vld = _arbitrate(int(req_vec), 0, ROUNDROBIN=False)
+            if gnt_vec != None: gnt_vec.next = (1 << idx) if vld else 0
+            if gnt_idx != None: gnt_idx.next = idx
+            if gnt_vld != None: gnt_vld.next = vld
+            yield req_vec
+
+    return _arb
+
+
+def arbiter_roundrobin(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None):
+    ''' Behavioral model of arbiter_roundrobin '''
+    REQ_NUM = len(req_vec)
+
+    @instance
+    def _arb():
+        ptr = 0
+        clk_prev = bool(clk)
+        idx, vld = _arbitrate(int(req_vec), ptr, ROUNDROBIN=True)
+        while True:
+            if clk and not clk_prev:
+                if rst:
+                    ptr = REQ_NUM-1
+                elif gnt_rdy and vld:
+                    ptr = idx
+            clk_prev = bool(clk)
+            idx, vld = _arbitrate(int(req_vec), ptr, ROUNDROBIN=True)
+            if gnt_vec != None: gnt_vec.next = (1 << idx) if vld else 0
+            if gnt_idx != None: gnt_idx.next = idx
+            if gnt_vld != None: gnt_vld.next = vld
+            yield clk, req_vec
+
+    return _arb
+
+
+def arbiter_matrix(rst, clk, req_vec, gnt_vec=None, gnt_idx=None, gnt_vld=None, gnt_rdy=None):
+    ''' Behavioral model of arbiter_matrix '''
+    REQ_NUM = len(req_vec)
+
+    @instance
+    def _arb():
+        order = list(range(REQ_NUM))
+        clk_prev = bool(clk)
+        idx, vld = _arbitrate_lrg(int(req_vec), order)
+        while True:
+            if clk and not clk_prev:
+                if rst:
+                    order = list(range(REQ_NUM))
+                elif gnt_rdy and vld:
+                    order.remove(idx)
+                    order.append(idx)
+            clk_prev = bool(clk)
+            idx, vld = _arbitrate_lrg(int(req_vec), order)
+            if gnt_vec != None: gnt_vec.next = (1 << idx) if vld else 0
+            if gnt_idx != None: gnt_idx.next = idx
+            if gnt_vld != None: gnt_vld.next = vld
+            yield clk, req_vec
+
+    return _arb
+
+
+#===============================================================================
+# Handshake
+#===============================================================================
+
+def _hs_arb(rst, clk, ls_req, ls_gnt, hs_rdy, hs_vld, hs_out, sel, ARBITER_TYPE, ls_dat=[], lsls_dat=[]):
+    ''' Behavioral model of an arbitrated handshake mux/demux:
+            ls_req - list of request signals, one per arbitrated interface
+            ls_gnt - list of signals driven only for the granted interface: ls_gnt[sel] = hs_in, the others 0
+            hs_out - signal driven with the request of the granted interface
+            hs_in  - hs_rdy or hs_vld, whichever is not hs_out
+            ls_dat   - data signals of the single interface
+            lsls_dat - data signals of the arbitrated interfaces, one entry per interface, None for an interface
+                       without data; mux: ls_dat = lsls_dat[sel]; demux: lsls_dat[i] = ls_dat for all i with data
+        The round robin and matrix priority is updated when hs_rdy and hs_vld are both active at a clock edge
+    '''
+    N = len(ls_req)
+    ROUNDROBIN = (ARBITER_TYPE == "roundrobin")
+    MATRIX = (ARBITER_TYPE == "matrix")
+    MUX = (hs_out is hs_vld)
+    hs_in = hs_vld if (hs_out is hs_rdy) else hs_rdy
+    if not ls_dat:
+        lsls_dat = []
+    for ls in lsls_dat:
+        assert (ls == None) or (len(ls) == len(ls_dat)), "Handshake: Expected {} data signals, detected {}".format(len(ls_dat), len(ls))
+    ls_dat_in = [d for ls in lsls_dat for d in ls] if MUX else list(ls_dat)
+
+    @instance
+    def _arb():
+        ptr = 0
+        order = list(range(N))
+        clk_prev = bool(clk)
+        while True:
+            if clk and not clk_prev:
+                if rst:
+                    ptr = N-1
+                    order = list(range(N))
+                elif hs_rdy and hs_vld and req:
+                    ptr = idx
+                    order.remove(idx)
+                    order.append(idx)
+            clk_prev = bool(clk)
+
+            req = 0
+            for i in range(N):
+                if ls_req[i]:
+                    req |= (1 << i)
+            if MATRIX:
+                idx, _ = _arbitrate_lrg(req, order)
+            else:
+                idx, _ = _arbitrate(req, ptr, ROUNDROBIN)
+            sel.next = idx
+            hs_out.next = ls_req[idx]
+            for i in range(N):
+                ls_gnt[i].next = hs_in if (i == idx) else 0
+            if MUX and lsls_dat:
+                for f in range(len(ls_dat)):
+                    ls_dat[f].next = lsls_dat[idx][f]
+            elif lsls_dat:
+                for ls in lsls_dat:
+                    if ls == None:
+                        continue
+                    for f in range(len(ls)):
+                        ls[f].next = ls_dat[f]
+            yield tuple([clk, hs_in] + ls_req + ls_dat_in)
+
+    return _arb
+
+
+def hs_arbmux(rst, clk, ls_hsi, hso, sel, ARBITER_TYPE="priority"):
+    ''' Behavioral model of hs_arbmux '''
+    from myhdl_lib.handshake import _hs_data  # not at module level: handshake imports this module
+    ls_hsi_rdy, ls_hsi_vld = zip(*[hsi[:2] for hsi in ls_hsi])
+    hso_rdy, hso_vld = hso[:2]
+    return _hs_arb(rst, clk, list(ls_hsi_vld), list(ls_hsi_rdy), hso_rdy, hso_vld, hso_vld, sel, ARBITER_TYPE,
+                   _hs_data(hso), [_hs_data(hsi) for hsi in ls_hsi])
+
+
+def hs_arbdemux(rst, clk, hsi, ls_hso, sel, ARBITER_TYPE="priority"):
+    ''' Behavioral model of hs_arbdemux '''
+    from myhdl_lib.handshake import _hs_data  # not at module level: handshake imports this module
+    ls_hso_rdy, ls_hso_vld = zip(*[hso[:2] for hso in ls_hso])
+    hsi_rdy, hsi_vld = hsi[:2]
+    return _hs_arb(rst, clk, list(ls_hso_rdy), list(ls_hso_vld), hsi_rdy, hsi_vld, hsi_rdy, sel, ARBITER_TYPE,
+                   _hs_data(hsi), [_hs_data(hso) if len(hso) > 2 else None for hso in ls_hso])
@@ -1,9 +1,86 @@
 from myhdl import *
-from mem   import ram_sdp_ar
+from mem   import ram_sdp_ar, ram_sdp_rf
+from myhdl_lib import behavioral
 
 
 
-def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, afull_th=None, aempty_th=None, ovf=None, udf=None, count=None, count_max=None, depth=None, width=None):
+def _prefetch(rst, clk, mem_empty, mem_re, mem_do, empty, re, dout, LATENCY):
+    """ Prefetch stage: first-word-fall-through output of a fifo whose memory is a RAM with synchronous read
+
+        RAM side interface:
+        mem_empty (i) - no words in the RAM that have not been read yet
+        mem_re    (o) - read from the RAM; the word is at mem_do LATENCY clock cycles later
+        mem_do    (i) - RAM read data
+        Output interface: empty, re, dout
+            dout is the first word while not empty, as the fifo with a RAM with asynchronous read
+
+        The words are read ahead from the RAM into an output buffer of LATENCY+1 registers, enough to keep reading one
+        word per clock cycle while re is held active.
+    """
+    DEPTH = LATENCY + 1
+
+    buf         = [Signal(intbv(0)[len(mem_do):]) for _ in range(DEPTH)]
+    buf_wr      = Signal(intbv(0, min=0, max=DEPTH))
+    buf_rd      = Signal(intbv(0, min=0, max=DEPTH))
+    buf_cnt     = Signal(intbv(0, min=0, max=DEPTH+1))  # Words in the buffer
+    pf_cnt      = Signal(intbv(0, min=0, max=DEPTH+1))  # Words in the buffer and words being read from the RAM
+    vld         = Signal(intbv(0)[LATENCY+1:])          # vld[i] - the RAM read issued i+1 clock cycles ago is valid
+    empty_flg   = Signal(bool(1))
+    rd          = Signal(bool(0))
+    pop         = Signal(bool(0))
+
+    @always_comb
+    def rd_comb():
+        pop.next    = re and not empty_flg
+        rd.next     = not mem_empty and ((pf_cnt < DEPTH) or (re and not empty_flg))
+
+    @always_comb
+    def out_comb():
+        mem_re.next = rd
+        empty.next  = empty_flg
+        dout.next   = buf[buf_rd]
+
+    @always(clk.posedge)
+    def buf_proc():
+        if (vld[LATENCY-1]):
+            buf[buf_wr].next = mem_do
+
+    @always(clk.posedge)
+    def state_proc():
+        if (rst):
+            vld.next        = 0
+            buf_wr.next     = 0
+            buf_rd.next     = 0
+            buf_cnt.next    = 0
+            pf_cnt.next     = 0
+            empty_flg.next  = 1
+        else:
+            vld.next = concat(vld[LATENCY:0], rd)
+            if (vld[LATENCY-1]):
+                if (buf_wr == DEPTH-1):
+                    buf_wr.next = 0
+                else:
+                    buf_wr.next = buf_wr + 1
+            if (pop):
+                if (buf_rd == DEPTH-1):
+                    buf_rd.next = 0
+                else:
+                    buf_rd.next = buf_rd + 1
+            if (vld[LATENCY-1] and not pop):
+                buf_cnt.next    = buf_cnt + 1
+                empty_flg.next  = 0
+            elif (pop and not vld[LATENCY-1]):
+                buf_cnt.next    = buf_cnt - 1
+                empty_flg.next  = (buf_cnt == 1)
+            if (rd and not pop):
+                pf_cnt.next = pf_cnt + 1
+            elif (pop and not rd):
+                pf_cnt.next = pf_cnt - 1
+
+    return instances()
+
+
+def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, afull_th=None, aempty_th=None, ovf=None, udf=None, count=None, count_max=None, depth=None, width=None, read_latency=None):
     """ Synchronous FIFO
 
         Input  interface: full,  we, din
@@ -26,8 +103,16 @@ def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, aful
         Parameters:
         depth         - fifo depth, must be >= 1; if not set or set to `None` default value 2 is used
         width         - data width in bits, must be >= 0; if not set or set to `None` the `din` width is used
+        read_latency  - read latency of the fifo memory, 0 (default), 1 or 2:
+                        0   - the memory is a RAM with asynchronous read (distributed RAM)
+                        1,2 - the memory is a RAM with synchronous read and read_latency-1 output registers (block
+                              RAM), followed by a prefetch stage, see _prefetch; dout stays first-word-fall-through,
+                              but empty is cleared read_latency+1 clock cycles later after a write to an empty fifo
+                        Ignored if width is 0
 
     """
+    if behavioral.is_enabled():
+        return behavioral.fifo(rst, clk, full, we, din, empty, re, dout, afull=afull, aempty=aempty, afull_th=afull_th, aempty_th=aempty_th, ovf=ovf, udf=udf, count=count, count_max=count_max, depth=depth, width=width, read_latency=read_latency)
 
     if (width == None):
         width = 0
@@ -35,6 +120,9 @@ def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, aful
             width = len(din)
     if (depth == None):
         depth = 2
+    if (read_latency == None) or (width == 0):
+        read_latency = 0
+    assert read_latency in (0, 1, 2), "Fifo parameter 'read_latency' must be 0, 1 or 2, detected read_latency={}".format(read_latency)
 
     full_flg        = Signal(bool(1))
     empty_flg       = Signal(bool(1))
@@ -46,12 +134,15 @@ def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, aful
     wr_ptr          = Signal(intbv(0, min=0, max=depth))
     wr_ptr_new      = Signal(intbv(0, min=0, max=depth))
 
+    # Empty flag of the output interface: of the fifo, or of the prefetch stage
+    rd_empty        = empty_flg if (read_latency == 0) else Signal(bool(1))
+
     @always_comb
     def safe_read_write():
         full.next       = full_flg
-        empty.next      = empty_flg
+        empty.next      = rd_empty
         we_safe.next    = we and not full_flg
-        re_safe.next    = re and not empty_flg
+        re_safe.next    = re and not rd_empty
 
 
     #===========================================================================
@@ -178,7 +269,7 @@ def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, aful
             if (rst):
                 udf.next = 0
             else:
-                if (re and empty_flg):
+                if (re and rd_empty):
                     udf.next = 1
 
     if width>0:
@@ -191,21 +282,64 @@ def fifo(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, aful
         mem_di      = Signal(intbv(0)[width:0])
         mem_do      = Signal(intbv(0)[width:0])
 
-        # RAM: Simple-Dual-Port, Asynchronous read
-        mem = ram_sdp_ar(   clk     = clk,
-                            we      = mem_we,
-                            addrw   = mem_addrw,
-                            addrr   = mem_addrr,
-                            di      = mem_di,
-                            do      = mem_do )
+        if read_latency == 0:
+            # RAM: Simple-Dual-Port, Asynchronous read
+            mem = ram_sdp_ar(   clk     = clk,
+                                we      = mem_we,
+                                addrw   = mem_addrw,
+                                addrr   = mem_addrr,
+                                di      = mem_di,
+                                do      = mem_do )
 
-        @always_comb
-        def mem_connect():
-            mem_we.next         = we_safe
-            mem_addrw.next      = wr_ptr
-            mem_addrr.next      = rd_ptr
-            mem_di.next         = din
-            dout.next           = mem_do
+            @always_comb
+            def mem_connect():
+                mem_we.next         = we_safe
+                mem_addrw.next      = wr_ptr
+                mem_addrr.next      = rd_ptr
+                mem_di.next         = din
+                dout.next           = mem_do
+
+        else:
+            # Prefetch pointer: the next cell to be read from the RAM into the prefetch stage; the cells between rd_ptr
+            # and pf_ptr hold the words in the prefetch stage and stay occupied until they are read from the fifo
+            pf_re       = Signal(bool(0))
+            pf_empty    = Signal(bool(1))
+            pf_ptr      = Signal(intbv(0, min=0, max=depth))
+            pf_ptr_new  = Signal(intbv(0, min=0, max=depth))
+
+            @always_comb
+            def pf_ptr_comb():
+                pf_ptr_new.next = ((pf_ptr + 1) % depth)
+
+            @always(clk.posedge)
+            def pf_proc():
+                if (rst):
+                    pf_ptr.next     = 0
+                    pf_empty.next   = 1
+                else:
+                    if (pf_re): pf_ptr.next = pf_ptr_new
+                    if (we_safe):
+                        pf_empty.next   = 0
+                    elif (pf_re and (pf_ptr_new == wr_ptr)):
+                        pf_empty.next   = 1
+
+            # RAM: Simple-Dual-Port, Read-First, read_latency-1 output registers
+            mem = ram_sdp_rf(   clk     = clk,
+                                we      = mem_we,
+                                addrw   = mem_addrw,
+                                addrr   = mem_addrr,
+                                di      = mem_di,
+                                do      = mem_do,
+                                READ_LATENCY = read_latency )
+
+            pf = _prefetch(rst, clk, pf_empty, pf_re, mem_do, rd_empty, re, dout, read_latency)
+
+            @always_comb
+            def mem_connect():
+                mem_we.next         = we_safe
+                mem_addrw.next      = wr_ptr
+                mem_addrr.next      = pf_ptr
+                mem_di.next         = din
 
     return instances()
 
@@ -0,0 +1,247 @@
+from myhdl import *
+from mem   import ram_sdp_ar
+from mux   import mux
+
+
+def _bank_we(B, we, col, bank_we):
+    ''' Write enable of the bank B of fifo_asym, written by a narrow write port '''
+    @always_comb
+    def bank_we_comb():
+        bank_we.next = we and (col == B)
+
+    return bank_we_comb
+
+
+def fifo_asym(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, afull_th=None, aempty_th=None, ovf=None, udf=None, wcount=None, rcount=None, depth=None):
+    """ Synchronous FIFO with different write and read data widths
+
+        Input  interface: full,  we, din
+        Output interface: empty, re, dout
+            len(din) and len(dout) must be an integer multiple of each other, R = ratio of the wider to the narrower width
+            Narrow write, wide read: R words written make one word read, the first word written in the LSBs:
+                dout[W:0] = 1st din, dout[2W:W] = 2nd din, ... , W = len(din)
+            Wide write, narrow read: one word written makes R words read, starting from the LSBs:
+                1st dout = din[W:0], 2nd dout = din[2W:W], ... , W = len(dout)
+        full      (o) - full flag, asserted when a din word does not fit
+        empty     (o) - empty flag, asserted when there is no complete dout word
+
+        Extra interface:
+        afull     (o) - almost full flag, asserted when the number of empty cells <= afull_th
+        aempty    (o) - almost empty flag, asserted when the number of full cells <= aempty_th
+
+        afull_th  (i) - almost full threshold, in din words; signal or constant; Optional, default half of the fifo
+        aempty_th (i) - almost empty threshold, in dout words; signal or constant; Optional, default half of the fifo
+
+        wcount    (o) - number of occupied fifo cells in din words, a partially read din word counts as occupied
+        rcount    (o) - number of occupied fifo cells in dout words, a partially written dout word does not count
+
+        ovf       (o) - overflow flag, set at the first write in a full fifo, cleared at reset
+        udf       (o) - underflow flag, set at the first read from an empty fifo, cleared at reset
+
+        Parameters:
+        depth         - fifo depth in words of the wider port, must be >= 2; if not set or set to `None` default value 2 is used
+
+        The fifo is stored in R banks, RAMs with asynchronous read as wide as the narrow port. The narrow port accesses one
+        bank, the wide port accesses all the banks at once, so the packing and unpacking is done by the storage itself,
+        without an extra register stage.
+    """
+    W_DIN   = len(din)
+    W_DOUT  = len(dout)
+    W       = min(W_DIN, W_DOUT)
+    assert (max(W_DIN, W_DOUT) % W) == 0 and W_DIN != W_DOUT, "Fifo_asym: Expected an integer ratio of different widths, detected len(din)={}, len(dout)={}".format(W_DIN, W_DOUT)
+    R       = max(W_DIN, W_DOUT) // W
+    if (depth == None):
+        depth = 2
+    assert depth >= 2, "Fifo_asym parameter 'depth' must be >= 2, detected depth={}".format(depth)
+
+    NARROW_WR = (W_DIN < W_DOUT)
+    CELLS   = depth*R                           # in narrow words
+    WR      = 1 if NARROW_WR else R             # cells per write
+    RR      = R if NARROW_WR else 1             # cells per read
+
+    full_flg        = Signal(bool(1))
+    empty_flg       = Signal(bool(1))
+    we_safe         = Signal(bool(0))
+    re_safe         = Signal(bool(0))
+
+    # The pointers are a row of all the banks and, on the narrow port, a bank
+    wr_row          = Signal(intbv(0, min=0, max=depth))
+    rd_row          = Signal(intbv(0, min=0, max=depth))
+    nr_col          = Signal(intbv(0, min=0, max=R))
+
+    count_r         = Signal(intbv(0, min=0, max=CELLS+1))
+    count_new       = Signal(intbv(0, min=0, max=CELLS+1))
+
+    @always_comb
+    def safe_read_write():
+        full.next       = full_flg
+        empty.next      = empty_flg
+        we_safe.next    = we and not full_flg
+        re_safe.next    = re and not empty_flg
+
+    #===========================================================================
+    # Write, Read, Full, Empty, Count
+    #===========================================================================
+    @always_comb
+    def count_comb():
+        count_new.next = count_r
+        if (we and not full_flg) and (re and not empty_flg):
+            count_new.next = count_r + WR - RR
+        elif (we and not full_flg):
+            count_new.next = count_r + WR
+        elif (re and not empty_flg):
+            count_new.next = count_r - RR
+
+    @always(clk.posedge)
+    def state_main():
+        if (rst):
+            count_r.next    = 0
+            full_flg.next   = 0
+            empty_flg.next  = 1
+        else:
+            count_r.next    = count_new
+            full_flg.next   = (count_new > CELLS - WR)
+            empty_flg.next  = (count_new < RR)
+
+    if NARROW_WR:
+        @always(clk.posedge)
+        def ptrs_proc():
+            if (rst):
+                wr_row.next     = 0
+                nr_col.next     = 0
+                rd_row.next     = 0
+            else:
+                if (we_safe):
+                    if (nr_col == R-1):
+                        nr_col.next = 0
+                        wr_row.next = (wr_row + 1) % depth
+                    else:
+                        nr_col.next = nr_col + 1
+                if (re_safe):
+                    rd_row.next = (rd_row + 1) % depth
+    else:
+        @always(clk.posedge)
+        def ptrs_proc():
+            if (rst):
+                wr_row.next     = 0
+                nr_col.next     = 0
+                rd_row.next     = 0
+            else:
+                if (we_safe):
+                    wr_row.next = (wr_row + 1) % depth
+                if (re_safe):
+                    if (nr_col == R-1):
+                        nr_col.next = 0
+                        rd_row.next = (rd_row + 1) % depth
+                    else:
+                        nr_col.next = nr_col + 1
+
+    ''' Count in din and dout words '''
+    if (wcount != None):
+        assert wcount.max > depth*RR
+        @always_comb
+        def wcount_out():
+            wcount.next = (count_r + WR - 1) // WR
+
+    if (rcount != None):
+        assert rcount.max > depth*WR
+        @always_comb
+        def rcount_out():
+            rcount.next = count_r // RR
+
+
+    #===========================================================================
+    # AlmostFull, AlmostEmpty
+    #===========================================================================
+    ''' AlmostFull flag '''
+    if (afull != None):
+        if (afull_th == None):
+            afull_th = (CELLS//WR)//2
+        @always(clk.posedge)
+        def afull_proc():
+            if (rst):
+                afull.next = 0
+            else:
+                afull.next = (count_new > CELLS - (afull_th + 1)*WR)
+
+    ''' AlmostEmpty flag '''
+    if (aempty != None):
+        if (aempty_th == None):
+            aempty_th = (CELLS//RR)//2
+        @always(clk.posedge)
+        def aempty_proc():
+            if (rst):
+                aempty.next = 1
+            else:
+                aempty.next = (count_new < (aempty_th + 1)*RR)
+
+
+    #===========================================================================
+    # Overflow, Underflow
+    #===========================================================================
+    ''' Overflow flag '''
+    if (ovf != None):
+        @always(clk.posedge)
+        def ovf_proc():
+            if (rst):
+                ovf.next = 0
+            else:
+                if (we and full_flg):
+                    ovf.next = 1
+
+    ''' Underflow flag '''
+    if (udf != None):
+        @always(clk.posedge)
+        def udf_proc():
+            if (rst):
+                udf.next = 0
+            else:
+                if (re and empty_flg):
+                    udf.next = 1
+
+
+    #===========================================================================
+    # Memory banks
+    #===========================================================================
+    ls_bank_do  = [Signal(intbv(0)[W:]) for _ in range(R)]
+
+    if NARROW_WR:
+        ls_bank_we  = [Signal(bool(0)) for _ in range(R)]
+        ls_bank_di  = [din for _ in range(R)]
+        bank_we     = [_bank_we(b, we_safe, nr_col, ls_bank_we[b]) for b in range(R)]
+
+        dout_concat = ConcatSignal(*reversed(ls_bank_do))
+        @always_comb
+        def dout_comb():
+            dout.next = dout_concat
+    else:
+        ls_bank_we  = [we_safe for _ in range(R)]
+        ls_bank_di  = [din(W*(b+1), W*b) for b in range(R)]
+
+        dout_mux = mux(nr_col, ls_bank_do, dout)
+
+    # RAM: Simple-Dual-Port, Asynchronous read
+    banks = [ram_sdp_ar(clk     = clk,
+                        we      = ls_bank_we[b],
+                        addrw   = wr_row,
+                        addrr   = rd_row,
+                        di      = ls_bank_di[b],
+                        do      = ls_bank_do[b]) for b in range(R)]
+
+    return instances()
+
+
+def convert(depth=4, width_in=8, width_out=32):
+    rst, clk   = [Signal(bool(0)) for _ in range(2)]
+    din  = Signal(intbv(0)[width_in:])
+    dout = Signal(intbv(0)[width_out:])
+    we, re, empty, full, afull, aempty, ovf, udf = [Signal(bool(0)) for _ in range(8)]
+    wcount      = Signal(intbv(0, min=0, max=depth*max(width_in, width_out)//width_in+1))
+    rcount      = Signal(intbv(0, min=0, max=depth*max(width_in, width_out)//width_out+1))
+
+    toVerilog(fifo_asym, rst, clk, full, we, din, empty, re, dout, afull=afull, aempty=aempty, ovf=ovf, udf=udf, wcount=wcount, rcount=rcount, depth=depth)
+
+
+
+if __name__ == "__main__":
+    convert()
@@ -1,8 +1,41 @@
 from myhdl import *
-from mem   import ram_sdp_ar
+from mem   import ram_sdp_ar, ram_dp_rf
+from fifo  import _prefetch
+
+
+def _sync(rst, clk, d, q, STAGES, INIT=0):
+    ''' Synchronizer: a chain of STAGES registers clocked by clk, from d to q, reset to INIT '''
+    if STAGES > 1:
+        d_r = Signal(intbv(INIT)[len(d):])
+        sync = _sync(rst, clk, d, d_r, STAGES-1, INIT)
+    else:
+        d_r = d
+
+    @always(clk.posedge)
+    def sync_reg():
+        if (rst):
+            q.next = INIT
+        else:
+            q.next = d_r
+
+    return instances()
 
 
-def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, depth=None, width=None):
+def _gray2bin(gray, bin):
+    ''' Gray code to binary conversion '''
+    WIDTH = len(gray)
+
+    @always_comb
+    def gray2bin_comb():
+        b = bool(0)
+        for i in downrange(WIDTH):
+            b = b ^ gray[i]
+            bin.next[i] = b
+
+    return gray2bin_comb
+
+
+def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, wafull=None, raempty=None, wafull_th=None, raempty_th=None, wcount=None, rcount=None, depth=None, width=None, read_latency=None, sync_stages=None):
     ''' Asynchronous FIFO
 
         Implements the design described in:
@@ -22,10 +55,31 @@ def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, dept
             rempty - empty flag, immediate set on 'read', delayed clear on 'write' due to clock domain synchronization
             re     - read enable
             rdata  - read data
+        Extra interface, as fifo, each signal in its clock domain and computed from the synchronized pointer of the other
+        domain, i.e. the read side update reaches wcount/wafull and the write side update reaches rcount/raempty with the
+        clock domain synchronization delay:
+            wafull     (o) - almost full flag, asserted when the number of empty cells <= wafull_th
+            raempty    (o) - almost empty flag, asserted when the number of full cells <= raempty_th
+            wafull_th  (i) - almost full threshold, in terms of fifo cells; signal or constant; Optional, default depth/2
+            raempty_th (i) - almost empty threshold, in terms of fifo cells; signal or constant; Optional, default depth/2
+            wcount     (o) - number of occupied fifo cells, seen from the write side
+            rcount     (o) - number of occupied fifo cells, seen from the read side
+            With read_latency 1,2 the words in the prefetch stage are not counted
         Parameters
-            depth - fifo depth. If not set, default 4 is used. Must be >=4. Must be power of 2
+            depth - fifo depth. If not set, default 4 is used. Must be >=4. If not a power of 2, the pointers count over
+                    the middle 2*depth codes of a reflected Gray code, which keeps a single bit change at the wrap, and
+                    the full flag compares binary pointers; the memory has exactly depth words
             width - data width. If not set, data with equals len(wdata). Can be [0,1,2,3...)
                     It is possible to instantiate a fifo with data width 0 (no data) if width=0 or width=None and wdata=None
+            read_latency - read latency of the fifo memory, 0 (default), 1 or 2:
+                    0   - the memory is a RAM with asynchronous read (distributed RAM)
+                    1,2 - the memory is a dual-clock RAM with synchronous read and read_latency-1 output registers
+                          (block RAM), followed by a prefetch stage in the read clock domain; rdata stays
+                          first-word-fall-through. The words in the prefetch stage free their RAM cells, the fifo holds
+                          up to depth+read_latency+1 words, and rempty is cleared read_latency+1 read clock cycles later
+                    Ignored if width is 0
+            sync_stages - number of registers of the clock domain crossing synchronizers, 2 (default), 3 or 4. Each stage
+                    more improves the MTBF of the crossing, and delays the clear of wfull and rempty by one clock cycle
     '''
 
     if (width == None):
@@ -36,7 +90,12 @@ def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, dept
     if (depth == None):
         depth = 4
     assert depth >= 4, "Fifo_async parameter 'depth' must be >= 4 , detected depth={}".format(depth)
-    assert (depth & (depth-1)) == 0, "Fifo_async parameter 'depth' must be 2**n, detected depth={}".format(depth)
+    if (read_latency == None) or (width == 0):
+        read_latency = 0
+    assert read_latency in (0, 1, 2), "Fifo_async parameter 'read_latency' must be 0, 1 or 2, detected read_latency={}".format(read_latency)
+    if (sync_stages == None):
+        sync_stages = 2
+    assert sync_stages in (2, 3, 4), "Fifo_async parameter 'sync_stages' must be 2, 3 or 4, detected sync_stages={}".format(sync_stages)
 
 
     full_flg        = Signal(bool(1))
@@ -50,73 +109,90 @@ def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, dept
 
     WIDTH = len(rd_ptr)
 
-    rd_ptr_bin          = Signal(intbv(0)[WIDTH+1:])
-    rd_ptr_bin_new      = Signal(intbv(0)[WIDTH+1:])
-    rd_ptr_gray         = Signal(intbv(0)[WIDTH+1:])
-    rd_ptr_gray_new     = Signal(intbv(0)[WIDTH+1:])
-    rd_ptr_gray_sync1   = Signal(intbv(0)[WIDTH+1:])
-    rd_ptr_gray_sync2   = Signal(intbv(0)[WIDTH+1:])
-    wr_ptr_bin          = Signal(intbv(0)[WIDTH+1:])
-    wr_ptr_bin_new      = Signal(intbv(0)[WIDTH+1:])
-    wr_ptr_gray         = Signal(intbv(0)[WIDTH+1:])
-    wr_ptr_gray_new     = Signal(intbv(0)[WIDTH+1:])
-    wr_ptr_gray_sync1   = Signal(intbv(0)[WIDTH+1:])
-    wr_ptr_gray_sync2   = Signal(intbv(0)[WIDTH+1:])
-
-    @always_comb
-    def safe_read_write():
-        wfull.next      = full_flg
-        rempty.next     = empty_flg
-        we_safe.next    = we and not full_flg
-        re_safe.next    = re and not empty_flg
+    # The binary pointers count modulo 2*depth in [PTR_MIN, PTR_MAX], symmetric in the range of WIDTH+1 bits
+    POW2    = (depth & (depth-1)) == 0
+    PTR_MIN = 2**WIDTH - depth
+    PTR_MAX = PTR_MIN + 2*depth - 1
+    GRAY_MIN= (PTR_MIN >> 1) ^ PTR_MIN
+
+    rd_ptr_bin          = Signal(intbv(PTR_MIN)[WIDTH+1:])
+    rd_ptr_bin_new      = Signal(intbv(PTR_MIN)[WIDTH+1:])
+    rd_ptr_gray         = Signal(intbv(GRAY_MIN)[WIDTH+1:])
+    rd_ptr_gray_new     = Signal(intbv(GRAY_MIN)[WIDTH+1:])
+    rd_ptr_gray_sync    = Signal(intbv(GRAY_MIN)[WIDTH+1:])
+    wr_ptr_bin          = Signal(intbv(PTR_MIN)[WIDTH+1:])
+    wr_ptr_bin_new      = Signal(intbv(PTR_MIN)[WIDTH+1:])
+    wr_ptr_gray         = Signal(intbv(GRAY_MIN)[WIDTH+1:])
+    wr_ptr_gray_new     = Signal(intbv(GRAY_MIN)[WIDTH+1:])
+    wr_ptr_gray_sync    = Signal(intbv(GRAY_MIN)[WIDTH+1:])
+
+    if read_latency == 0:
+        @always_comb
+        def safe_read_write():
+            wfull.next      = full_flg
+            rempty.next     = empty_flg
+            we_safe.next    = we and not full_flg
+            re_safe.next    = re and not empty_flg
+    else:
+        # The read pointer is advanced by the prefetch stage, which drives re_safe and rempty
+        @always_comb
+        def safe_write():
+            wfull.next      = full_flg
+            we_safe.next    = we and not full_flg
 
-    @always(wclk.posedge)
-    def sync_r2w():
-        ''' Read-domain to write-domain synchronizer '''
-        if (wrst):
-            rd_ptr_gray_sync1.next = 0
-            rd_ptr_gray_sync2.next = 0
-        else:
-            rd_ptr_gray_sync1.next = rd_ptr_gray
-            rd_ptr_gray_sync2.next = rd_ptr_gray_sync1
+    # Read-domain to write-domain synchronizer
+    sync_r2w = _sync(wrst, wclk, rd_ptr_gray, rd_ptr_gray_sync, sync_stages, GRAY_MIN)
 
-    @always(rclk.posedge)
-    def sync_w2r():
-        ''' Write-domain to read-domain synchronizer '''
-        if (rrst):
-            wr_ptr_gray_sync1.next = 0
-            wr_ptr_gray_sync2.next = 0
-        else:
-            wr_ptr_gray_sync1.next = wr_ptr_gray
-            wr_ptr_gray_sync2.next = wr_ptr_gray_sync1
+    # Write-domain to read-domain synchronizer
+    sync_w2r = _sync(rrst, rclk, wr_ptr_gray, wr_ptr_gray_sync, sync_stages, GRAY_MIN)
 
     @always_comb
     def bin_comb():
         wr_ptr_bin_new.next = wr_ptr_bin
         rd_ptr_bin_new.next = rd_ptr_bin
         if (we_safe):
-            wr_ptr_bin_new.next = (wr_ptr_bin + 1) % wr_ptr_bin.max
+            if (wr_ptr_bin == PTR_MAX):
+                wr_ptr_bin_new.next = PTR_MIN
+            else:
+                wr_ptr_bin_new.next = wr_ptr_bin + 1
         if (re_safe):
-            rd_ptr_bin_new.next = (rd_ptr_bin + 1) % rd_ptr_bin.max
+            if (rd_ptr_bin == PTR_MAX):
+                rd_ptr_bin_new.next = PTR_MIN
+            else:
+                rd_ptr_bin_new.next = rd_ptr_bin + 1
 
     @always_comb
     def gray_comb():
         wr_ptr_gray_new.next    = (wr_ptr_bin_new >> 1) ^ wr_ptr_bin_new
         rd_ptr_gray_new.next    = (rd_ptr_bin_new >> 1) ^ rd_ptr_bin_new
 
-    @always_comb
-    def full_empty_comb():
-        empty_val.next  = (rd_ptr_gray_new == wr_ptr_gray_sync2)
-        full_val.next   = (wr_ptr_gray_new[WIDTH] != rd_ptr_gray_sync2[WIDTH]) and \
-                          (wr_ptr_gray_new[WIDTH-1] != rd_ptr_gray_sync2[WIDTH-1]) and \
-                          (wr_ptr_gray_new[WIDTH-1:] == rd_ptr_gray_sync2[WIDTH-1:])
+    # The synchronized pointers in binary, for the full flag if depth is not a power of 2, and for the counts
+    rd_ptr_bin_sync     = Signal(intbv(PTR_MIN)[WIDTH+1:])
+    wr_ptr_bin_sync     = Signal(intbv(PTR_MIN)[WIDTH+1:])
+    if (not POW2) or (wcount != None) or (wafull != None):
+        rd_gray2bin = _gray2bin(rd_ptr_gray_sync, rd_ptr_bin_sync)
+    if (rcount != None) or (raempty != None):
+        wr_gray2bin = _gray2bin(wr_ptr_gray_sync, wr_ptr_bin_sync)
+
+    if POW2:
+        @always_comb
+        def full_empty_comb():
+            empty_val.next  = (rd_ptr_gray_new == wr_ptr_gray_sync)
+            full_val.next   = (wr_ptr_gray_new[WIDTH] != rd_ptr_gray_sync[WIDTH]) and \
+                              (wr_ptr_gray_new[WIDTH-1] != rd_ptr_gray_sync[WIDTH-1]) and \
+                              (wr_ptr_gray_new[WIDTH-1:] == rd_ptr_gray_sync[WIDTH-1:])
+    else:
+        @always_comb
+        def full_empty_comb():
+            empty_val.next  = (rd_ptr_gray_new == wr_ptr_gray_sync)
+            full_val.next   = (wr_ptr_bin_new == rd_ptr_bin_sync + depth) or (rd_ptr_bin_sync == wr_ptr_bin_new + depth)
 
 
     @always(wclk.posedge)
     def wptr_proc():
         if (wrst):
-            wr_ptr_bin.next     = 0
-            wr_ptr_gray.next    = 0
+            wr_ptr_bin.next     = PTR_MIN
+            wr_ptr_gray.next    = GRAY_MIN
             full_flg.next       = 0
         else:
             wr_ptr_bin.next     = wr_ptr_bin_new
@@ -126,8 +202,8 @@ def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, dept
     @always(rclk.posedge)
     def rptr_proc():
         if (rrst):
-            rd_ptr_bin.next     = 0
-            rd_ptr_gray.next    = 0
+            rd_ptr_bin.next     = PTR_MIN
+            rd_ptr_gray.next    = GRAY_MIN
             empty_flg.next      = 1
         else:
             rd_ptr_bin.next     = rd_ptr_bin_new
@@ -135,6 +211,75 @@ def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, dept
             empty_flg.next      = empty_val
 
 
+    #===========================================================================
+    # Count, AlmostFull, AlmostEmpty
+    #===========================================================================
+    # The counts are modulo 2*depth, the range of the pointers difference
+    ''' Write side '''
+    if (wcount != None) or (wafull != None):
+        wcount_r        = Signal(intbv(0, min=0, max=2*depth))
+        wcount_new      = Signal(intbv(0, min=0, max=2*depth))
+
+        @always_comb
+        def wcount_comb():
+            if (wr_ptr_bin >= rd_ptr_bin_sync):
+                wcount_r.next   = wr_ptr_bin - rd_ptr_bin_sync
+            else:
+                wcount_r.next   = wr_ptr_bin + 2*depth - rd_ptr_bin_sync
+            if (wr_ptr_bin_new >= rd_ptr_bin_sync):
+                wcount_new.next = wr_ptr_bin_new - rd_ptr_bin_sync
+            else:
+                wcount_new.next = wr_ptr_bin_new + 2*depth - rd_ptr_bin_sync
+
+    if (wcount != None):
+        assert wcount.max > depth
+        @always_comb
+        def wcount_out():
+            wcount.next = wcount_r
+
+    if (wafull != None):
+        if (wafull_th == None):
+            wafull_th = depth//2
+        @always(wclk.posedge)
+        def wafull_proc():
+            if (wrst):
+                wafull.next = 0
+            else:
+                wafull.next = (wcount_new >= depth-wafull_th)
+
+    ''' Read side '''
+    if (rcount != None) or (raempty != None):
+        rcount_r        = Signal(intbv(0, min=0, max=2*depth))
+        rcount_new      = Signal(intbv(0, min=0, max=2*depth))
+
+        @always_comb
+        def rcount_comb():
+            if (wr_ptr_bin_sync >= rd_ptr_bin):
+                rcount_r.next   = wr_ptr_bin_sync - rd_ptr_bin
+            else:
+                rcount_r.next   = wr_ptr_bin_sync + 2*depth - rd_ptr_bin
+            if (wr_ptr_bin_sync >= rd_ptr_bin_new):
+                rcount_new.next = wr_ptr_bin_sync - rd_ptr_bin_new
+            else:
+                rcount_new.next = wr_ptr_bin_sync + 2*depth - rd_ptr_bin_new
+
+    if (rcount != None):
+        assert rcount.max > depth
+        @always_comb
+        def rcount_out():
+            rcount.next = rcount_r
+
+    if (raempty != None):
+        if (raempty_th == None):
+            raempty_th = depth//2
+        @always(rclk.posedge)
+        def raempty_proc():
+            if (rrst):
+                raempty.next = 1
+            else:
+                raempty.next = (rcount_new <= raempty_th)
+
+
     if width>0:
         #===========================================================================
         # Memory instance
@@ -145,22 +290,72 @@ def fifo_async(wrst, rrst, wclk, rclk, wfull, we, wdata, rempty, re, rdata, dept
         mem_di      = Signal(intbv(0)[width:0])
         mem_do      = Signal(intbv(0)[width:0])
 
+        wr_addr     = Signal(intbv(0, min=0, max=depth))
+        rd_addr     = Signal(intbv(0, min=0, max=depth))
 
-        # RAM: Simple-Dual-Port, Asynchronous read
-        mem = ram_sdp_ar(   clk     = wclk,
-                            we      = mem_we,
-                            addrw   = mem_addrw,
-                            addrr   = mem_addrr,
-                            di      = mem_di,
-                            do      = mem_do )
+        if POW2:
+            @always_comb
+            def addr_comb():
+                wr_addr.next    = wr_ptr_bin[WIDTH:]
+                rd_addr.next    = rd_ptr_bin[WIDTH:]
+        else:
+            @always_comb
+            def addr_comb():
+                if (wr_ptr_bin < PTR_MIN + depth):
+                    wr_addr.next    = wr_ptr_bin - PTR_MIN
+                else:
+                    wr_addr.next    = wr_ptr_bin - PTR_MIN - depth
+                if (rd_ptr_bin < PTR_MIN + depth):
+                    rd_addr.next    = rd_ptr_bin - PTR_MIN
+                else:
+                    rd_addr.next    = rd_ptr_bin - PTR_MIN - depth
+
+
+        if read_latency == 0:
+            # RAM: Simple-Dual-Port, Asynchronous read
+            mem = ram_sdp_ar(   clk     = wclk,
+                                we      = mem_we,
+                                addrw   = mem_addrw,
+                                addrr   = mem_addrr,
+                                di      = mem_di,
+                                do      = mem_do )
+
+            @always_comb
+            def mem_connect():
+                mem_we.next         = we_safe
+                mem_addrw.next      = wr_addr
+                mem_addrr.next      = rd_addr
+                mem_di.next         = wdata
+                rdata.next          = mem_do
 
-        @always_comb
-        def mem_connect():
-            mem_we.next         = we_safe
-            mem_addrw.next      = wr_ptr_bin[WIDTH:]
-            mem_addrr.next      = rd_ptr_bin[WIDTH:]
-            mem_di.next         = wdata
-            rdata.next          = mem_do
+        else:
+            mem_nc_we   = Signal(bool(0))
+            mem_nc_di   = Signal(intbv(0)[width:0])
+            mem_nc_do   = Signal(intbv(0)[width:0])
+
+            # RAM: Dual-Port, Read-First, read_latency-1 output registers; port A writes, port B reads
+            mem = ram_dp_rf(    clka    = wclk,
+                                clkb    = rclk,
+                                wea     = mem_we,
+                                web     = mem_nc_we,
+                                addra   = mem_addrw,
+                                addrb   = mem_addrr,
+                                dia     = mem_di,
+                                dib     = mem_nc_di,
+                                doa     = mem_nc_do,
+                                dob     = mem_do,
+                                READ_LATENCY = read_latency )
+
+            pf = _prefetch(rrst, rclk, empty_flg, re_safe, mem_do, rempty, re, rdata, read_latency)
+
+            @always_comb
+            def mem_connect():
+                mem_we.next         = we_safe
+                mem_addrw.next      = wr_addr
+                mem_addrr.next      = rd_addr
+                mem_di.next         = wdata
+                mem_nc_we.next      = 0
+                mem_nc_di.next      = 0
 
 
     return instances()
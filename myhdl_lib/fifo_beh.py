@@ -0,0 +1,86 @@
+from collections import deque
+
+
+class fifo_beh:
+    ''' Synchronous FIFO: behavioral model of fifo
+
+        Each call of write, read, write_read or idle models one clock cycle of the RTL. After the call the model state
+        equals the state of the RTL outputs after the clock edge. The data are kept in a deque, all operations are O(1).
+    '''
+
+    def __init__(self, depth, afull_th=None, aempty_th=None):
+        self.depth = depth
+        self.data = deque()
+        self.afull_th = afull_th if (afull_th != None) else depth//2
+        self.aempty_th = aempty_th if (aempty_th != None) else depth//2
+        self.ovf = False
+        self.udf = False
+        self.count_max = 0
+        self.clocked = False # Almost full/empty flags are updated at the first clock after reset
+
+    def reset(self):
+        self.__init__(self.depth, self.afull_th, self.aempty_th)
+
+    def isFull(self):
+        return len(self.data) == self.depth
+
+    def isEmpty(self):
+        return len(self.data) == 0
+
+    def isAFull(self):
+        return self.clocked and (self.depth - len(self.data)) <= self.afull_th
+
+    def isAEmpty(self):
+        return not self.clocked or len(self.data) <= self.aempty_th
+
+    def isOvf(self):
+        return self.ovf
+
+    def isUdf(self):
+        return self.udf
+
+    def getCount(self):
+        return len(self.data)
+
+    def getCountMax(self):
+        return self.count_max
+
+    def getDout(self):
+        return self.data[0]
+
+    def _clock(self, we, re, val=None):
+        self.clocked = True
+        full = self.isFull()
+        empty = self.isEmpty()
+        x = None
+
+        if we:
+            if (not full):
+                self.data.append(val)
+            else:
+                self.ovf = True
+
+        if re:
+            if (not empty):
+                x = self.data.popleft()
+            else:
+                self.udf = True
+
+        if (len(self.data) > self.count_max):
+            self.count_max = len(self.data)
+        return x
+
+    def idle(self):
+        self._clock(we=False, re=False)
+
+    def write(self, val):
+        self._clock(we=True, re=False, val=val)
+
+    def read(self):
+        return self._clock(we=False, re=True)
+
+    def write_read(self, val):
+        return self._clock(we=True, re=True, val=val)
+
+    def status(self):
+        return "FULL = {:}, EMPTY = {:}, COUNT = {:3}, AFULL = {:}, AEMPTY = {:}, OVF = {:}, UDF = {:}, COUNT_MAX = {:}, DOUT = {:}".format(int(self.isFull()), int(self.isEmpty()), int(self.getCount()), int(self.isAFull()), int(self.isAEmpty()), int(self.isOvf()), int(self.isUdf()), self.getCountMax(), self.data[0] if len(self.data)>0 else None)
@@ -0,0 +1,269 @@
+from myhdl import *
+from mem   import ram_sdp_ar
+from utils import assign
+
+
+def _bank_ctrl(B, K, ROWS, wr_cnt, wr_col, wr_row, rd_col, rd_row, ls_din, we, addrw, di, addrr):
+    ''' Ports of the bank B of fifo_multi: writes the word of the bank among the next wr_cnt words at the write pointer,
+        reads the word of the bank among the next K words at the read pointer
+    '''
+    @always_comb
+    def bank_ctrl():
+        we.next = ((B + K - wr_col) % K) < wr_cnt
+        di.next = ls_din[(B + K - wr_col) % K]
+        if (B < wr_col):
+            addrw.next = (wr_row + 1) % ROWS
+        else:
+            addrw.next = wr_row
+        if (B < rd_col):
+            addrr.next = (rd_row + 1) % ROWS
+        else:
+            addrr.next = rd_row
+
+    return bank_ctrl
+
+
+def _out_rotate(J, K, rd_col, ls_bank_do, dout):
+    ''' Output word J of fifo_multi: the word J after the read pointer '''
+    @always_comb
+    def out_rotate():
+        dout.next = ls_bank_do[(rd_col + J) % K]
+
+    return out_rotate
+
+
+def fifo_multi(rst, clk, full, we, din, empty, re, dout, afull=None, aempty=None, afull_th=None, aempty_th=None, ovf=None, udf=None, count=None, count_max=None, depth=None):
+    """ Synchronous FIFO that writes and reads up to K words per clock cycle
+
+        Input  interface: full,  we, din
+        Output interface: empty, re, dout
+        din       (i) - list of K input words, din[0] is written first
+        we        (i) - number of words to write, 0..K: din[0..we-1] are written if there are at least we empty cells,
+                        otherwise nothing is written
+        dout      (o) - list of K output words, dout[0] is the first word in the fifo; dout[i] is valid if count > i
+        re        (i) - number of words to read, 0..K: dout[0..re-1] are read if there are at least re full cells,
+                        otherwise nothing is read
+        full      (o) - full flag, asserted when the number of empty cells < K, i.e. K words do not fit
+        empty     (o) - empty flag, asserted when there are no words in the fifo
+
+        Extra interface:
+        afull     (o) - almost full flag, asserted when the number of empty cells <= afull_th
+        aempty    (o) - almost empty flag, asserted when the number of full cells <= aempty_th
+
+        afull_th  (i) - almost full threshold, in terms of fifo cells; signal or constant; Optional, default depth/2
+        aempty_th (i) - almost empty threshold, in terms of fifo cells; signal or constant; Optional, default depth/2
+
+        count     (o) - number of occupied fifo cells
+
+        count_max (o) - max number of occupied fifo cells reached since the last reset
+        ovf       (o) - overflow flag, set at the first write that does not fit in the fifo, cleared at reset
+        udf       (o) - underflow flag, set at the first read of more words than there are in the fifo, cleared at reset
+
+        Parameters:
+        depth         - fifo depth, a multiple of K, must be >= 2*K; if not set or set to `None` default value 2*K is used
+        K = len(din) = len(dout), words per clock cycle, must be a power of 2, >= 2
+
+        The words are stored in K banks, RAMs with asynchronous read of depth/K words: word i of the fifo in bank i%K.
+        The K words written or read in a clock cycle fall in different banks, so all the banks are written and read
+        without conflicts in every clock cycle.
+    """
+    K = len(din)
+    assert K == len(dout), "Fifo_multi: Expected the same number of input and output words, detected len(din)={}, len(dout)={}".format(K, len(dout))
+    assert K >= 2 and (K & (K-1)) == 0, "Fifo_multi: The number of words must be 2**n, >= 2, detected K={}".format(K)
+    if (depth == None):
+        depth = 2*K
+    assert depth >= 2*K and (depth % K) == 0, "Fifo_multi parameter 'depth' must be a multiple of K >= 2*K, detected depth={}, K={}".format(depth, K)
+    ROWS = depth // K
+
+    full_flg        = Signal(bool(1))
+    empty_flg       = Signal(bool(1))
+    wr_cnt          = Signal(intbv(0, min=0, max=K+1))
+    rd_cnt          = Signal(intbv(0, min=0, max=K+1))
+
+    rd_ptr          = Signal(intbv(0, min=0, max=depth))
+    wr_ptr          = Signal(intbv(0, min=0, max=depth))
+    rd_col          = Signal(intbv(0, min=0, max=K))
+    wr_col          = Signal(intbv(0, min=0, max=K))
+    rd_row          = Signal(intbv(0, min=0, max=ROWS))
+    wr_row          = Signal(intbv(0, min=0, max=ROWS))
+
+    count_r         = Signal(intbv(0, min=0, max=depth+1))
+    count_new       = Signal(intbv(0, min=0, max=depth+1))
+
+    @always_comb
+    def safe_read_write():
+        full.next       = full_flg
+        empty.next      = empty_flg
+        if (we <= depth - count_r):
+            wr_cnt.next = we
+            if (re <= count_r):
+                rd_cnt.next     = re
+                count_new.next  = count_r + we - re
+            else:
+                rd_cnt.next     = 0
+                count_new.next  = count_r + we
+        else:
+            wr_cnt.next = 0
+            if (re <= count_r):
+                rd_cnt.next     = re
+                count_new.next  = count_r - re
+            else:
+                rd_cnt.next     = 0
+                count_new.next  = count_r
+
+
+    #===========================================================================
+    # Write, Read, Full, Empty, Count
+    #===========================================================================
+    @always_comb
+    def ptrs_comb():
+        wr_col.next     = wr_ptr % K
+        wr_row.next     = wr_ptr // K
+        rd_col.next     = rd_ptr % K
+        rd_row.next     = rd_ptr // K
+
+    @always(clk.posedge)
+    def state_main():
+        if (rst):
+            wr_ptr.next     = 0
+            rd_ptr.next     = 0
+            count_r.next    = 0
+            full_flg.next   = 0
+            empty_flg.next  = 1
+        else:
+            # Write pointer
+            if (wr_ptr + wr_cnt >= depth):
+                wr_ptr.next = wr_ptr + wr_cnt - depth
+            else:
+                wr_ptr.next = wr_ptr + wr_cnt
+            # Read pointer
+            if (rd_ptr + rd_cnt >= depth):
+                rd_ptr.next = rd_ptr + rd_cnt - depth
+            else:
+                rd_ptr.next = rd_ptr + rd_cnt
+            count_r.next    = count_new
+            full_flg.next   = (count_new > depth - K)
+            empty_flg.next  = (count_new == 0)
+
+    if (count != None):
+        assert count.max > depth
+        @always_comb
+        def count_out():
+            count.next = count_r
+
+
+    #===========================================================================
+    # CountMax
+    #===========================================================================
+    ''' Count max '''
+    if (count_max != None):
+        assert count_max.max > depth
+        count_max_r = Signal(intbv(0, min=0,max=count_max.max))
+        @always(clk.posedge)
+        def count_max_proc():
+            if (rst):
+                count_max_r.next = 0
+            else:
+                if (count_max_r < count_new):
+                    count_max_r.next = count_new
+
+        @always_comb
+        def count_max_out():
+            count_max.next = count_max_r
+
+    #===========================================================================
+    # AlmostFull, AlmostEmpty
+    #===========================================================================
+    ''' AlmostFull flag '''
+    if (afull != None):
+        if (afull_th == None):
+            afull_th = depth//2
+        @always(clk.posedge)
+        def afull_proc():
+            if (rst):
+                afull.next = 0
+            else:
+                afull.next = (count_new >= depth-afull_th)
+
+    ''' AlmostEmpty flag '''
+    if (aempty != None):
+        if (aempty_th == None):
+            aempty_th = depth//2
+        @always(clk.posedge)
+        def aempty_proc():
+            if (rst):
+                aempty.next = 1
+            else:
+                aempty.next = (count_new <=  aempty_th)
+
+
+    #===========================================================================
+    # Overflow, Underflow
+    #===========================================================================
+    ''' Overflow flag '''
+    if (ovf != None):
+        @always(clk.posedge)
+        def ovf_proc():
+            if (rst):
+                ovf.next = 0
+            else:
+                if (we > depth - count_r):
+                    ovf.next = 1
+
+    ''' Underflow flag '''
+    if (udf != None):
+        @always(clk.posedge)
+        def udf_proc():
+            if (rst):
+                udf.next = 0
+            else:
+                if (re > count_r):
+                    udf.next = 1
+
+
+    #===========================================================================
+    # Memory banks
+    #===========================================================================
+    ls_din      = [Signal(din[i].val) for i in range(K)]
+    ls_bank_we  = [Signal(bool(0)) for _ in range(K)]
+    ls_bank_aw  = [Signal(intbv(0, min=0, max=ROWS)) for _ in range(K)]
+    ls_bank_ar  = [Signal(intbv(0, min=0, max=ROWS)) for _ in range(K)]
+    ls_bank_di  = [Signal(intbv(0)[len(din[0]):]) for _ in range(K)]
+    ls_bank_do  = [Signal(intbv(0)[len(din[0]):]) for _ in range(K)]
+
+    din_connect = [assign(ls_din[i], din[i]) for i in range(K)]
+
+    # RAM: Simple-Dual-Port, Asynchronous read
+    banks = [ram_sdp_ar(clk     = clk,
+                        we      = ls_bank_we[b],
+                        addrw   = ls_bank_aw[b],
+                        addrr   = ls_bank_ar[b],
+                        di      = ls_bank_di[b],
+                        do      = ls_bank_do[b]) for b in range(K)]
+
+    bank_ctrl = [_bank_ctrl(b, K, ROWS, wr_cnt, wr_col, wr_row, rd_col, rd_row, ls_din, ls_bank_we[b], ls_bank_aw[b], ls_bank_di[b], ls_bank_ar[b]) for b in range(K)]
+
+    out_rotate = [_out_rotate(j, K, rd_col, ls_bank_do, dout[j]) for j in range(K)]
+
+    return instances()
+
+
+def convert(depth=16, width=8):
+    ''' Convert Fifo_multi: 4 words per clock cycle '''
+    def fifo_multi_4(rst, clk, full, we, din0, din1, din2, din3, empty, re, dout0, dout1, dout2, dout3, afull, aempty, ovf, udf, count, count_max):
+        return fifo_multi(rst, clk, full, we, [din0, din1, din2, din3], empty, re, [dout0, dout1, dout2, dout3], afull=afull, aempty=aempty, ovf=ovf, udf=udf, count=count, count_max=count_max, depth=depth)
+
+    rst, clk   = [Signal(bool(0)) for _ in range(2)]
+    din  = [Signal(intbv(0)[width:]) for _ in range(4)]
+    dout = [Signal(intbv(0)[width:]) for _ in range(4)]
+    we, re = [Signal(intbv(0, min=0, max=5)) for _ in range(2)]
+    empty, full, afull, aempty, ovf, udf = [Signal(bool(0)) for _ in range(6)]
+    count       = Signal(intbv(0, min=0, max=depth+1))
+    count_max   = Signal(intbv(0, min=0, max=depth+1))
+
+    toVerilog(fifo_multi_4, rst, clk, full, we, *(din + [empty, re] + dout + [afull, aempty, ovf, udf, count, count_max]))
+
+
+
+if __name__ == "__main__":
+    convert()
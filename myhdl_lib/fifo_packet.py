@@ -0,0 +1,181 @@
+from myhdl import *
+from fifo import fifo
+from fifo_speculative import fifo_speculative
+
+
+def fifo_packet(rst, clk, rx_vld, rx_sop, rx_eop, rx_dat, rx_mty, tx_rdy, tx_vld, tx_sop, tx_eop, tx_dat, tx_mty, rx_err=None, tx_err=None, pkt_count=None, pkt_rdy=None, drop=None, depth=None, cut_through=False):
+    """ Packet FIFO
+
+        Input interface, packetised data, see stream.bytecount:
+            rx_vld    (i) - valid data
+            rx_sop    (i) - start of packet
+            rx_eop    (i) - end of packet
+            rx_dat    (i) - data
+            rx_mty    (i) - empty bytes when rx_eop
+            rx_err    (i) - optional, the packet has an error, valid when rx_eop
+        Output interface, packetised data with handshake:
+            tx_rdy    (i) - ready, the data is read when tx_vld and tx_rdy
+            tx_vld    (o) - valid data
+            tx_sop, tx_eop, tx_dat, tx_mty - (o) as rx_*
+            tx_err    (o) - optional, cut-through only, the packet has an error, valid when tx_eop
+
+        Extra interface:
+            pkt_count (o) - number of complete packets (written up to the eop) in the fifo
+            pkt_rdy   (o) - asserted when there is at least one complete packet in the fifo
+            drop      (o) - pulse for each dropped packet (store-and-forward) or lost word (cut-through)
+
+        Parameters:
+            depth       - fifo depth in words, must be >= 2; if not set or set to `None` default value 2 is used
+            cut_through - False (default): store-and-forward, a packet is written speculatively and committed at its eop,
+                          i.e. can be read only when complete. A packet with an error and a packet that does not fit
+                          in the fifo are discarded, and the words left of a discarded packet are ignored up to its eop.
+                          True: cut-through, a word can be read in the clock cycle after it is written. The packets
+                          with an error are forwarded with tx_err. A word written when the fifo is full is lost.
+
+        There is no back pressure on the input interface; the output interface reads at full rate with no gaps between
+        the packets.
+    """
+    DW      = len(rx_dat)
+    MW      = len(rx_mty)
+    if (depth == None):
+        depth = 2
+    assert depth >= 2, "Fifo_packet parameter 'depth' must be >= 2, detected depth={}".format(depth)
+    assert (tx_err == None) or cut_through, "Fifo_packet: tx_err is used in cut-through mode only"
+
+    rx_err      = rx_err if (rx_err != None) else Signal(bool(0))
+    tx_err      = tx_err if (tx_err != None) else Signal(bool(0))
+    pkt_rdy     = pkt_rdy   if (pkt_rdy   != None) else Signal(bool(0))
+    drop        = drop      if (drop      != None) else Signal(bool(0))
+
+    WIDTH       = DW + MW + (3 if cut_through else 2)
+
+    f_full      = Signal(bool(0))
+    f_we        = Signal(bool(0))
+    f_din       = Signal(intbv(0)[WIDTH:])
+    f_empty     = Signal(bool(1))
+    f_re        = Signal(bool(0))
+    f_dout      = Signal(intbv(0)[WIDTH:])
+
+    pkt_cnt     = Signal(intbv(0, min=0, max=depth+1))
+    pkt_in      = Signal(bool(0))
+    pkt_out     = Signal(bool(0))
+
+    if not cut_through:
+        #=======================================================================
+        # Store-and-forward: commit at eop, discard on error or overflow
+        #=======================================================================
+        wr_commit   = Signal(bool(0))
+        wr_discard  = Signal(bool(0))
+        dropping    = Signal(bool(0))
+        dropping_eff= Signal(bool(0))
+
+        @always_comb
+        def dropping_comb():
+            dropping_eff.next   = dropping and not rx_sop
+
+        @always_comb
+        def wr_comb():
+            f_we.next           = rx_vld and not dropping_eff
+            f_din.next          = concat(rx_sop, rx_eop, rx_mty, rx_dat)
+
+        @always_comb
+        def commit_comb():
+            wr_commit.next      = rx_vld and rx_eop and not rx_err and not dropping_eff and not f_full
+            wr_discard.next     = rx_vld and not dropping_eff and ((rx_eop and rx_err) or f_full)
+            pkt_in.next         = rx_vld and rx_eop and not rx_err and not dropping_eff and not f_full
+
+        @always(clk.posedge)
+        def drop_proc():
+            if (rst):
+                dropping.next   = 0
+                drop.next       = 0
+            else:
+                drop.next       = wr_discard
+                if (wr_discard and not rx_eop):
+                    dropping.next = 1
+                elif (rx_vld and (rx_eop or rx_sop)):
+                    dropping.next = 0
+
+        fifo_i = fifo_speculative(rst, clk, f_full, f_we, f_din, f_empty, f_re, f_dout, wr_commit=wr_commit, wr_discard=wr_discard, depth=depth, width=WIDTH)
+
+        @always_comb
+        def rd_comb():
+            tx_vld.next     = not f_empty
+            f_re.next       = tx_rdy
+            tx_dat.next     = f_dout[DW:]
+            tx_mty.next     = f_dout[DW+MW:DW]
+            tx_eop.next     = f_dout[DW+MW]
+            tx_sop.next     = f_dout[DW+MW+1]
+
+    else:
+        #=======================================================================
+        # Cut-through: every word is readable after it is written
+        #=======================================================================
+        @always_comb
+        def wr_comb():
+            f_we.next       = rx_vld
+            f_din.next      = concat(rx_err, rx_sop, rx_eop, rx_mty, rx_dat)
+            pkt_in.next     = rx_vld and rx_eop and not f_full
+
+        @always(clk.posedge)
+        def drop_proc():
+            if (rst):
+                drop.next   = 0
+            else:
+                drop.next   = rx_vld and f_full
+
+        fifo_i = fifo(rst, clk, f_full, f_we, f_din, f_empty, f_re, f_dout, depth=depth, width=WIDTH)
+
+        @always_comb
+        def rd_comb():
+            tx_vld.next     = not f_empty
+            f_re.next       = tx_rdy
+            tx_dat.next     = f_dout[DW:]
+            tx_mty.next     = f_dout[DW+MW:DW]
+            tx_eop.next     = f_dout[DW+MW]
+            tx_sop.next     = f_dout[DW+MW+1]
+            tx_err.next     = f_dout[DW+MW+2]
+
+    #===========================================================================
+    # Packet count
+    #===========================================================================
+    @always_comb
+    def pkt_out_comb():
+        pkt_out.next    = tx_rdy and not f_empty and f_dout[DW+MW]
+
+    @always(clk.posedge)
+    def pkt_count_proc():
+        if (rst):
+            pkt_cnt.next    = 0
+        else:
+            if (pkt_in and not pkt_out):
+                pkt_cnt.next = pkt_cnt + 1
+            elif (pkt_out and not pkt_in):
+                pkt_cnt.next = pkt_cnt - 1
+
+    @always_comb
+    def pkt_rdy_comb():
+        pkt_rdy.next    = (pkt_cnt != 0)
+
+    if (pkt_count != None):
+        assert pkt_count.max > depth
+        @always_comb
+        def pkt_count_out():
+            pkt_count.next = pkt_cnt
+
+    return instances()
+
+
+def convert(depth=64, data_width=64, cut_through=False):
+    rst, clk   = [Signal(bool(0)) for _ in range(2)]
+    rx_vld, rx_sop, rx_eop, rx_err, tx_rdy, tx_vld, tx_sop, tx_eop, pkt_rdy, drop = [Signal(bool(0)) for _ in range(10)]
+    rx_dat, tx_dat = [Signal(intbv(0)[data_width:]) for _ in range(2)]
+    rx_mty, tx_mty = [Signal(intbv(0)[3:]) for _ in range(2)]
+    pkt_count = Signal(intbv(0, min=0, max=depth+1))
+
+    toVerilog(fifo_packet, rst, clk, rx_vld, rx_sop, rx_eop, rx_dat, rx_mty, tx_rdy, tx_vld, tx_sop, tx_eop, tx_dat, tx_mty, rx_err=rx_err, pkt_count=pkt_count, pkt_rdy=pkt_rdy, drop=drop, depth=depth, cut_through=cut_through)
+
+
+
+if __name__ == "__main__":
+    convert()
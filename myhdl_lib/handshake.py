@@ -1,6 +1,8 @@
 from myhdl import *
 from myhdl_lib.arbiter import arbiter
-from myhdl_lib.utils import assign
+from myhdl_lib.utils import assign, is_converting
+from myhdl_lib.mux import ls_mux
+from myhdl_lib import behavioral
 
 '''
     Handshake
@@ -56,116 +58,443 @@ from myhdl_lib.utils import assign
 
       For the moment we use the ready/valid naming, until a better one is proposed.
 
+    - A handshake tuple is (ready, valid) or (ready, valid, data), where data is a signal or a list of signals.
+      The hs_* components route the data of the handshake tuples together with ready and valid:
+        hs_join   - the output data is the list of the data of all inputs, in input order
+        hs_fork   - all outputs get the input data, also hs_fork_eager
+        hs_mux    - the output gets the data of the selected input
+        hs_demux  - all outputs get the input data, only the selected output is valid
+      An interface without data is allowed on the side that does not drive data, e.g. an output of hs_fork; its data
+      is not routed.
+      In simulation the data is routed by the same generator as ready and valid. In conversion each data signal is
+      routed by its own always block, since a list of signals of different widths is not convertible.
+
 
 '''
 
 
+def _hs_data(hs):
+    ''' List of the data signals of a handshake tuple, empty if the tuple has no data '''
+    if len(hs) < 3:
+        return []
+    if isinstance(hs[2], (list, tuple)):
+        return list(hs[2])
+    return [hs[2]]
+
+
+def _hs_broadcast_data(hsi, ls_hso):
+    ''' Data signals of all output handshake tuples that have data, output by output, that get the data of the input
+        handshake tuple: output data signal k gets _hs_data(hsi)[k % len(_hs_data(hsi))]
+    '''
+    F = len(_hs_data(hsi))
+    ls_hso_dat = []
+    for hso in ls_hso:
+        if len(hso) > 2:
+            ls_dat = _hs_data(hso)
+            assert len(ls_dat) == F, "Handshake: Expected {} output data signals, detected {}".format(F, len(ls_dat))
+            ls_hso_dat += ls_dat
+    return ls_hso_dat
+
+
+def _hs_fanout(di, ls_do):
+    ''' Drives a list of data signals with the same data '''
+    N = len(ls_do)
+
+    @always_comb
+    def _fanout():
+        for i in range(N):
+            ls_do[i].next = di
+
+    return _fanout
+
+
 def hs_join(ls_hsi, hso):
     """ [Many-to-one] Synchronizes (joins) a list of input handshake interfaces: output is ready when ALL inputs are ready
-            ls_hsi - (i) list of input handshake tuples (ready, valid)
-            hso    - (o) an output handshake tuple (ready, valid)
+            ls_hsi - (i) list of input handshake tuples (ready, valid[, data])
+            hso    - (o) an output handshake tuple (ready, valid[, data]), the output data is the list of all input data
     """
     N = len(ls_hsi)
-    ls_hsi_rdy, ls_hsi_vld = zip(*ls_hsi)
+    ls_hsi_rdy, ls_hsi_vld = zip(*[hsi[:2] for hsi in ls_hsi])
     ls_hsi_rdy, ls_hsi_vld = list(ls_hsi_rdy), list(ls_hsi_vld)
-    hso_rdy, hso_vld = hso
-
-    @always_comb
-    def _hsjoin():
-        all_vld = True
-        for i in range(N):
-            all_vld = all_vld and ls_hsi_vld[i]
-        hso_vld.next = all_vld
-        for i in range(N):
-            ls_hsi_rdy[i].next = all_vld and hso_rdy
+    hso_rdy, hso_vld = hso[:2]
+
+    ls_hso_dat = _hs_data(hso)
+    ls_hsi_dat = []
+    if ls_hso_dat:
+        ls_hsi_dat = [d for hsi in ls_hsi for d in _hs_data(hsi)]
+        assert len(ls_hsi_dat) == len(ls_hso_dat), "hs_join: Expected {} output data signals, detected {}".format(len(ls_hsi_dat), len(ls_hso_dat))
+        if is_converting():
+            _dat = [assign(ls_hso_dat[i], ls_hsi_dat[i]) for i in range(len(ls_hso_dat))]
+            ls_hsi_dat, ls_hso_dat = [], []
+    F = len(ls_hso_dat)
+
+    if F:
+        @always_comb
+        def _hsjoin():
+            all_vld = True
+            for i in range(N):
+                all_vld = all_vld and ls_hsi_vld[i]
+            hso_vld.next = all_vld
+            for i in range(N):
+                ls_hsi_rdy[i].next = all_vld and hso_rdy
+            for f in range(F):
+                ls_hso_dat[f].next = ls_hsi_dat[f]
+    else:
+        @always_comb
+        def _hsjoin():
+            all_vld = True
+            for i in range(N):
+                all_vld = all_vld and ls_hsi_vld[i]
+            hso_vld.next = all_vld
+            for i in range(N):
+                ls_hsi_rdy[i].next = all_vld and hso_rdy
 
-    return _hsjoin
+    return instances()
 
 
 def hs_fork(hsi, ls_hso):
     """ [One-to-many] Synchronizes (forks) to a list of output handshake interfaces: input is ready when ALL outputs are ready
-            hsi    - (i) input handshake tuple (ready, valid)
-            ls_hso - (o) list of output handshake tuples (ready, valid)
+            hsi    - (i) input handshake tuple (ready, valid[, data])
+            ls_hso - (o) list of output handshake tuples (ready, valid[, data]), all outputs get the input data
     """
     N = len(ls_hso)
-    hsi_rdy, hsi_vld = hsi
-    ls_hso_rdy, ls_hso_vld = zip(*ls_hso)
+    hsi_rdy, hsi_vld = hsi[:2]
+    ls_hso_rdy, ls_hso_vld = zip(*[hso[:2] for hso in ls_hso])
     ls_hso_rdy, ls_hso_vld = list(ls_hso_rdy), list(ls_hso_vld)
 
-    @always_comb
-    def _hsfork():
-        all_rdy = True
-        for i in range(N):
-            all_rdy = all_rdy and ls_hso_rdy[i]
-        hsi_rdy.next = all_rdy
-        for i in range(N):
-            ls_hso_vld[i].next = all_rdy and hsi_vld
+    ls_hsi_dat = _hs_data(hsi)
+    ls_hso_dat = _hs_broadcast_data(hsi, ls_hso)
+    if ls_hso_dat and is_converting():
+        _dat = [_hs_fanout(ls_hsi_dat[f], ls_hso_dat[f::len(ls_hsi_dat)]) for f in range(len(ls_hsi_dat))]
+        ls_hsi_dat, ls_hso_dat = [], []
+    F, D = len(ls_hsi_dat), len(ls_hso_dat)
+
+    if D:
+        @always_comb
+        def _hsfork():
+            all_rdy = True
+            for i in range(N):
+                all_rdy = all_rdy and ls_hso_rdy[i]
+            hsi_rdy.next = all_rdy
+            for i in range(N):
+                ls_hso_vld[i].next = all_rdy and hsi_vld
+            for k in range(D):
+                ls_hso_dat[k].next = ls_hsi_dat[k % F]
+    else:
+        @always_comb
+        def _hsfork():
+            all_rdy = True
+            for i in range(N):
+                all_rdy = all_rdy and ls_hso_rdy[i]
+            hsi_rdy.next = all_rdy
+            for i in range(N):
+                ls_hso_vld[i].next = all_rdy and hsi_vld
+
+    return instances()
+
+
+def hs_fork_eager(rst, clk, hsi, ls_hso):
+    """ [One-to-many] Eager fork to a list of output handshake interfaces: each output takes the input as soon as it is
+        ready, the input is ready when ALL outputs have taken it
+            hsi    - (i) input handshake tuple (ready, valid[, data])
+            ls_hso - (o) list of output handshake tuples (ready, valid[, data]), all outputs get the input data
+        A register keeps a "done" bit per output, set when the output takes the current input and cleared when the input
+        is consumed. An output stays not valid once done, so a slow output does not stall the others in every clock cycle.
+        There is no combinatorial path from hso_rdy to hso_vld.
+    """
+    N = len(ls_hso)
+    hsi_rdy, hsi_vld = hsi[:2]
+    ls_hso_rdy, ls_hso_vld = zip(*[hso[:2] for hso in ls_hso])
+    ls_hso_rdy, ls_hso_vld = list(ls_hso_rdy), list(ls_hso_vld)
+
+    ls_hsi_dat = _hs_data(hsi)
+    ls_hso_dat = _hs_broadcast_data(hsi, ls_hso)
+    if ls_hso_dat and is_converting():
+        _dat = [_hs_fanout(ls_hsi_dat[f], ls_hso_dat[f::len(ls_hsi_dat)]) for f in range(len(ls_hsi_dat))]
+        ls_hsi_dat, ls_hso_dat = [], []
+    F, D = len(ls_hsi_dat), len(ls_hso_dat)
+
+    done = Signal(intbv(0)[N:])
+    all_taken = Signal(bool(0))
+
+    if D:
+        @always_comb
+        def _hsfork():
+            taken = True
+            for i in range(N):
+                ls_hso_vld[i].next = hsi_vld and not done[i]
+                taken = taken and (done[i] or ls_hso_rdy[i])
+            all_taken.next = taken
+            hsi_rdy.next = taken
+            for k in range(D):
+                ls_hso_dat[k].next = ls_hsi_dat[k % F]
+    else:
+        @always_comb
+        def _hsfork():
+            taken = True
+            for i in range(N):
+                ls_hso_vld[i].next = hsi_vld and not done[i]
+                taken = taken and (done[i] or ls_hso_rdy[i])
+            all_taken.next = taken
+            hsi_rdy.next = taken
+
+    @always(clk.posedge)
+    def _done():
+        if (rst):
+            done.next = 0
+        elif (hsi_vld):
+            if (all_taken):
+                done.next = 0
+            else:
+                x = intbv(0)[N:]
+                for i in range(N):
+                    x[i] = done[i] or ls_hso_rdy[i]
+                done.next = x
 
-    return _hsfork
+    return instances()
 
 
 def hs_mux(sel, ls_hsi, hso):
     """ [Many-to-one] Multiplexes a list of input handshake interfaces
             sel    - (i) selects an input handshake interface to be connected to the output
-            ls_hsi - (i) list of input handshake tuples (ready, valid)
-            hso    - (o) output handshake tuple (ready, valid)
+            ls_hsi - (i) list of input handshake tuples (ready, valid[, data])
+            hso    - (o) output handshake tuple (ready, valid[, data]), the output gets the data of the selected input
     """
     N = len(ls_hsi)
-    ls_hsi_rdy, ls_hsi_vld = zip(*ls_hsi)
+    ls_hsi_rdy, ls_hsi_vld = zip(*[hsi[:2] for hsi in ls_hsi])
     ls_hsi_rdy, ls_hsi_vld = list(ls_hsi_rdy), list(ls_hsi_vld)
-    hso_rdy, hso_vld = hso
-
-    @always_comb
-    def _hsmux():
-        hso_vld.next = 0
-        for i in range(N):
-            ls_hsi_rdy[i].next = 0
-            if i == sel:
-                hso_vld.next = ls_hsi_vld[i]
-                ls_hsi_rdy[i].next = hso_rdy
+    hso_rdy, hso_vld = hso[:2]
+
+    ls_hso_dat = _hs_data(hso)
+    ls_hsi_dat = []
+    if ls_hso_dat:
+        lsls_hsi_dat = [_hs_data(hsi) for hsi in ls_hsi]
+        for ls_dat in lsls_hsi_dat:
+            assert len(ls_dat) == len(ls_hso_dat), "hs_mux: Expected {} input data signals, detected {}".format(len(ls_hso_dat), len(ls_dat))
+        ls_hsi_dat = [d for ls_dat in lsls_hsi_dat for d in ls_dat]
+        if is_converting():
+            _dat = ls_mux(sel, lsls_hsi_dat, ls_hso_dat)
+            ls_hsi_dat, ls_hso_dat = [], []
+    F = len(ls_hso_dat)
+
+    if F:
+        @always_comb
+        def _hsmux():
+            hso_vld.next = 0
+            for f in range(F):
+                ls_hso_dat[f].next = 0
+            for i in range(N):
+                ls_hsi_rdy[i].next = 0
+                if i == sel:
+                    hso_vld.next = ls_hsi_vld[i]
+                    ls_hsi_rdy[i].next = hso_rdy
+                    for f in range(F):
+                        ls_hso_dat[f].next = ls_hsi_dat[i*F + f]
+    else:
+        @always_comb
+        def _hsmux():
+            hso_vld.next = 0
+            for i in range(N):
+                ls_hsi_rdy[i].next = 0
+                if i == sel:
+                    hso_vld.next = ls_hsi_vld[i]
+                    ls_hsi_rdy[i].next = hso_rdy
 
-    return _hsmux
+    return instances()
 
 
 def hs_demux(sel, hsi, ls_hso):
     """ [One-to-many] Demultiplexes to a list of output handshake interfaces
             sel    - (i) selects an output handshake interface to connect to the input
-            hsi    - (i) input handshake tuple (ready, valid)
-            ls_hso - (o) list of output handshake tuples (ready, valid)
+            hsi    - (i) input handshake tuple (ready, valid[, data])
+            ls_hso - (o) list of output handshake tuples (ready, valid[, data]), all outputs get the input data
     """
     N = len(ls_hso)
-    hsi_rdy, hsi_vld = hsi
-    ls_hso_rdy, ls_hso_vld = zip(*ls_hso)
+    hsi_rdy, hsi_vld = hsi[:2]
+    ls_hso_rdy, ls_hso_vld = zip(*[hso[:2] for hso in ls_hso])
     ls_hso_rdy, ls_hso_vld = list(ls_hso_rdy), list(ls_hso_vld)
 
+    ls_hsi_dat = _hs_data(hsi)
+    ls_hso_dat = _hs_broadcast_data(hsi, ls_hso)
+    if ls_hso_dat and is_converting():
+        _dat = [_hs_fanout(ls_hsi_dat[f], ls_hso_dat[f::len(ls_hsi_dat)]) for f in range(len(ls_hsi_dat))]
+        ls_hsi_dat, ls_hso_dat = [], []
+    F, D = len(ls_hsi_dat), len(ls_hso_dat)
+
+    if D:
+        @always_comb
+        def _hsdemux():
+            hsi_rdy.next = 0
+            for i in range(N):
+                ls_hso_vld[i].next = 0
+                if i == sel:
+                    hsi_rdy.next = ls_hso_rdy[i]
+                    ls_hso_vld[i].next = hsi_vld
+            for k in range(D):
+                ls_hso_dat[k].next = ls_hsi_dat[k % F]
+    else:
+        @always_comb
+        def _hsdemux():
+            hsi_rdy.next = 0
+            for i in range(N):
+                ls_hso_vld[i].next = 0
+                if i == sel:
+                    hsi_rdy.next = ls_hso_rdy[i]
+                    ls_hso_vld[i].next = hsi_vld
+
+    return instances()
+
+
+def hs_register(rst, clk, hsi, hso, di=None, do=None, REG_TYPE="full"):
+    """ [One-to-one] Register slice: cuts the combinatorial paths of a handshake interface at full throughput
+            hsi    - (i) input handshake tuple (ready, valid[, data])
+            hso    - (o) output handshake tuple (ready, valid[, data])
+            di     - (i) optional, input data, transferred with hsi; if not set, the data of hsi is used
+            do     - (o) optional, output data, transferred with hso, len(do) == len(di); if not set, the data of hso is used
+            REG_TYPE - "forward":  valid and data are registered, ready is combinatorial, 1 entry
+                       "backward": ready is registered, valid and data are combinatorial, 1 entry that stores the input
+                                   when the output is not ready
+                       "full" (default): valid, data and ready are registered, a skid buffer of 2 entries
+        The latency is 1 clock cycle for "forward" and "full", 0 for "backward". A transfer can happen on both the input
+        and the output in every clock cycle.
+    """
+    assert REG_TYPE in ("forward", "backward", "full"), "Hs_register: Unknown register type: {}".format(REG_TYPE)
+    if (di == None) and (do == None) and (len(hsi) > 2) and (len(hso) > 2):
+        ls_di, ls_do = _hs_data(hsi), _hs_data(hso)
+        assert len(ls_di) == 1 and len(ls_do) == 1, "Hs_register: Expected one data signal per handshake tuple"
+        di, do = ls_di[0], ls_do[0]
+    assert (di == None) == (do == None), "Hs_register: di and do must be set together"
+    hsi_rdy, hsi_vld = hsi[:2]
+    hso_rdy, hso_vld = hso[:2]
+    di = di if (di != None) else Signal(bool(0))
+    do = do if (do != None) else Signal(bool(0))
+    assert len(di) == len(do), "Hs_register: Expected len(di) == len(do), detected len(di)={}, len(do)={}".format(len(di), len(do))
+
+    if (REG_TYPE == "forward"):
+        vld_r = Signal(bool(0))
+        dat_r = Signal(intbv(0)[len(di):])
+
+        @always_comb
+        def _rdy():
+            hsi_rdy.next = hso_rdy or not vld_r
+
+        @always(clk.posedge)
+        def _reg():
+            if (rst):
+                vld_r.next = 0
+            elif (hso_rdy or not vld_r):
+                vld_r.next = hsi_vld
+                if (hsi_vld):
+                    dat_r.next = di
+
+        @always_comb
+        def _out():
+            hso_vld.next = vld_r
+            do.next = dat_r
+
+    elif (REG_TYPE == "backward"):
+        skid_vld = Signal(bool(0))
+        skid_dat = Signal(intbv(0)[len(di):])
+
+        @always_comb
+        def _out():
+            hsi_rdy.next = not skid_vld
+            if (skid_vld):
+                hso_vld.next = 1
+                do.next = skid_dat
+            else:
+                hso_vld.next = hsi_vld
+                do.next = di
+
+        @always(clk.posedge)
+        def _reg():
+            if (rst):
+                skid_vld.next = 0
+            elif (skid_vld):
+                if (hso_rdy):
+                    skid_vld.next = 0
+            elif (hsi_vld and not hso_rdy):
+                skid_vld.next = 1
+                skid_dat.next = di
+
+    else:
+        vld_r = Signal(bool(0))
+        dat_r = Signal(intbv(0)[len(di):])
+        skid_vld = Signal(bool(0))
+        skid_dat = Signal(intbv(0)[len(di):])
+
+        @always(clk.posedge)
+        def _reg():
+            if (rst):
+                vld_r.next = 0
+                skid_vld.next = 0
+            elif (hso_rdy or not vld_r):
+                # The output register is free: load it from the skid register or from the input
+                if (skid_vld):
+                    vld_r.next = 1
+                    dat_r.next = skid_dat
+                    skid_vld.next = 0
+                else:
+                    vld_r.next = hsi_vld
+                    if (hsi_vld):
+                        dat_r.next = di
+            elif (hsi_vld and not skid_vld):
+                # The output is stalled: the input goes to the skid register
+                skid_vld.next = 1
+                skid_dat.next = di
+
+        @always_comb
+        def _out():
+            hsi_rdy.next = not skid_vld
+            hso_vld.next = vld_r
+            do.next = dat_r
+
+    return instances()
+
+
+def _hs_gate(en, hsi, hso):
+    ''' Connects the input handshake to the output handshake when en, otherwise blocks both '''
+    hsi_rdy, hsi_vld = hsi[:2]
+    hso_rdy, hso_vld = hso[:2]
+
     @always_comb
-    def _hsdemux():
-        hsi_rdy.next = 0
-        for i in range(N):
-            ls_hso_vld[i].next = 0
-            if i == sel:
-                hsi_rdy.next = ls_hso_rdy[i]
-                ls_hso_vld[i].next = hsi_vld
+    def _gate():
+        hso_vld.next = hsi_vld and en
+        hsi_rdy.next = hso_rdy and en
 
-    return _hsdemux
+    return _gate
 
 
-def hs_arbmux(rst, clk, ls_hsi, hso, sel, ARBITER_TYPE="priority"):
+def hs_arbmux(rst, clk, ls_hsi, hso, sel, ARBITER_TYPE="priority", weights=None, quantums=None, pkt_len=None):
     """ [Many-to-one] Arbitrates a list of input handshake interfaces.
         Selects one of the active input interfaces and connects it to the output.
         Active input is an input interface with asserted "valid" signal
-            ls_hsi - (i) list of input handshake tuples (ready, valid)
-            hso    - (o) output handshake tuple (ready, valid)
+            ls_hsi - (i) list of input handshake tuples (ready, valid[, data])
+            hso    - (o) output handshake tuple (ready, valid[, data]), the output gets the data of the selected input
             sel    - (o) indicates the currently selected input handshake interface
-            ARBITER_TYPE - selects the arbiter type to be used, "priority" or "roundrobin"
+            ARBITER_TYPE - selects the arbiter type to be used, "priority", "roundrobin", "roundrobin_pp", "matrix",
+                           "weighted_rr" or "deficit_rr", see arbiter
+            weights  - "weighted_rr" only, per input number of transfers in a turn, see arbiter_weighted_rr
+            quantums - "deficit_rr" only, per input quantum, see arbiter_deficit_rr
+            pkt_len  - (i) "deficit_rr" only, length of the transfer on the selected input, default 1; when
+                           the selected input has no deficit left, no input is connected to the output
     """
+    if behavioral.is_enabled() and ARBITER_TYPE in behavioral.ARBITER_TYPES:
+        return behavioral.hs_arbmux(rst, clk, ls_hsi, hso, sel, ARBITER_TYPE=ARBITER_TYPE)
+
     N = len(ls_hsi)
-    ls_hsi_rdy, ls_hsi_vld = zip(*ls_hsi)
+    ls_hsi_rdy, ls_hsi_vld = zip(*[hsi[:2] for hsi in ls_hsi])
     ls_hsi_vld = list(ls_hsi_vld)
 
     # Needed to avoid: "myhdl.ConversionError: Signal in multiple list is not supported:"
     ls_vld = [Signal(bool(0)) for _ in range(N)]
     _a = [assign(ls_vld[i], ls_hsi_vld[i]) for i in range(N)]
+    # The arbiters take a vector of requests, req_vec[i] = ls_vld[i]
+    if (N > 1):
+        req_vec = ConcatSignal(*reversed(ls_vld))
+    else:
+        req_vec = Signal(intbv(0)[1:])
+        _req = assign(req_vec, ls_vld[0])
 
     sel_s = Signal(intbv(0, min=0, max=N))
     @always_comb
@@ -174,37 +503,55 @@ def hs_arbmux(rst, clk, ls_hsi, hso, sel, ARBITER_TYPE="priority"):
 
     priority_update = None
 
-    if (ARBITER_TYPE == "roundrobin"):
-        hso_rdy, hso_vld = hso
+    if (ARBITER_TYPE != "priority"):
+        hso_rdy, hso_vld = hso[:2]
         priority_update = Signal(bool(0))
 
         @always_comb
         def _prio():
             priority_update.next = hso_rdy and hso_vld
 
-    _arb = arbiter(rst=rst, clk=clk, req_vec=ls_vld, gnt_idx=sel_s, gnt_rdy=priority_update, ARBITER_TYPE=ARBITER_TYPE)
-
-    _mux = hs_mux(sel=sel_s, ls_hsi=ls_hsi, hso=hso)
+    if (ARBITER_TYPE == "deficit_rr"):
+        # The selected input is connected only when it is granted
+        gnt_vld = Signal(bool(0))
+        hso_mux = (Signal(bool(0)), Signal(bool(0))) + tuple(hso[2:])
+        _gate = _hs_gate(gnt_vld, hso_mux, hso)
+        _arb = arbiter(rst=rst, clk=clk, req_vec=req_vec, gnt_idx=sel_s, gnt_vld=gnt_vld, gnt_rdy=priority_update, ARBITER_TYPE=ARBITER_TYPE, quantums=quantums, pkt_len=pkt_len)
+        _mux = hs_mux(sel=sel_s, ls_hsi=ls_hsi, hso=hso_mux)
+    else:
+        _arb = arbiter(rst=rst, clk=clk, req_vec=req_vec, gnt_idx=sel_s, gnt_rdy=priority_update, ARBITER_TYPE=ARBITER_TYPE, weights=weights)
+        _mux = hs_mux(sel=sel_s, ls_hsi=ls_hsi, hso=hso)
 
     return instances()
 
 
-def hs_arbdemux(rst, clk, hsi, ls_hso, sel, ARBITER_TYPE="priority"):
+def hs_arbdemux(rst, clk, hsi, ls_hso, sel, ARBITER_TYPE="priority", weights=None, quantums=None, pkt_len=None):
     """ [One-to-many] Arbitrates a list output handshake interfaces
         Selects one of the active output interfaces and connects it to the input.
         Active is an output interface with asserted "ready" signal
-            hsi    - (i) input handshake tuple (ready, valid)
-            ls_hso - (o) list of output handshake tuples (ready, valid)
+            hsi    - (i) input handshake tuple (ready, valid[, data])
+            ls_hso - (o) list of output handshake tuples (ready, valid[, data]), all outputs get the input data
             sel    - (o) indicates the currently selected output handshake interface
-            ARBITER_TYPE - selects the type of arbiter to be used, "priority" or "roundrobin"
+            ARBITER_TYPE - selects the type of arbiter to be used, "priority", "roundrobin", "roundrobin_pp", "matrix",
+                           "weighted_rr" or "deficit_rr", see arbiter
+            weights, quantums, pkt_len - as hs_arbmux, per output
     """
+    if behavioral.is_enabled() and ARBITER_TYPE in behavioral.ARBITER_TYPES:
+        return behavioral.hs_arbdemux(rst, clk, hsi, ls_hso, sel, ARBITER_TYPE=ARBITER_TYPE)
+
     N = len(ls_hso)
-    ls_hso_rdy, ls_hso_vld = zip(*ls_hso)
+    ls_hso_rdy, ls_hso_vld = zip(*[hso[:2] for hso in ls_hso])
     ls_hso_rdy = list(ls_hso_rdy)
 
     # Needed to avoid: "myhdl.ConversionError: Signal in multiple list is not supported:"
     ls_rdy = [Signal(bool(0)) for _ in range(N)]
     _a = [assign(ls_rdy[i], ls_hso_rdy[i]) for i in range(N)]
+    # The arbiters take a vector of requests, req_vec[i] = ls_rdy[i]
+    if (N > 1):
+        req_vec = ConcatSignal(*reversed(ls_rdy))
+    else:
+        req_vec = Signal(intbv(0)[1:])
+        _req = assign(req_vec, ls_rdy[0])
 
     sel_s = Signal(intbv(0, min=0, max=len(ls_rdy)))
     @always_comb
@@ -212,17 +559,24 @@ def hs_arbdemux(rst, clk, hsi, ls_hso, sel, ARBITER_TYPE="priority"):
         sel.next = sel_s
 
     priority_update = None
-    if (ARBITER_TYPE == "roundrobin"):
-        shi_rdy, hsi_vld = hsi
+    if (ARBITER_TYPE != "priority"):
+        shi_rdy, hsi_vld = hsi[:2]
         priority_update = Signal(bool(0))
 
         @always_comb
         def _prio():
             priority_update.next = shi_rdy and hsi_vld
 
-    _arb = arbiter(rst=rst, clk=clk, req_vec=ls_rdy, gnt_idx=sel_s, gnt_rdy=priority_update, ARBITER_TYPE=ARBITER_TYPE)
-
-    _demux = hs_demux(sel_s, hsi, ls_hso)
+    if (ARBITER_TYPE == "deficit_rr"):
+        # The selected output is connected only when it is granted
+        gnt_vld = Signal(bool(0))
+        hsi_demux = (Signal(bool(0)), Signal(bool(0))) + tuple(hsi[2:])
+        _gate = _hs_gate(gnt_vld, hsi, hsi_demux)
+        _arb = arbiter(rst=rst, clk=clk, req_vec=req_vec, gnt_idx=sel_s, gnt_vld=gnt_vld, gnt_rdy=priority_update, ARBITER_TYPE=ARBITER_TYPE, quantums=quantums, pkt_len=pkt_len)
+        _demux = hs_demux(sel_s, hsi_demux, ls_hso)
+    else:
+        _arb = arbiter(rst=rst, clk=clk, req_vec=req_vec, gnt_idx=sel_s, gnt_rdy=priority_update, ARBITER_TYPE=ARBITER_TYPE, weights=weights)
+        _demux = hs_demux(sel_s, hsi, ls_hso)
 
     return instances()
 
@@ -1,18 +1,215 @@
 from myhdl import *
+from myhdl_lib import behavioral
+from myhdl_lib.mem_image import mem_image, _depth
+from myhdl_lib.mux import mux
+from myhdl_lib.utils import assign, is_converting_vhdl
 
-def rom(addr, dout, CONTENT):
-    ''' CONTENT == tuple of non-sparse values '''
-    @always_comb
-    def read():
-        dout.next = CONTENT[int(addr)]
 
-    return read
+MEM_BACKENDS = ("signals", "packed")
+
+_mem_backend = "signals"
+
+
+def set_mem_backend(MEM_BACKEND):
+    ''' Sets the memory backend of the RAMs that are elaborated from now on with MEM_BACKEND=None
+            MEM_BACKEND - "signals": the memory is a list of signals, convertible (default)
+                          "packed" : simulation only, the memory is a compact array and only the read ports are signals;
+                                     the read-first/write-first/asynchronous-read behavior is the same
+    '''
+    global _mem_backend
+    assert MEM_BACKEND in MEM_BACKENDS, "Unknown memory backend: {}".format(MEM_BACKEND)
+    _mem_backend = MEM_BACKEND
+
+
+def get_mem_backend():
+    return _mem_backend
+
+
+def _packed(MEM_BACKEND):
+    ''' True if the RAM should be elaborated with the packed (behavioral) memory model '''
+    if MEM_BACKEND == None:
+        MEM_BACKEND = _mem_backend
+    assert MEM_BACKEND in MEM_BACKENDS, "Unknown memory backend: {}".format(MEM_BACKEND)
+    return (MEM_BACKEND == "packed") or behavioral.is_enabled()
+
 
+class _lazy_str(object):
+    ''' Object whose string value is computed by func when first needed, e.g. when user-defined HDL is generated '''
+    def __init__(self, func):
+        self.func = func
+        self.val = None
 
-def ram_sp_rf(clk, we, addr, di, do):
-    ''' RAM: Single-Port, Read-First '''
+    def __str__(self):
+        if self.val == None:
+            self.val = self.func()
+        return self.val
 
-    memL = [Signal(intbv(0)[len(di):]) for _ in range(2**len(addr))]
+
+def _read_latency(READ_LATENCY, NATIVE):
+    ''' Returns the read latency of a RAM: READ_LATENCY, or the NATIVE latency of the RAM if READ_LATENCY is None '''
+    if READ_LATENCY == None:
+        return NATIVE
+    assert READ_LATENCY >= NATIVE, "RAM: READ_LATENCY must be >= {}, detected READ_LATENCY={}".format(NATIVE, READ_LATENCY)
+    return READ_LATENCY
+
+
+def _read_reg(clk, di, do):
+    ''' Output register of a RAM read port '''
+    @always(clk.posedge)
+    def read_reg():
+        do.next = di
+
+    return read_reg
+
+
+def _ram_verilog(INIT, PORTS, READ, ns):
+    ''' Returns (init_file, __verilog__): the user-defined Verilog of a RAM
+            INIT  - mem_image or None; if set the memory is initialized by $readmemh from init_file
+            PORTS - list of ports, a port is a tuple of the names of its signals in ns: (clk, we, addrw, addrr, di, do)
+            READ  - "rf", "wf" or "ar"
+            ns    - namespace of the RAM function, the signals of the ports
+        The $readmemh file is generated when the Verilog code is generated.
+        A byte-enable we is unrolled into a write per byte lane with constant part-selects, the coding style of the
+        byte-write RAM templates of the FPGA vendors.
+        There is no VHDL counterpart: converted by toVHDL, a RAM with INIT or a byte-enable we is an error.
+    '''
+    assert not is_converting_vhdl(), "RAM: A RAM with INIT or a byte-enable we can be converted only to Verilog, detected toVHDL"
+    do = PORTS[0][5]
+    AW, W = len(ns[PORTS[0][3]]), len(ns[PORTS[0][4]])
+    D = _depth(ns[PORTS[0][3]])
+    init_file = None
+
+    mem = "%({})s_mem".format(do)
+    code = ["reg [{}:0] {} [0:{}];".format(W-1, mem, D-1)]
+    if INIT != None:
+        init_file = _lazy_str(lambda: INIT.readmemh_file(D, W))
+        code += ['initial $readmemh("%(init_file)s", {});'.format(mem)]
+
+    for p in PORTS:
+        clk, we, addrw, addrr, di, do = ["%({})s".format(n) for n in p]
+        for n in p[:5]:
+            ns[n].read = True
+        NB = len(ns[p[1]])
+        if NB == 1:
+            lanes = [(we, "")]
+        else:
+            lanes = [("{}[{}]".format(we, i), "[{}:{}]".format(8*i+7, 8*i)) for i in range(NB)]
+
+        if READ == "wf" and p[2] == p[3]:
+            ns[p[5]].driven = "reg"
+            code += ["always @(posedge {}) begin".format(clk)]
+            for en, sl in lanes:
+                code += ["    if ({}) begin".format(en),
+                         "        {}[{}]{} <= {}{};".format(mem, addrw, sl, di, sl),
+                         "        {}{} <= {}{};".format(do, sl, di, sl),
+                         "    end",
+                         "    else begin",
+                         "        {}{} <= {}[{}]{};".format(do, sl, mem, addrr, sl),
+                         "    end"]
+            code += ["end"]
+            continue
+
+        if READ == "wf":
+            addrr_r = "{}_addrr_r".format(do)
+            code += ["reg [{}:0] {};".format(AW-1, addrr_r)]
+        code += ["always @(posedge {}) begin".format(clk)]
+        code += ["    if ({}) {}[{}]{} <= {}{};".format(en, mem, addrw, sl, di, sl) for en, sl in lanes]
+        if READ == "rf":
+            ns[p[5]].driven = "reg"
+            code += ["    {} <= {}[{}];".format(do, mem, addrr),
+                     "end"]
+        elif READ == "wf":
+            ns[p[5]].driven = "wire"
+            code += ["    {} <= {};".format(addrr_r, addrr),
+                     "end",
+                     "assign {} = {}[{}];".format(do, mem, addrr_r)]
+        else:
+            ns[p[5]].driven = "wire"
+            code += ["end",
+                     "assign {} = {}[{}];".format(do, mem, addrr)]
+
+    return init_file, "\n".join(code)
+
+
+def rom(addr, dout, CONTENT, clk=None, READMEMH=None):
+    ''' ROM
+            addr     - (i) address
+            dout     - (o) data
+            CONTENT  - tuple of non-sparse values, or mem_image, or file path or buffer, see mem_image
+            clk      - (i) optional, if set the output is registered: dout is updated at the rising edge of clk
+            READMEMH - optional, if True the ROM is converted as a reg array initialized by $readmemh from a file,
+                       instead of a case statement with a branch per value, see mem_image.readmemh_file;
+                       default True if CONTENT is not a tuple; toVHDL always converts the case statement
+    '''
+    if READMEMH == None:
+        READMEMH = not isinstance(CONTENT, tuple)
+    if is_converting_vhdl():
+        READMEMH = False
+
+    INIT = mem_image.get(CONTENT)
+    W = len(dout)
+    if isinstance(CONTENT, tuple):
+        DEPTH = len(CONTENT)
+    else:
+        # Decoded also for the case statement, which is converted from a tuple of values
+        DEPTH = _depth(addr)
+        if dout.min < 0:
+            CONTENT = tuple((w - (1 << W)) if (w >> (W-1)) else w for w in INIT.words(DEPTH, W))
+        else:
+            CONTENT = tuple(INIT.words(DEPTH, W))
+
+    if READMEMH:
+        init_file = _lazy_str(lambda: INIT.readmemh_file(DEPTH, W))
+        addr.read = True
+        code = ["reg [{}:0] %(dout)s_rom [0:{}];".format(W-1, DEPTH-1),
+                'initial $readmemh("%(init_file)s", %(dout)s_rom);']
+        if clk == None:
+            dout.driven = "wire"
+            code += ["assign %(dout)s = %(dout)s_rom[%(addr)s];"]
+        else:
+            clk.read = True
+            dout.driven = "reg"
+            code += ["always @(posedge %(clk)s) begin",
+                     "    %(dout)s <= %(dout)s_rom[%(addr)s];",
+                     "end"]
+        __verilog__ = "\n".join(code)
+
+    if clk == None:
+        @always_comb
+        def read():
+            dout.next = CONTENT[int(addr)]
+    else:
+        @always(clk.posedge)
+        def read():
+            dout.next = CONTENT[int(addr)]
+
+    return read
+
+
+def ram_sp_rf(clk, we, addr, di, do, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Single-Port, Read-First
+            we           - (i) write enable, or byte-enable vector of len(di)/8 bits: we[i] writes di[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 1 (default); each cycle
+                           more adds an output register to the read port, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 1)
+    if READ_LATENCY > 1:
+        do_r = Signal(do.val)
+        ram = ram_sp_rf(clk, we, addr, di, do_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_reg = _read_reg(clk, do_r, do)
+        return ram, read_reg
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_sp_rf(clk, we, addr, di, do, INIT)
+    if (INIT != None) or (len(we) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clk", "we", "addr", "addr", "di", "do")], "rf", locals())
+        return behavioral.ram_sp_rf(clk, we, addr, di, do, INIT)
+
+    memL = [Signal(intbv(0)[len(di):]) for _ in range(_depth(addr))]
 
     @always(clk.posedge)
     def write():
@@ -24,10 +221,30 @@ def ram_sp_rf(clk, we, addr, di, do):
     return write
 
 
-def ram_sp_wf(clk, we, addr, di, do):
-    ''' RAM: Single-Port, Write-First '''
-
-    memL = [Signal(intbv(0)[len(di):]) for _ in range(2**len(addr))]
+def ram_sp_wf(clk, we, addr, di, do, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Single-Port, Write-First
+            we           - (i) write enable, or byte-enable vector of len(di)/8 bits: we[i] writes di[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 1 (default); each cycle
+                           more adds an output register to the read port, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 1)
+    if READ_LATENCY > 1:
+        do_r = Signal(do.val)
+        ram = ram_sp_wf(clk, we, addr, di, do_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_reg = _read_reg(clk, do_r, do)
+        return ram, read_reg
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_sp_wf(clk, we, addr, di, do, INIT)
+    if (INIT != None) or (len(we) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clk", "we", "addr", "addr", "di", "do")], "wf", locals())
+        return behavioral.ram_sp_wf(clk, we, addr, di, do, INIT)
+
+    memL = [Signal(intbv(0)[len(di):]) for _ in range(_depth(addr))]
 
     @always(clk.posedge)
     def write():        
@@ -40,10 +257,30 @@ def ram_sp_wf(clk, we, addr, di, do):
     return write
 
 
-def ram_sp_ar(clk, we, addr, di, do):
-    ''' RAM: Single-Port, Asynchronous Read '''
-
-    memL = [Signal(intbv(0)[len(di):]) for _ in range(2**len(addr))]
+def ram_sp_ar(clk, we, addr, di, do, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Single-Port, Asynchronous Read
+            we           - (i) write enable, or byte-enable vector of len(di)/8 bits: we[i] writes di[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 0 (default); each cycle
+                           more adds an output register to the read port, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 0)
+    if READ_LATENCY > 0:
+        do_r = Signal(do.val)
+        ram = ram_sp_ar(clk, we, addr, di, do_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_reg = _read_reg(clk, do_r, do)
+        return ram, read_reg
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_sp_ar(clk, we, addr, di, do, INIT)
+    if (INIT != None) or (len(we) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clk", "we", "addr", "addr", "di", "do")], "ar", locals())
+        return behavioral.ram_sp_ar(clk, we, addr, di, do, INIT)
+
+    memL = [Signal(intbv(0)[len(di):]) for _ in range(_depth(addr))]
 
     @always(clk.posedge)
     def write():
@@ -57,10 +294,30 @@ def ram_sp_ar(clk, we, addr, di, do):
     return write, read
 
 
-def ram_sdp_rf(clk, we, addrw, addrr, di, do):
-    ''' RAM: Simple-Dual-Port, Read-First '''
-
-    memL = [Signal(intbv(0)[len(di):]) for _ in range(2**len(addrr))]
+def ram_sdp_rf(clk, we, addrw, addrr, di, do, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Simple-Dual-Port, Read-First
+            we           - (i) write enable, or byte-enable vector of len(di)/8 bits: we[i] writes di[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 1 (default); each cycle
+                           more adds an output register to the read port, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 1)
+    if READ_LATENCY > 1:
+        do_r = Signal(do.val)
+        ram = ram_sdp_rf(clk, we, addrw, addrr, di, do_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_reg = _read_reg(clk, do_r, do)
+        return ram, read_reg
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_sdp_rf(clk, we, addrw, addrr, di, do, INIT)
+    if (INIT != None) or (len(we) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clk", "we", "addrw", "addrr", "di", "do")], "rf", locals())
+        return behavioral.ram_sdp_rf(clk, we, addrw, addrr, di, do, INIT)
+
+    memL = [Signal(intbv(0)[len(di):]) for _ in range(_depth(addrr))]
 
     @always(clk.posedge)
     def write():
@@ -71,10 +328,30 @@ def ram_sdp_rf(clk, we, addrw, addrr, di, do):
     return write
 
 
-def ram_sdp_wf(clk, we, addrw, addrr, di, do):
-    ''' RAM: Simple-Dual-Port, Write-First '''
-
-    memL = [Signal(intbv(0)[len(di):]) for _ in range(2**len(addrr))]
+def ram_sdp_wf(clk, we, addrw, addrr, di, do, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Simple-Dual-Port, Write-First
+            we           - (i) write enable, or byte-enable vector of len(di)/8 bits: we[i] writes di[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 1 (default); each cycle
+                           more adds an output register to the read port, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 1)
+    if READ_LATENCY > 1:
+        do_r = Signal(do.val)
+        ram = ram_sdp_wf(clk, we, addrw, addrr, di, do_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_reg = _read_reg(clk, do_r, do)
+        return ram, read_reg
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_sdp_wf(clk, we, addrw, addrr, di, do, INIT)
+    if (INIT != None) or (len(we) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clk", "we", "addrw", "addrr", "di", "do")], "wf", locals())
+        return behavioral.ram_sdp_wf(clk, we, addrw, addrr, di, do, INIT)
+
+    memL = [Signal(intbv(0)[len(di):]) for _ in range(_depth(addrr))]
     addrr_r = Signal(intbv(0)[len(addrr):])
 
     @always(clk.posedge)
@@ -90,10 +367,30 @@ def ram_sdp_wf(clk, we, addrw, addrr, di, do):
     return write, read
 
 
-def ram_sdp_ar(clk, we, addrw, addrr, di, do):
-    ''' RAM: Simple-Dual-Port, Asynchronous Read'''
-
-    memL = [Signal(intbv(0)[len(di):]) for _ in range(2**len(addrr))]
+def ram_sdp_ar(clk, we, addrw, addrr, di, do, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Simple-Dual-Port, Asynchronous Read
+            we           - (i) write enable, or byte-enable vector of len(di)/8 bits: we[i] writes di[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 0 (default); each cycle
+                           more adds an output register to the read port, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 0)
+    if READ_LATENCY > 0:
+        do_r = Signal(do.val)
+        ram = ram_sdp_ar(clk, we, addrw, addrr, di, do_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_reg = _read_reg(clk, do_r, do)
+        return ram, read_reg
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_sdp_ar(clk, we, addrw, addrr, di, do, INIT)
+    if (INIT != None) or (len(we) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clk", "we", "addrw", "addrr", "di", "do")], "ar", locals())
+        return behavioral.ram_sdp_ar(clk, we, addrw, addrr, di, do, INIT)
+
+    memL = [Signal(intbv(0)[len(di):]) for _ in range(_depth(addrr))]
 
     @always(clk.posedge)
     def write():
@@ -107,10 +404,31 @@ def ram_sdp_ar(clk, we, addrw, addrr, di, do):
     return write, read
 
 
-def ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob):
-    ''' RAM: Dual-Port, Read-First '''
-
-    memL = [Signal(intbv(0)[len(dia):]) for _ in range(2**len(addra))]
+def ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Dual-Port, Read-First
+            wea, web     - (i) write enables, or byte-enable vectors of len(dia)/8 bits: wea[i] writes dia[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 1 (default); each cycle
+                           more adds an output register to the read ports, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 1)
+    if READ_LATENCY > 1:
+        doa_r, dob_r = Signal(doa.val), Signal(dob.val)
+        ram = ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa_r, dob_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_rega = _read_reg(clka, doa_r, doa)
+        read_regb = _read_reg(clkb, dob_r, dob)
+        return ram, read_rega, read_regb
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT)
+    if (INIT != None) or (len(wea) > 1) or (len(web) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clka", "wea", "addra", "addra", "dia", "doa"), ("clkb", "web", "addrb", "addrb", "dib", "dob")], "rf", locals())
+        return behavioral.ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT)
+
+    memL = [Signal(intbv(0)[len(dia):]) for _ in range(_depth(addra))]
 
     @always(clka.posedge)
     def writea():
@@ -129,10 +447,31 @@ def ram_dp_rf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob):
     return writea, writeb
 
 
-def ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob):
-    ''' RAM: Dual-Port, Write-First '''
-
-    memL = [Signal(intbv(0)[len(dia):]) for _ in range(2**len(addra))]
+def ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Dual-Port, Write-First
+            wea, web     - (i) write enables, or byte-enable vectors of len(dia)/8 bits: wea[i] writes dia[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 1 (default); each cycle
+                           more adds an output register to the read ports, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 1)
+    if READ_LATENCY > 1:
+        doa_r, dob_r = Signal(doa.val), Signal(dob.val)
+        ram = ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa_r, dob_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_rega = _read_reg(clka, doa_r, doa)
+        read_regb = _read_reg(clkb, dob_r, dob)
+        return ram, read_rega, read_regb
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT)
+    if (INIT != None) or (len(wea) > 1) or (len(web) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clka", "wea", "addra", "addra", "dia", "doa"), ("clkb", "web", "addrb", "addrb", "dib", "dob")], "wf", locals())
+        return behavioral.ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT)
+
+    memL = [Signal(intbv(0)[len(dia):]) for _ in range(_depth(addra))]
 
     @always(clka.posedge)
     def writea():
@@ -153,10 +492,31 @@ def ram_dp_wf(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob):
     return writea, writeb
 
 
-def ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob):
-    ''' RAM: Dual-Port, Asynchronous Read '''
-
-    memL = [Signal(intbv(0)[len(dia):]) for _ in range(2**len(addra))]
+def ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT=None, MEM_BACKEND=None, READ_LATENCY=None):
+    ''' RAM: Dual-Port, Asynchronous Read
+            wea, web     - (i) write enables, or byte-enable vectors of len(dia)/8 bits: wea[i] writes dia[8*i+8:8*i]
+            INIT         - optional, initial contents: mem_image, or file path or buffer, see mem_image
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+            READ_LATENCY - optional, clock cycles from the read address to the read data, >= 0 (default); each cycle
+                           more adds an output register to the read ports, e.g. the output register of a block RAM
+    '''
+    READ_LATENCY = _read_latency(READ_LATENCY, 0)
+    if READ_LATENCY > 0:
+        doa_r, dob_r = Signal(doa.val), Signal(dob.val)
+        ram = ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa_r, dob_r, INIT, MEM_BACKEND, READ_LATENCY-1)
+        read_rega = _read_reg(clka, doa_r, doa)
+        read_regb = _read_reg(clkb, dob_r, dob)
+        return ram, read_rega, read_regb
+
+    INIT = mem_image.get(INIT)
+    if _packed(MEM_BACKEND):
+        return behavioral.ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT)
+    if (INIT != None) or (len(wea) > 1) or (len(web) > 1):
+        # Simulated by the packed model, converted as user-defined Verilog
+        init_file, __verilog__ = _ram_verilog(INIT, [("clka", "wea", "addra", "addra", "dia", "doa"), ("clkb", "web", "addrb", "addrb", "dib", "dob")], "ar", locals())
+        return behavioral.ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob, INIT)
+
+    memL = [Signal(intbv(0)[len(dia):]) for _ in range(_depth(addra))]
 
     @always(clka.posedge)
     def writea():
@@ -179,6 +539,77 @@ def ram_dp_ar(clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob):
     return writea, reada, writeb, readb
 
 
+def _lvt_read(clk, lvt, addr, sel, READ):
+    ''' Read port of the live value table of ram_mp: sel = lvt[addr], registered if READ is "rf" '''
+    if READ == "rf":
+        @always(clk.posedge)
+        def lvt_read():
+            sel.next = lvt[addr]
+    else:
+        @always_comb
+        def lvt_read():
+            sel.next = lvt[addr]
+
+    return lvt_read
+
+
+def ram_mp(clk, we, addrw, di, addrr, do, READ="rf", MEM_BACKEND=None):
+    ''' RAM: Multi-Port, M write ports and N read ports, built from Simple-Dual-Port RAMs
+            clk          - (i) clock
+            we           - (i) write enables, list of M signals, or a signal if M=1
+            addrw        - (i) write addresses, list of M signals, or a signal if M=1
+            di           - (i) write data, list of M signals, or a signal if M=1
+            addrr        - (i) read addresses, list of N signals
+            do           - (o) read data, list of N signals
+            READ         - "rf": synchronous read, read-first, as ram_sdp_rf (default)
+                           "ar": asynchronous read, as ram_sdp_ar
+            MEM_BACKEND  - optional, "signals" or "packed", see set_mem_backend
+        Configurations:
+            M=1 - replication: N RAMs, one per read port, all written by the write port
+            M>1 - live value table (LVT): M*N RAMs, one per write and read port pair, written by the write port and read
+                  by the read port. The LVT, a table of registers, holds for each address the index of the write port
+                  that wrote it last, and selects the RAM that each read port outputs
+        Both configurations are conflict free: in every clock cycle every read port reads any address and every write port
+        writes any address, with no bank conflicts and no stalls, so the reads per clock cycle scale with N. A read of an
+        address written in the same clock cycle returns the old data ("rf"), as the RAMs. When several write ports write
+        the same address in the same clock cycle, the write port with the highest index wins.
+        Resources: M*N RAMs of the memory size; for M>1 also one LVT register per address of ceil(log2(M)) bits, and an
+        M-to-1 mux per read port
+    '''
+    if not isinstance(we, (list, tuple)):
+        we, addrw, di = [we], [addrw], [di]
+    assert READ in ("rf", "ar"), "ram_mp: READ must be \"rf\" or \"ar\", detected READ={}".format(READ)
+    assert len(we) == len(addrw) == len(di), "ram_mp: Expected the same number of write enables, addresses and data"
+    assert len(addrr) == len(do), "ram_mp: Expected the same number of read addresses and data"
+    M, N = len(we), len(addrr)
+    ram_sdp = ram_sdp_rf if (READ == "rf") else ram_sdp_ar
+
+    if M == 1:
+        rams = [ram_sdp(clk, we[0], addrw[0], addrr[r], di[0], do[r], MEM_BACKEND=MEM_BACKEND) for r in range(N)]
+        return rams
+
+    lvt         = [Signal(intbv(0, min=0, max=M)) for _ in range(_depth(addrw[0]))]
+    lvt_we      = [Signal(bool(0)) for _ in range(M)]
+    lvt_addr    = [Signal(intbv(0)[len(addrw[0]):]) for _ in range(M)]
+    lvt_connect = [assign(lvt_we[w], we[w]) for w in range(M)] + [assign(lvt_addr[w], addrw[w]) for w in range(M)]
+
+    @always(clk.posedge)
+    def lvt_write():
+        for w in range(M):
+            if lvt_we[w]:
+                lvt[lvt_addr[w]].next = w
+
+    rams, lvt_reads, muxes = [], [], []
+    for r in range(N):
+        ram_do = [Signal(do[r].val) for _ in range(M)]
+        sel = Signal(intbv(0, min=0, max=M))
+        rams += [ram_sdp(clk, we[w], addrw[w], addrr[r], di[w], ram_do[w], MEM_BACKEND=MEM_BACKEND) for w in range(M)]
+        lvt_reads += [_lvt_read(clk, lvt, addrr[r], sel, READ)]
+        muxes += [mux(sel, ram_do, do[r])]
+
+    return rams, lvt_connect, lvt_write, lvt_reads, muxes
+
+
 #===============================================================================
 # Conversion functions
 #===============================================================================
@@ -298,6 +729,20 @@ def convert_ram_dp_ar(ADDR_WIDTH=8, DATA_WIDTH=8):
     toVerilog(ram_dp_ar, clka, clkb, wea, web, addra, addrb, dia, dib, doa, dob)
 
 
+def convert_ram_mp(ADDR_WIDTH=8, DATA_WIDTH=8, READ="rf"):
+    ''' Convert RAM: Multi-Port, 2 write ports, 4 read ports '''
+    def ram_mp_2w4r(clk, we0, we1, addrw0, addrw1, di0, di1, addrr0, addrr1, addrr2, addrr3, do0, do1, do2, do3):
+        return ram_mp(clk, [we0, we1], [addrw0, addrw1], [di0, di1], [addrr0, addrr1, addrr2, addrr3], [do0, do1, do2, do3], READ=READ)
+
+    clk = Signal(bool(0))
+    we = [Signal(bool(0)) for _ in range(2)]
+    addrw = [Signal(intbv(0)[ADDR_WIDTH:]) for _ in range(2)]
+    di = [Signal(intbv(0)[DATA_WIDTH:]) for _ in range(2)]
+    addrr = [Signal(intbv(0)[ADDR_WIDTH:]) for _ in range(4)]
+    do = [Signal(intbv(0)[DATA_WIDTH:]) for _ in range(4)]
+    toVerilog(ram_mp_2w4r, clk, *(we + addrw + di + addrr + do))
+
+
 
 
 if __name__ == "__main__":
@@ -311,4 +756,5 @@ if __name__ == "__main__":
     convert_ram_dp_rf()
     convert_ram_dp_wf()
     convert_ram_dp_ar()
+    convert_ram_mp()
 
@@ -0,0 +1,209 @@
+import os
+import re
+import sys
+import mmap
+import hashlib
+import binascii
+from array import array
+from myhdl import toVerilog
+
+
+_readmemh_dir = None
+
+
+def set_readmemh_dir(path):
+    ''' Sets the directory of the $readmemh files generated from now on, see mem_image.readmemh_file
+            path - directory; None: the directory of the converted Verilog, toVerilog.directory (default)
+    '''
+    global _readmemh_dir
+    _readmemh_dir = path
+
+
+def _typecode(width):
+    ''' Typecode of the smallest array item that fits a word of width bits, None if the word is wider than all items '''
+    for tc in "BHIL":
+        if array(tc).itemsize*8 >= width:
+            return tc
+    return None
+
+
+def _depth(addr):
+    ''' Number of words of a memory addressed by the signal addr: addr.max if the address has a range, else 2**len(addr) '''
+    return addr.max if (addr.max != None) else 2**len(addr)
+
+
+def _storage(depth, width):
+    ''' Returns zero-initialized storage of depth words of width bits: an array of the smallest item type that fits the
+        words, or a list if the words are wider than the largest item type
+    '''
+    tc = _typecode(width)
+    if tc == None:
+        return depth*[0]
+    return array(tc, [0])*depth
+
+
+_HEX_RE = re.compile(r"//[^\n]*|/\*.*?\*/|@([0-9a-fA-F_]+)|([0-9a-fA-FxXzZ_]+)", re.S)
+
+
+class mem_image(object):
+    ''' Contents of a memory: initializes a RAM or a ROM, and dumps the RAM contents at the end of a simulation
+            src    - file path (str), or buffer (bytearray, buffer, memoryview, mmap) with the initial contents,
+                     or tuple or list of words; None: all zeros
+            FORMAT - "hex": text as read by the Verilog $readmemh, hex words separated by white space, @address and
+                            comments allowed
+                     "bin": raw words, little endian, (width+7)//8 bytes per word
+                     None : "hex" for a file path ending in .hex or .mem, "bin" otherwise
+        A file is memory-mapped and decoded when the first memory that uses the image is elaborated; the decoded
+        words are kept for the other memories of the same size.
+        When converted, a memory initialized from an image declares a reg array and initializes it with $readmemh from
+        the source file, if it is a hex file, or from a hex file generated next to the converted Verilog, see
+        set_readmemh_dir. The path is absolute, the HDL simulator may run in another directory.
+        $readmemh is Verilog only: toVHDL converts a ROM initialized from an image as a case statement, see rom, and
+        rejects a RAM initialized from an image.
+        An image can initialize several memories; dump then needs the memory to dump, see dump.
+    '''
+
+    def __init__(self, src=None, FORMAT=None):
+        if FORMAT == None:
+            if isinstance(src, basestring) and os.path.splitext(src)[1].lower() in (".hex", ".mem"):
+                FORMAT = "hex"
+            else:
+                FORMAT = "bin"
+        assert FORMAT in ("hex", "bin"), "mem_image: Unknown format: {}".format(FORMAT)
+        self.src = src
+        self.FORMAT = FORMAT
+        self._words = {}
+        self._mems = []
+
+    @classmethod
+    def get(cls, INIT):
+        ''' Returns INIT as a mem_image: None, a mem_image, or the src of a new mem_image '''
+        if INIT == None or isinstance(INIT, mem_image):
+            return INIT
+        return cls(INIT)
+
+    def _buffer(self):
+        ''' Returns (buffer, file) with the source data; file is None if the source is not a file '''
+        if not isinstance(self.src, basestring):
+            return str(bytearray(self.src)), None
+        f = open(self.src, "rb")
+        if os.fstat(f.fileno()).st_size == 0:
+            return "", f
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), f
+
+    def _decode(self, depth, width):
+        mem = _storage(depth, width)
+        if self.src == None:
+            return mem
+        mask = (1 << width) - 1
+        if isinstance(self.src, (tuple, list)):
+            assert len(self.src) <= depth, "mem_image: {} words do not fit depth {}".format(len(self.src), depth)
+            for i, w in enumerate(self.src):
+                mem[i] = int(w) & mask
+            return mem
+        buf, f = self._buffer()
+        try:
+            if self.FORMAT == "hex":
+                addr = 0
+                for m in _HEX_RE.finditer(buf):
+                    if m.group(1):
+                        addr = int(m.group(1).replace("_", ""), 16)
+                    elif m.group(2):
+                        assert addr < depth, "mem_image: Address {} out of range, depth {}".format(addr, depth)
+                        mem[addr] = int(re.sub("[xXzZ]", "0", m.group(2).replace("_", "")), 16) & mask
+                        addr += 1
+            else:
+                # Decoded from slices of the buffer, a mapped file is not copied as a whole
+                nbytes = (width + 7)//8
+                n = len(buf)//nbytes
+                assert n <= depth, "mem_image: {} words do not fit depth {}".format(n, depth)
+                if isinstance(mem, array) and mem.itemsize == nbytes:
+                    CHUNK = (1 << 16)
+                    for i in range(0, n, CHUNK):
+                        j = min(i + CHUNK, n)
+                        a = array(mem.typecode)
+                        a.fromstring(buf[i*nbytes:j*nbytes])
+                        if sys.byteorder == "big":
+                            a.byteswap()
+                        mem[i:j] = a
+                else:
+                    for i in range(n):
+                        mem[i] = int(binascii.hexlify(buf[i*nbytes:(i+1)*nbytes][::-1]), 16)
+                if width < 8*nbytes:
+                    for i in range(n):
+                        mem[i] &= mask
+        finally:
+            if f != None:
+                if not isinstance(buf, basestring):
+                    buf.close()
+                f.close()
+        return mem
+
+    def words(self, depth, width):
+        ''' Returns the contents as depth words of width bits, in an array if the words fit an array item, else in a list '''
+        key = (depth, width)
+        if key not in self._words:
+            self._words[key] = self._decode(depth, width)
+        return self._words[key]
+
+    def storage(self, depth, width):
+        ''' Returns a new copy of the contents, to be used as memory storage '''
+        return self.words(depth, width)[:]
+
+    def bind(self, mem, width):
+        ''' Binds the image to a memory mem (list of signals or storage) initialized from it, whose contents can be
+            dumped; the memories are bound in the order they are elaborated
+        '''
+        self._mems.append((mem, width))
+
+    def dump(self, path, FORMAT=None, index=None):
+        ''' Writes the current contents of a bound memory to the file path
+                FORMAT - "hex" or "bin"; None: "hex" for a path ending in .hex or .mem, "bin" otherwise
+                index  - the memory to dump, in the order the memories initialized from the image were elaborated;
+                         required if the image initializes more than one memory, e.g. if it is shared by several
+                         RAMs or if the design is elaborated more than once
+            Call dump from the testbench before the simulation stops: at the end of a simulation MyHDL resets all
+            signals, including the memory signals of the "signals" backend, to their initial values
+        '''
+        assert len(self._mems) > 0, "mem_image: Not bound to a memory"
+        if index == None:
+            assert len(self._mems) == 1, "mem_image: Bound to {} memories, select one with index".format(len(self._mems))
+            index = 0
+        mem, width = self._mems[index]
+        if FORMAT == None:
+            FORMAT = "hex" if os.path.splitext(path)[1].lower() in (".hex", ".mem") else "bin"
+        words = [int(w) for w in mem]
+        with open(path, "wb") as f:
+            if FORMAT == "hex":
+                f.write(self._hex(words, width))
+            else:
+                nbytes = (width + 7)//8
+                tc = _typecode(width)
+                if tc != None and array(tc).itemsize == nbytes:
+                    a = array(tc, words)
+                    if sys.byteorder == "big":
+                        a.byteswap()
+                    f.write(a.tostring())
+                else:
+                    f.write("".join(binascii.unhexlify("{:0{}x}".format(w, 2*nbytes))[::-1] for w in words))
+
+    @staticmethod
+    def _hex(words, width):
+        digits = (width + 3)//4
+        return "".join("{:0{}x}\n".format(w, digits) for w in words)
+
+    def readmemh_file(self, depth, width):
+        ''' Returns the absolute path of a $readmemh file with the contents: the source file, if it is a hex file, or
+            a file generated in the directory set by set_readmemh_dir, by default the directory of the converted Verilog
+        '''
+        if isinstance(self.src, basestring) and self.FORMAT == "hex":
+            return os.path.abspath(self.src)
+        directory = _readmemh_dir
+        if directory == None:
+            directory = toVerilog.directory or ""
+        text = self._hex(self.words(depth, width), width)
+        path = os.path.abspath(os.path.join(directory, "mem_{}.hex".format(hashlib.sha1(text).hexdigest()[:16])))
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(text)
+        return path
@@ -4,7 +4,17 @@ Created on Mar 1, 2014
 @author: nkavaldj
 '''
 class sfifo_beh:
-    ''' Speculative FIFO: behavioral model '''
+    ''' Speculative FIFO: behavioral model
+
+        The data are kept in a ring buffer of size depth, addressed by the same four pointers as in the RTL:
+
+        rd                        srd            wr                        swr            rd
+        ^                         ^              v                         v              ^
+        |#########################|%%%%%%%%%%%%%%|*************************|..............|
+        |<-- speculatively read ->|<- committed >|<- speculatively written>|<-- empty --->|
+
+        All operations, including commit and discard, are O(1).
+    '''
 
     COMMIT = 0
     DISCARD = 1
@@ -12,14 +22,20 @@ class sfifo_beh:
 
     def __init__(self, depth, afull_th=None, aempty_th=None):
         self.depth = depth
-        self.data = [] # Data (written, committed, not read )
-        self.data_sw = [] # Speculatively written data
-        self.data_sr = [] # Speculatively read data
+        self.buf = depth*[None]
+        self.rd = 0 # First speculatively read cell
+        self.srd = 0 # First committed cell (data written, committed, not read)
+        self.wr = 0 # First speculatively written cell
+        self.swr = 0 # First empty cell
+        self.sr_count = 0 # Speculatively read data
+        self.data_count = 0 # Data written, committed, not read
+        self.sw_count = 0 # Speculatively written data
         self.afull_th = afull_th if (afull_th != None) else depth//2
         self.aempty_th = aempty_th if (aempty_th != None) else depth//2
         self.ovf = False
         self.udf = False
         self.count_max = 0
+        self.clocked = False # Almost full/empty flags are updated at the first clock after reset
 
     def reset(self):
         self.__init__(self.depth, self.afull_th, self.aempty_th)
@@ -28,13 +44,13 @@ class sfifo_beh:
         return self.getCount() == self.depth
 
     def isEmpty(self):
-        return len(self.data) == 0
+        return self.data_count == 0
 
     def isAFull(self):
-        return (self.depth - self.getCount()) <= self.afull_th
+        return self.clocked and (self.depth - self.getCount()) <= self.afull_th
 
     def isAEmpty(self):
-        return len(self.data) <= self.aempty_th
+        return not self.clocked or self.data_count <= self.aempty_th
 
     def isOvf(self):
         return self.ovf
@@ -43,50 +59,73 @@ class sfifo_beh:
         return self.udf
 
     def getCount(self):
-        return len(self.data_sr) + len(self.data) + len(self.data_sw)
+        return self.sr_count + self.data_count + self.sw_count
 
     def getCountMax(self):
         return self.count_max
 
     def getDout(self):
-        return self.data[0]
+        if self.data_count == 0:
+            raise IndexError("sfifo_beh: no data to read")
+        return self.buf[self.srd]
 
 
     def _rcmd(self, cmd):
         if (cmd == self.DISCARD or cmd == self.DISCARD_COMMIT):
-            self.data = self.data_sr + self.data
-            self.data_sr = []
+            self.srd = self.rd
+            self.data_count += self.sr_count
+            self.sr_count = 0
         elif (cmd == self.COMMIT):
-            self.data_sr = []
+            self.rd = self.srd
+            self.sr_count = 0
 
     def _wcmd(self, cmd):
         if (cmd == self.DISCARD or cmd == self.DISCARD_COMMIT):
-            self.data_sw = []
+            self.swr = self.wr
+            self.sw_count = 0
         elif (cmd == self.COMMIT):
-            self.data.extend(self.data_sw)
-            self.data_sw = []
+            self.wr = self.swr
+            self.data_count += self.sw_count
+            self.sw_count = 0
+
+    def _push(self, val):
+        self.buf[self.swr] = val
+        self.swr = (self.swr + 1) % self.depth
+        self.sw_count += 1
+
+    def _pop(self):
+        x = self.buf[self.srd]
+        self.srd = (self.srd + 1) % self.depth
+        self.data_count -= 1
+        self.sr_count += 1
+        return x
+
+    def _update_count_max(self):
+        if (self.getCount() > self.count_max):
+            self.count_max = self.getCount()
 
     def command(self, wcmd=None, rcmd=None):
+        self.clocked = True
         self._wcmd(wcmd)
         self._rcmd(rcmd)
 
     def write(self, val, wcmd=None, rcmd=None):
+        self.clocked = True
         if (not self.isFull()):
-            self.data_sw.append(val)
+            self._push(val)
         else:
             self.ovf = True
 
         self._wcmd(wcmd)
         self._rcmd(rcmd)
 
-        if (self.getCount() > self.count_max):
-            self.count_max = self.getCount()
+        self._update_count_max()
 
     def read(self, wcmd=None, rcmd=None):
+        self.clocked = True
         x = None
         if (not self.isEmpty()):
-            x = self.data.pop(0)
-            self.data_sr.append(x)
+            x = self._pop()
         else:
             self.udf = True
 
@@ -96,11 +135,12 @@ class sfifo_beh:
         return x
 
     def write_read(self, val, wcmd=None, rcmd=None):
+        self.clocked = True
         full = self.isFull()
         empty = self.isEmpty()
 
         if (not full):
-            self.data_sw.append(val)
+            self._push(val)
         else:
             self.ovf = True
 
@@ -108,21 +148,15 @@ class sfifo_beh:
 
         x = None
         if (not empty):
-            x = self.data.pop(0)
-            self.data_sr.append(x)
+            x = self._pop()
         else:
             self.udf = True
 
         self._rcmd(rcmd)
 
-        if (self.getCount() > self.count_max):
-            self.count_max = self.getCount()
+        self._update_count_max()
         return x
 
 
     def status(self):
-        return "FULL = {:}, EMPTY = {:}, COUNT = {:3}, AFULL = {:}, AEMPTY = {:}, OVF = {:}, UDF = {:}, COUNT_MAX = {:}, DOUT = {:}".format(int(self.isFull()), int(self.isEmpty()), int(self.getCount()), int(self.isAFull()), int(self.isAEmpty()), int(self.isOvf()), int(self.isUdf()), self.getCountMax(), self.data[0] if len(self.data)>0 else None)
-
-
-
-        return "FULL = {:}, EMPTY = {:}, COUNT = {:3}, AFULL = {:}, AEMPTY = {:}, OVF = {:}, UDF = {:}, COUNT_MAX = {:}, DOUT = {:}".format(int(self.isFull()), int(self.isEmpty()), int(self.count()), int(self.isAFull()), int(self.isAEmpty()), int(self.isOvf()), int(self.isUdf()), self.maxCount(), self.data[0] if len(self.data)>0 else None)
\ No newline at end of file
+        return "FULL = {:}, EMPTY = {:}, COUNT = {:3}, AFULL = {:}, AEMPTY = {:}, OVF = {:}, UDF = {:}, COUNT_MAX = {:}, DOUT = {:}".format(int(self.isFull()), int(self.isEmpty()), int(self.getCount()), int(self.isAFull()), int(self.isAEmpty()), int(self.isOvf()), int(self.isUdf()), self.getCountMax(), self.buf[self.srd] if self.data_count>0 else None)
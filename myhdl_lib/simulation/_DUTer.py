@@ -1,9 +1,18 @@
 import os
 import sys
+import glob
+import shutil
+import hashlib
+import itertools
+import time
+import tempfile
 import fileinput
 
 from myhdl import toVerilog, toVHDL, Cosimulation, traceSignals
 
+from myhdl_lib import behavioral, mem
+from command import run_command, run_commands
+
 
 class DUTer(object):
     ''' Returns a simulation instance of a MyHDL function, intended as a DUT in testbench
@@ -16,6 +25,9 @@ class DUTer(object):
         '''  '''
         self._simulator = "myhdl"
         self._trace = False
+        self._behavioral = False
+        self._cache_dir = None
+        self._timing = []
 
         self.sim_reg = {}
 
@@ -23,16 +35,19 @@ class DUTer(object):
             name="icarus",
             hdl="Verilog",
             analyze_cmd='iverilog -o {topname}.o tb_{topname}.v {topname}.v',
-            simulate_cmd="vvp -m ./myhdl.vpi {topname}.o"
+            simulate_cmd="vvp -m ./myhdl.vpi {topname}.o",
+            artifacts=["{topname}.o"]
         )
 
-    def registerSimulator(self, name=None, hdl=None, analyze_cmd=None, elaborate_cmd=None, simulate_cmd=None):
+    def registerSimulator(self, name=None, hdl=None, analyze_cmd=None, elaborate_cmd=None, simulate_cmd=None, artifacts=None):
         ''' Registers an HDL _simulator
                 name - str, user defined name, used to identify this _simulator record
                 hdl - str, case insensitive, (verilog, vhdl), the HDL to which the simulated MyHDL code will be converted
                 analyze_cmd - str, system command that will be run to analyze the generated HDL
                 elaborate_cmd - str, optional, system command that will be run after the analyze phase
                 simulate_cmd - str, system command that will be run to simulate the analyzed and elaborated design
+                artifacts - list of str, optional, files or directories produced by the analyze and elaborate phases and
+                            needed by simulate_cmd; only designs of simulators with artifacts can be cached (see enableCache)
                 Before execution of a command string the following substitutions take place:
                     {topname} is substituted with the name of the simulated MyHDL function
         '''
@@ -47,8 +62,12 @@ class DUTer(object):
                 raise ValueError("Invalid elaborate_cmd command")
         if not isinstance(simulate_cmd, str) or (simulate_cmd.strip() == ""):
             raise ValueError("Invalid _simulator command")
+        if artifacts is not None:
+            if isinstance(artifacts, str) or not all(isinstance(a, str) and (a.strip() != "") for a in artifacts):
+                raise ValueError("Invalid artifacts list")
+            artifacts = tuple(artifacts)
 
-        self.sim_reg[name] = (hdl.lower(), analyze_cmd, elaborate_cmd, simulate_cmd)
+        self.sim_reg[name] = (hdl.lower(), analyze_cmd, elaborate_cmd, simulate_cmd, artifacts)
 
     def selectSimulator(self, simulatorName):
         if not simulatorName:
@@ -63,6 +82,147 @@ class DUTer(object):
     def disableTrace(self):
         self._trace = False
 
+    def enableBehavioral(self):
+        ''' MyHDL simulations elaborate the library components with their behavioral models, see myhdl_lib.behavioral
+            Co-simulations are not affected, the converted HDL is always generated from the RTL
+        '''
+        self._behavioral = True
+
+    def disableBehavioral(self):
+        self._behavioral = False
+
+    def enableCache(self, cache_dir=None):
+        ''' Enables the on-disk cache of analyzed and elaborated designs
+                cache_dir - str, optional, cache directory, can be shared between processes;
+                            if not set, $MYHDL_LIB_CACHE is used, or ~/.cache/myhdl_lib if the variable is not set
+            A design is looked up by a hash of the generated HDL, the simulator record and the command strings.
+            On a hit the artifacts of the simulator record are copied from the cache and the analyze and
+            elaborate phases are skipped.
+        '''
+        if cache_dir is None:
+            cache_dir = os.environ.get("MYHDL_LIB_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "myhdl_lib"))
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self._cache_dir = os.path.abspath(cache_dir)
+
+    def disableCache(self):
+        self._cache_dir = None
+
+    def getTiming(self):
+        ''' Returns the wall time of the co-simulation preparation phases, as a list of (topname, phase, seconds)
+            in execution order. Phases: "convert", "analyze", "elaborate", "cache" (design restored from the cache)
+        '''
+        return list(self._timing)
+
+    def getTimingTotals(self):
+        ''' Returns a dict {phase: total seconds} of the co-simulation preparation phases '''
+        totals = {}
+        for _, phase, t in self._timing:
+            totals[phase] = totals.get(phase, 0) + t
+        return totals
+
+    def clearTiming(self):
+        self._timing = []
+
+    def _vals(self, func):
+        ''' Returns the substitutions for the command strings of func '''
+        return {'topname': func.func_name, 'unitname': func.func_name.lower()}
+
+    def _convert(self, hdl, func, vals, **kwargs):
+        ''' Converts func to HDL in the current directory
+            The behavioral models and the packed memory backend are not convertible, the RTL is used
+        '''
+        t0 = time.time()
+        enabled = behavioral.is_enabled()
+        mem_backend = mem.get_mem_backend()
+        behavioral.disable()
+        mem.set_mem_backend("signals")
+        try:
+            if hdl == "verilog":
+                toVerilog(func, **kwargs)
+                if self._trace:
+                    self._enableTracesVerilog("./tb_{topname}.v".format(**vals))
+            elif hdl == "vhdl":
+                toVHDL(func, **kwargs)
+        finally:
+            if enabled:
+                behavioral.enable()
+            mem.set_mem_backend(mem_backend)
+        self._timing.append((vals['topname'], "convert", time.time() - t0))
+
+    def precompile(self, designs, processes=None):
+        ''' Converts, analyzes and elaborates several designs for the selected simulator, and stores them in the cache
+                designs - list of (func, kwargs) tuples: MyHDL function and dict of its interface assignments
+                processes - optional, max number of analyze/elaborate commands running at the same time
+            The designs are converted one by one, each in a private directory, then the analyze commands of all designs
+            run concurrently, followed by the elaborate commands. The cache must be enabled; later instantiations of the
+            same designs are restored from the cache.
+        '''
+        hdlsim = self._simulator
+        if not self.sim_reg.has_key(hdlsim):
+            raise ValueError("Simulator {} is not registered".format(hdlsim))
+        if not self._cache_dir:
+            raise ValueError("Precompile requires the cache to be enabled")
+        hdl, analyze_cmd, elaborate_cmd, simulate_cmd, artifacts = self.sim_reg[hdlsim]
+        if not artifacts:
+            raise ValueError("Simulator {} has no artifacts to be cached".format(hdlsim))
+
+        root = tempfile.mkdtemp(prefix="precompile_")
+        cwd = os.getcwd()
+        try:
+            pending = []
+            keys = set()
+            for i, (func, kwargs) in enumerate(designs):
+                vals = self._vals(func)
+                wdir = os.path.join(root, str(i))
+                os.mkdir(wdir)
+                os.chdir(wdir)
+                try:
+                    self._convert(hdl, func, vals, **kwargs)
+                    key = self._cacheKey(hdlsim, vals)
+                finally:
+                    os.chdir(cwd)
+                if (key not in keys) and not os.path.isdir(os.path.join(self._cache_dir, key)):
+                    keys.add(key)
+                    pending.append((key, wdir, vals))
+
+            for phase, cmd in (("analyze", analyze_cmd), ("elaborate", elaborate_cmd)):
+                if cmd:
+                    results = run_commands([cmd.format(**vals) for _, _, vals in pending], cwd=[wdir for _, wdir, _ in pending], processes=processes)
+                    for (_, _, vals), r in zip(pending, results):
+                        self._timing.append((vals['topname'], phase, r.elapsed))
+
+            for key, wdir, vals in pending:
+                os.chdir(wdir)
+                try:
+                    self._cacheStore(key, artifacts, vals)
+                finally:
+                    os.chdir(cwd)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def precompileSweep(self, func, kwargs, sweep, processes=None):
+        ''' Precompiles a parameter sweep of a design, see precompile
+                func - MyHDL function
+                kwargs - dict of func interface assignments common to all sweep points
+                sweep - dict {parameter name: list of values}; all combinations of the values are precompiled
+                processes - optional, max number of analyze/elaborate commands running at the same time
+            MyHDL conversion turns parameters into constants and signal widths, so each sweep point is a separate design.
+            The sweep points are compiled concurrently, and the sweep then runs from the cache:
+
+                getDut.enableCache()
+                getDut.precompileSweep(fifo, kwargs, {"depth": [4, 8, 16]})
+                for d in [4, 8, 16]:
+                    dut = getDut(fifo, depth=d, **kwargs)
+        '''
+        names = sorted(sweep)
+        designs = []
+        for values in itertools.product(*[sweep[n] for n in names]):
+            kw = dict(kwargs)
+            kw.update(zip(names, values))
+            designs.append((func, kw))
+        self.precompile(designs, processes)
+
     def _getCosimulation(self, func, **kwargs):
         ''' Returns a co-simulation instance of func. 
             Uses the _simulator specified by self._simulator. 
@@ -70,34 +230,106 @@ class DUTer(object):
                 func - MyHDL function to be simulated
                 kwargs - dict of func interface assignments: for signals and parameters
         '''
-        vals = {}
-        vals['topname'] = func.func_name
-        vals['unitname'] = func.func_name.lower()
+        vals = self._vals(func)
         hdlsim = self._simulator
         if not hdlsim:
             raise ValueError("No _simulator specified")
         if not self.sim_reg.has_key(hdlsim):
             raise ValueError("Simulator {} is not registered".format(hdlsim))
 
-        hdl, analyze_cmd, elaborate_cmd, simulate_cmd = self.sim_reg[hdlsim]
+        hdl, analyze_cmd, elaborate_cmd, simulate_cmd, artifacts = self.sim_reg[hdlsim]
 
         # Convert to HDL
-        if hdl == "verilog":
-            toVerilog(func, **kwargs)
-            if self._trace:
-                self._enableTracesVerilog("./tb_{topname}.v".format(**vals))
-        elif hdl == "vhdl":
-            toVHDL(func, **kwargs)
+        self._convert(hdl, func, vals, **kwargs)
+
+        key = None
+        if self._cache_dir and artifacts:
+            t0 = time.time()
+            key = self._cacheKey(hdlsim, vals)
+            if self._cacheRestore(key, artifacts, vals):
+                self._timing.append((vals['topname'], "cache", time.time() - t0))
+                return Cosimulation(simulate_cmd.format(**vals), **kwargs)
 
         # Analyze HDL
-        os.system(analyze_cmd.format(**vals))
+        r = run_command(analyze_cmd.format(**vals))
+        self._timing.append((vals['topname'], "analyze", r.elapsed))
         # Elaborate
         if elaborate_cmd:
-            os.system(elaborate_cmd.format(**vals))
+            r = run_command(elaborate_cmd.format(**vals))
+            self._timing.append((vals['topname'], "elaborate", r.elapsed))
+
+        if key:
+            self._cacheStore(key, artifacts, vals)
         # Simulate
         return Cosimulation(simulate_cmd.format(**vals), **kwargs)
 
 
+    def _hdlFiles(self, hdl, vals):
+        ''' Returns the HDL files generated for the design, in a fixed order '''
+        if hdl == "verilog":
+            files = ["{topname}.v".format(**vals), "tb_{topname}.v".format(**vals)]
+        else:
+            files = ["{topname}.vhd".format(**vals)] + sorted(glob.glob("pck_myhdl_*.vhd"))
+        return [f for f in files if os.path.isfile(f)]
+
+    def _cacheKey(self, hdlsim, vals):
+        ''' Returns the cache key of a converted design: a hash of the generated HDL (the conversion date is ignored),
+            the simulator record and the command strings
+        '''
+        hdl, analyze_cmd, elaborate_cmd, simulate_cmd, artifacts = self.sim_reg[hdlsim]
+        h = hashlib.sha1()
+        h.update(repr((hdlsim, self.sim_reg[hdlsim])))
+        for cmd in (analyze_cmd, elaborate_cmd, simulate_cmd):
+            h.update(repr(cmd.format(**vals) if cmd else None))
+        for fname in self._hdlFiles(hdl, vals):
+            h.update(fname)
+            with open(fname) as f:
+                for line in f:
+                    if not line.startswith(("// Date:", "-- Date:")):
+                        h.update(line)
+        return h.hexdigest()
+
+    def _cacheRestore(self, key, artifacts, vals):
+        ''' Copies the cached artifacts of a design to the current directory. Returns False on a cache miss '''
+        entry = os.path.join(self._cache_dir, key)
+        if not os.path.isdir(entry):
+            return False
+        for a in artifacts:
+            a = a.format(**vals)
+            src = os.path.join(entry, a)
+            if os.path.isdir(a):
+                shutil.rmtree(a)
+            if os.path.isdir(src):
+                shutil.copytree(src, a)
+            else:
+                shutil.copy2(src, a)
+        return True
+
+    def _cacheStore(self, key, artifacts, vals):
+        ''' Stores the artifacts of a design in the cache. The entry is published atomically, so that concurrent
+            processes sharing the cache never see a partial entry
+        '''
+        entry = os.path.join(self._cache_dir, key)
+        if os.path.isdir(entry):
+            return
+        for a in artifacts:
+            if not os.path.exists(a.format(**vals)):
+                return
+        tmp = tempfile.mkdtemp(dir=self._cache_dir)
+        for a in artifacts:
+            a = a.format(**vals)
+            dst = os.path.join(tmp, a)
+            if os.path.isdir(a):
+                shutil.copytree(a, dst)
+            else:
+                shutil.copy2(a, dst)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process has published the same entry in the meantime
+            shutil.rmtree(tmp)
+
+
     def _enableTracesVerilog(self, verilogFile):
         ''' Enables traces in a Verilog file'''
         fname, _ = os.path.splitext(verilogFile)
@@ -117,14 +349,22 @@ class DUTer(object):
         ''' Returns a simulation instance of func. 
             Uses the simulator specified by self._simulator. 
             Enables traces if self._trace is True
+            Uses the behavioral models of the library components if self._behavioral is True
                 func - MyHDL function to be simulated
                 kwargs - dict of func interface assignments: for signals and parameters
         '''
         if self._simulator=="myhdl":
-            if not self._trace:
-                sim_dut = func(**kwargs)
-            else:
-                sim_dut = traceSignals(func, **kwargs)
+            enabled = behavioral.is_enabled()
+            if self._behavioral:
+                behavioral.enable()
+            try:
+                if not self._trace:
+                    sim_dut = func(**kwargs)
+                else:
+                    sim_dut = traceSignals(func, **kwargs)
+            finally:
+                if not enabled:
+                    behavioral.disable()
         else:
             sim_dut = self._getCosimulation(func, **kwargs)
 
@@ -2,8 +2,12 @@ from _DUTer import DUTer
 from clock import Clock
 from reset import ResetSync
 from payload_generator import payload_generator
+from runner import SimJob, SimResult, run_jobs
+from command import CommandError, CommandResult, run_command, run_commands
 
 __all__ =["DUTer",
           "Clock",
           "ResetSync",
-          "payload_generator"]
\ No newline at end of file
+          "payload_generator",
+          "SimJob", "SimResult", "run_jobs",
+          "CommandError", "CommandResult", "run_command", "run_commands"]
\ No newline at end of file
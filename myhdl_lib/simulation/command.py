@@ -0,0 +1,84 @@
+import time
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+
+class CommandError(Exception):
+    ''' Raised when a system command exits with non-zero exit code '''
+
+    def __init__(self, result):
+        self.result = result
+        msg = "Command '{}' failed with exit code {}".format(result.cmd, result.returncode)
+        if result.stderr:
+            msg += "\n" + result.stderr
+        Exception.__init__(self, msg)
+
+
+class CommandResult(object):
+    ''' Result of a system command
+            cmd - the executed command string
+            cwd - directory in which the command was executed, None for the current directory
+            returncode - exit code of the command
+            stdout - captured standard output
+            stderr - captured standard error
+            elapsed - wall time of the command in seconds
+    '''
+
+    def __init__(self, cmd, cwd, returncode, stdout, stderr, elapsed):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return "CommandResult(cmd={!r}, returncode={}, elapsed={:.3f})".format(self.cmd, self.returncode, self.elapsed)
+
+
+def _execute(cmd, cwd=None):
+    ''' Executes a command in a shell, returns CommandResult '''
+    t0 = time.time()
+    p = subprocess.Popen(cmd, shell=True, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = p.communicate()
+    return CommandResult(cmd, cwd, p.returncode, stdout, stderr, time.time() - t0)
+
+
+def run_command(cmd, cwd=None):
+    ''' Executes a system command, captures its output and measures its wall time
+            cmd - str, command, executed in a shell
+            cwd - optional, directory in which the command is executed; if not set, the current directory
+        Returns CommandResult. Raises CommandError if the command exits with non-zero exit code.
+    '''
+    result = _execute(cmd, cwd)
+    if result.returncode != 0:
+        raise CommandError(result)
+    return result
+
+
+def run_commands(cmds, cwd=None, processes=None):
+    ''' Executes system commands concurrently, captures their output and measures their wall time
+            cmds - list of str, commands, each executed in a shell
+            cwd - optional, directory in which the commands are executed, or list of directories, one per command;
+                  if not set, the current directory
+            processes - optional, max number of commands running at the same time; if not set, all run at once
+        Returns list of CommandResult, in the order of cmds. Waits for all commands to finish, then raises CommandError
+        for the first command that exited with non-zero exit code.
+    '''
+    if not cmds:
+        return []
+    if not isinstance(cwd, (list, tuple)):
+        cwd = len(cmds)*[cwd]
+    assert len(cwd) == len(cmds), "run_commands: expects one cwd per command, but len(cmds)={}, len(cwd)={}".format(len(cmds), len(cwd))
+
+    pool = ThreadPool(processes if (processes != None) else len(cmds))
+    try:
+        results = pool.map(lambda x: _execute(*x), zip(cmds, cwd))
+    finally:
+        pool.close()
+        pool.join()
+
+    for result in results:
+        if result.returncode != 0:
+            raise CommandError(result)
+    return results
@@ -0,0 +1,132 @@
+import os
+import time
+import shutil
+import tempfile
+import traceback
+import multiprocessing
+
+from myhdl import Simulation
+
+from _DUTer import DUTer
+
+
+class SimJob(object):
+    ''' A simulation job: a DUT, its interface assignments and the stimulus that drives it
+            func - MyHDL function to be simulated
+            kwargs - dict of func interface assignments: for signals and parameters
+            stimulus - instance, or list of instances, driving and checking the DUT (e.g. clock generator and test process);
+                       can also be a callable without arguments that returns them
+            simulator - name of the simulator that will simulate the DUT, "myhdl" or a name registered in the DUTer
+            name - optional, job name used in the results; if not set, the name of func is used
+    '''
+
+    def __init__(self, func, kwargs, stimulus, simulator="myhdl", name=None):
+        self.func = func
+        self.kwargs = kwargs
+        self.stimulus = stimulus
+        self.simulator = simulator
+        self.name = name if (name != None) else func.func_name
+
+
+class SimResult(object):
+    ''' Result of a simulation job
+            name - job name
+            simulator - name of the simulator used by the job
+            passed - True if the simulation finished without an exception
+            elapsed - wall time of the job in seconds: DUT construction and simulation
+            error - traceback of the exception that failed the job, None if the job passed
+            workdir - private scratch directory of the job; removed after the run unless kept, None if it could not be created
+    '''
+
+    def __init__(self, name, simulator, passed, elapsed, error=None, workdir=None):
+        self.name = name
+        self.simulator = simulator
+        self.passed = passed
+        self.elapsed = elapsed
+        self.error = error
+        self.workdir = workdir
+
+    def __repr__(self):
+        return "SimResult(name={}, simulator={}, passed={}, elapsed={:.3f})".format(self.name, self.simulator, self.passed, self.elapsed)
+
+
+# Shared with the worker processes by fork, so that jobs (signals, generators, closures) do not need to be picklable
+_jobs = None
+_duter = None
+_workdir = None
+_shared_files = None
+
+
+def _run_job(index):
+    ''' Runs a single job in a private scratch directory. Executed in a worker process '''
+    job = _jobs[index]
+    launch_dir = os.getcwd()
+    wdir = None
+    t0 = time.time()
+    try:
+        # A failure to set up the scratch directory fails the job, not the whole run
+        wdir = tempfile.mkdtemp(prefix="{}_{}_".format(index, job.name), dir=_workdir)
+        for fname in _shared_files:
+            src = os.path.join(launch_dir, fname)
+            if os.path.exists(src):
+                os.symlink(src, os.path.join(wdir, fname))
+        os.chdir(wdir)
+
+        _duter.selectSimulator(job.simulator)
+        dut = _duter(job.func, **job.kwargs)
+        stm = job.stimulus() if callable(job.stimulus) else job.stimulus
+        Simulation(dut, stm).run()
+        passed, error = True, None
+    except Exception:
+        passed, error = False, traceback.format_exc()
+    finally:
+        os.chdir(launch_dir)
+
+    return SimResult(job.name, job.simulator, passed, time.time() - t0, error, wdir)
+
+
+def run_jobs(jobs, duter=None, processes=None, workdir=None, keep=False, shared_files=("myhdl.vpi",)):
+    ''' Runs simulation jobs in parallel on a process pool and returns a list of SimResult, one per job, in the order of jobs
+            jobs - list of SimJob or (func, kwargs, stimulus) tuples, the latter are simulated with MyHDL
+            duter - optional, DUTer used to instantiate the DUTs, e.g. with registered simulators, traces or cache enabled;
+                    if not set, a default DUTer is used
+            processes - optional, number of worker processes; if not set, the number of CPU cores is used
+            workdir - optional, directory where the jobs' scratch directories are created; if not set, a temporary directory
+            keep - if True, scratch directories are not removed; the scratch directories of failed jobs are always kept
+            shared_files - files from the current directory that are linked into each scratch directory (e.g. the VPI module)
+        Each job runs in a fresh worker process, in its own scratch directory, so the HDL files, the compiled designs and
+        the traces of different jobs never collide.
+    '''
+    global _jobs, _duter, _workdir, _shared_files
+
+    jobs = [j if isinstance(j, SimJob) else SimJob(*j) for j in jobs]
+    if processes == None:
+        processes = multiprocessing.cpu_count()
+    tmp_workdir = (workdir == None)
+    if tmp_workdir:
+        workdir = tempfile.mkdtemp(prefix="myhdl_lib_")
+    elif not os.path.isdir(workdir):
+        os.makedirs(workdir)
+
+    _jobs = jobs
+    _duter = duter if (duter != None) else DUTer()
+    _workdir = os.path.abspath(workdir)
+    _shared_files = shared_files
+    try:
+        pool = multiprocessing.Pool(processes=processes, maxtasksperchild=1)
+        try:
+            results = pool.map(_run_job, range(len(jobs)), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _jobs = _duter = _workdir = _shared_files = None
+
+    for r in results:
+        if r.passed and not keep:
+            shutil.rmtree(r.workdir, ignore_errors=True)
+            r.workdir = None
+    if tmp_workdir and not keep and all(r.passed for r in results):
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
@@ -1,4 +1,15 @@
 from myhdl import *
+from myhdl.conversion import _toVerilog, _toVHDL
+
+
+def is_converting():
+    ''' True while a design is elaborated for conversion by toVerilog or toVHDL '''
+    return bool(_toVerilog._converting or _toVHDL._converting)
+
+
+def is_converting_vhdl():
+    ''' True while a design is elaborated for conversion by toVHDL '''
+    return bool(_toVHDL._converting)
 
 
 def assign(a,b):
@@ -0,0 +1,142 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.arbiter import arbiter_deficit_rr
+import myhdl_lib.simulation as sim
+
+
+def arbiter_deficit_rr_3(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, pkt_len, q0, q1, q2):
+    ''' Needed when arbiter_deficit_rr with quantum signals is co-simulated as top level '''
+    _arb = arbiter_deficit_rr(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, quantums=[q0, q1, q2], pkt_len=pkt_len)
+    return _arb
+
+
+class TestArbiterDeficitRR(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        N = 3
+        LMAX = 15
+        self.N = N
+        self.LMAX = LMAX
+        self.req_vec = Signal(intbv(0)[N:])
+        self.gnt_vec = Signal(intbv(0)[N:])
+        self.gnt_idx = Signal(intbv(0, min=0, max=N))
+        self.gnt_vld = Signal(bool(0))
+        self.gnt_rdy = Signal(bool(0))
+        self.pkt_len = Signal(intbv(0, min=0, max=LMAX+1))
+        self.ls_q = [Signal(intbv(0)[5:]) for _ in range(N)]
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+
+    def stim(self, quantums, sent, req_p=None, fixed_len=None, grants=None):
+        ''' Requests, packet lengths and grant ready compared to a model, sent collects the granted length per request.
+            req_p - None: the requests are always active and gnt_rdy is 1, otherwise their probability
+            fixed_len - None: random packet lengths, otherwise the list of packet lengths per request
+            grants - optional, list, grants[0] counts the clock cycles with a grant '''
+        N = self.N
+
+        def new_len(i):
+            return fixed_len[i] if (fixed_len != None) else random.randint(1, self.LMAX)
+
+        @instance
+        def _inst():
+            for i in range(N):
+                self.ls_q[i].next = quantums[i]
+            self.req_vec.next = 0
+            self.gnt_rdy.next = 0
+            yield self.rst.pulse(5)
+            cur, deficit = N-1, [0]*N
+            lens = [new_len(i) for i in range(N)]
+            for _ in range(600):
+                if req_p == None:
+                    req = 2**N-1
+                    self.gnt_rdy.next = 1
+                else:
+                    req = sum(1 << i for i in range(N) if random.random() < req_p)
+                    self.gnt_rdy.next = random.random() < 0.7
+                self.req_vec.next = req
+                # The turn stays while the deficit is > 0, otherwise it goes to the next active request
+                hold = ((req >> cur) & 1) and deficit[cur] > 0
+                if hold:
+                    idx, send = cur, True
+                elif req:
+                    idx = [i % N for i in range(cur+1, cur+1+N) if (req >> (i % N)) & 1][0]
+                    send = deficit[idx] + quantums[idx] > 0
+                else:
+                    idx, send = 0, False
+                self.pkt_len.next = lens[idx]
+                yield delay(1)
+                assert self.gnt_vld == send, "gnt_vld: expected {}, detected {}".format(send, self.gnt_vld)
+                if req:
+                    assert self.gnt_idx == idx, "gnt_idx: expected {}, detected {}".format(idx, self.gnt_idx)
+                assert self.gnt_vec == (send << idx), "gnt_vec: expected {}, detected {}".format(send << idx, self.gnt_vec)
+                if send and grants != None:
+                    grants[0] += 1
+                yield self.clk.posedge
+                if not hold and req:
+                    if not (req >> cur) & 1:
+                        deficit[cur] = min(deficit[cur], 0)
+                    deficit[idx] += quantums[idx]
+                    cur = idx
+                if send and self.gnt_rdy:
+                    deficit[idx] -= lens[idx]
+                    sent[idx] += lens[idx]
+                    lens[idx] = new_len(idx)
+            raise StopSimulation
+        return _inst
+
+    def testRandom(self):
+        ''' ARBITER_DEFICIT_RR: Random requests, packet lengths and grant ready '''
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for quantums in [[15, 15, 15], [4, 20, 9]]:
+                sent = [0]*self.N
+                dut = getDut(arbiter_deficit_rr, rst=self.rst, clk=self.clk, req_vec=self.req_vec, gnt_vec=self.gnt_vec, gnt_idx=self.gnt_idx, gnt_vld=self.gnt_vld, gnt_rdy=self.gnt_rdy,
+                             quantums=quantums, pkt_len=self.pkt_len)
+                Simulation(self.clk.gen(), dut, self.stim(quantums, sent, req_p=0.6)).run()
+                del dut
+
+            quantums = [1, 31, 16]
+            sent = [0]*self.N
+            dut = getDut(arbiter_deficit_rr_3, rst=self.rst, clk=self.clk, req_vec=self.req_vec, gnt_vec=self.gnt_vec, gnt_idx=self.gnt_idx, gnt_vld=self.gnt_vld, gnt_rdy=self.gnt_rdy,
+                         pkt_len=self.pkt_len, q0=self.ls_q[0], q1=self.ls_q[1], q2=self.ls_q[2])
+            Simulation(self.clk.gen(), dut, self.stim(quantums, sent, req_p=0.6)).run()
+            del dut
+
+    def testBandwidth(self):
+        ''' ARBITER_DEFICIT_RR: All requests active, the bandwidth is shared in proportion to the quantums, not to the packet lengths '''
+        quantums = [8, 16, 24]
+        sent = [0]*self.N
+        dut = arbiter_deficit_rr(self.rst, self.clk, self.req_vec, self.gnt_vec, self.gnt_idx, self.gnt_vld, self.gnt_rdy, quantums=quantums, pkt_len=self.pkt_len)
+        Simulation(self.clk.gen(), dut, self.stim(quantums, sent, fixed_len=[15, 3, 7])).run()
+        for i in range(self.N):
+            share = float(sent[i]) / sum(sent)
+            expected = float(quantums[i]) / sum(quantums)
+            assert abs(share - expected) < 0.05, "Share of request {}: expected {}, detected {}".format(i, expected, share)
+
+    def testThroughput(self):
+        ''' ARBITER_DEFICIT_RR: All requests active, quantums >= packet lengths: a grant in every clock cycle, also when the turn changes '''
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for quantums, fixed_len in [([1, 1, 1], [1, 1, 1]), ([15, 15, 15], None), ([15, 20, 30], [15, 3, 7])]:
+                sent = [0]*self.N
+                grants = [0]
+                dut = getDut(arbiter_deficit_rr, rst=self.rst, clk=self.clk, req_vec=self.req_vec, gnt_vec=self.gnt_vec, gnt_idx=self.gnt_idx, gnt_vld=self.gnt_vld, gnt_rdy=self.gnt_rdy,
+                             quantums=quantums, pkt_len=self.pkt_len)
+                Simulation(self.clk.gen(), dut, self.stim(quantums, sent, fixed_len=fixed_len, grants=grants)).run()
+                del dut
+                assert grants[0] == 600, "Quantums {}: {} grants in 600 clock cycles".format(quantums, grants[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
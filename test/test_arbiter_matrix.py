@@ -0,0 +1,95 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.arbiter import arbiter_matrix, arbiter
+import myhdl_lib.simulation as sim
+
+
+class TestArbiterMatrix(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def testRandom(self):
+        ''' ARBITER_MATRIX: Random requests and grant ready, the least recently granted request is granted '''
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(N, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy):
+            @instance
+            def _inst():
+                req_vec.next = 0
+                gnt_rdy.next = 0
+                yield rst.pulse(5)
+                order = list(range(N))
+                for req_p in [0.5, 0.1, 0.9]:
+                    for _ in range(200):
+                        req = sum(1 << i for i in range(N) if random.random() < req_p)
+                        req_vec.next = req
+                        gnt_rdy.next = random.random() < 0.7
+                        yield delay(1)
+                        vld = (req != 0)
+                        idx = [i for i in order if (req >> i) & 1][0] if vld else 0
+                        assert gnt_vld == vld, "gnt_vld: expected {}, detected {}".format(vld, gnt_vld)
+                        assert gnt_idx == idx, "gnt_idx: expected {}, detected {}".format(idx, gnt_idx)
+                        assert gnt_vec == (vld << idx), "gnt_vec: expected {}, detected {}".format(vld << idx, gnt_vec)
+                        yield clk.posedge
+                        if gnt_rdy and vld:
+                            order.remove(idx)
+                            order.append(idx)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for N in [2, 3, 8]:
+                req_vec = Signal(intbv(0)[N:])
+                gnt_vec = Signal(intbv(0)[N:])
+                gnt_idx = Signal(intbv(0, min=0, max=N))
+                gnt_vld = Signal(bool(0))
+                gnt_rdy = Signal(bool(0))
+                clkgen = clk.gen()
+                dut = getDut(arbiter_matrix, rst=rst, clk=clk, req_vec=req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy)
+                stm = stim(N, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy)
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+
+    def testBursty(self):
+        ''' ARBITER_MATRIX: A waiting request is granted before a request is granted twice, unlike roundrobin '''
+        N = 3
+        REQS = [0b111, 0b101, 0b011, 0b011]
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+        req_vec = Signal(intbv(0)[N:])
+        gnt_idx = Signal(intbv(0, min=0, max=N))
+        gnt_vld = Signal(bool(0))
+        gnt_rdy = Signal(bool(1))
+
+        def stim(grants):
+            @instance
+            def _inst():
+                yield rst.pulse(5)
+                for req in REQS:
+                    req_vec.next = req
+                    yield delay(1)
+                    grants.append(int(gnt_idx))
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        results = {}
+        for ARBITER_TYPE in ["matrix", "roundrobin"]:
+            grants = []
+            dut = arbiter(rst, clk, req_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy, ARBITER_TYPE=ARBITER_TYPE)
+            Simulation(clk.gen(), dut, stim(grants)).run()
+            results[ARBITER_TYPE] = grants
+        # Request 1 waits from the first clock cycle
+        assert results["matrix"] == [0, 2, 1, 0], "Grants: {}".format(results["matrix"])
+        assert results["roundrobin"] == [0, 2, 0, 1], "Grants: {}".format(results["roundrobin"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.arbiter import arbiter_multi
+import myhdl_lib.simulation as sim
+
+
+def arbiter_multi_2(rst, clk, req_vec, gnt_vec, idx0, idx1, vld0, vld1, rdy0, rdy1, ARBITER_TYPE):
+    ''' Needed when arbiter_multi is co-simulated as top level '''
+    _arb = arbiter_multi(rst, clk, req_vec, gnt_vec, [idx0, idx1], [vld0, vld1], [rdy0, rdy1], ARBITER_TYPE=ARBITER_TYPE)
+    return _arb
+
+
+def arbiter_multi_4(rst, clk, req_vec, gnt_vec, idx0, idx1, idx2, idx3, vld0, vld1, vld2, vld3, rdy0, rdy1, rdy2, rdy3, ARBITER_TYPE):
+    ''' Needed when arbiter_multi is co-simulated as top level '''
+    _arb = arbiter_multi(rst, clk, req_vec, gnt_vec, [idx0, idx1, idx2, idx3], [vld0, vld1, vld2, vld3], [rdy0, rdy1, rdy2, rdy3], ARBITER_TYPE=ARBITER_TYPE)
+    return _arb
+
+
+class TestArbiterMulti(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def testRandom(self):
+        ''' ARBITER_MULTI: Random requests and grant readies, priority and roundrobin '''
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(N, K, ROUNDROBIN, req_vec, gnt_vec, ls_idx, ls_vld, ls_rdy):
+            @instance
+            def _inst():
+                req_vec.next = 0
+                yield rst.pulse(5)
+                ptr = N-1
+                for req_p in [0.5, 0.1, 0.9]:
+                    for _ in range(200):
+                        req = sum(1 << i for i in range(N) if random.random() < req_p)
+                        req_vec.next = req
+                        for k in range(K):
+                            ls_rdy[k].next = random.random() < 0.7
+                        yield delay(1)
+                        order = [i % N for i in range(ptr+1, ptr+1+N)] if ROUNDROBIN else list(range(N))
+                        gnts = [i for i in order if (req >> i) & 1][:K]
+                        vec = sum(1 << i for i in gnts)
+                        assert gnt_vec == vec, "gnt_vec: expected {}, detected {}".format(vec, gnt_vec)
+                        for k in range(K):
+                            assert ls_vld[k] == (k < len(gnts)), "gnt_vld[{}]: expected {}, detected {}".format(k, k < len(gnts), ls_vld[k])
+                            if k < len(gnts):
+                                assert ls_idx[k] == gnts[k], "gnt_idx[{}]: expected {}, detected {}".format(k, gnts[k], ls_idx[k])
+                        yield clk.posedge
+                        if ROUNDROBIN:
+                            for k in range(len(gnts)):
+                                if ls_rdy[k]:
+                                    ptr = gnts[k]
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for N, K in [(5, 2), (8, 4), (32, 4)]:
+                for ARBITER_TYPE in ["priority", "roundrobin"]:
+                    req_vec = Signal(intbv(0)[N:])
+                    gnt_vec = Signal(intbv(0)[N:])
+                    ls_idx = [Signal(intbv(0, min=0, max=N)) for _ in range(K)]
+                    ls_vld = [Signal(bool(0)) for _ in range(K)]
+                    ls_rdy = [Signal(bool(0)) for _ in range(K)]
+                    argl = {"rst":rst, "clk":clk, "req_vec":req_vec, "gnt_vec":gnt_vec, "ARBITER_TYPE":ARBITER_TYPE}
+                    for k in range(K):
+                        argl["idx{}".format(k)] = ls_idx[k]
+                        argl["vld{}".format(k)] = ls_vld[k]
+                        argl["rdy{}".format(k)] = ls_rdy[k]
+                    clkgen = clk.gen()
+                    dut = getDut(arbiter_multi_2 if K == 2 else arbiter_multi_4, **argl)
+                    stm = stim(N, K, ARBITER_TYPE == "roundrobin", req_vec, gnt_vec, ls_idx, ls_vld, ls_rdy)
+                    Simulation(clkgen, dut, stm).run()
+                    del clkgen, dut, stm
+
+    def testParameters(self):
+        ''' ARBITER_MULTI: Parameter checks '''
+        rst, clk = Signal(bool(0)), Signal(bool(0))
+        req_vec = Signal(intbv(0)[4:])
+        ls_idx = [Signal(intbv(0, min=0, max=4)) for _ in range(2)]
+        self.assertRaises(AssertionError, arbiter_multi, rst, clk, req_vec, ls_gnt_idx=ls_idx, ARBITER_TYPE="matrix")
+        self.assertRaises(AssertionError, arbiter_multi, rst, clk, req_vec, ls_gnt_idx=ls_idx, K=3)
+        self.assertRaises(AssertionError, arbiter_multi, rst, clk, req_vec, ls_gnt_idx=[])
+
+
+if __name__ == "__main__":
+    unittest.main()
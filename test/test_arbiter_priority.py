@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
-from myhdl_lib.arbiter import arbiter_priority
+from myhdl_lib.arbiter import arbiter_priority, _prio_tree
+from myhdl_lib import behavioral
 import myhdl_lib.simulation as sim
 
 
@@ -153,6 +155,93 @@ class TestArbiterPriority(unittest.TestCase):
             del dut, stm
 
 
+    def testWidths(self):
+        ''' ARBITER_RPIORITY: Random requests, request vectors of different widths'''
+
+        def stim(NUM_REQ, req_vec, gnt_vec, gnt_idx, gnt_vld):
+            @instance
+            def _inst():
+                for _ in range(300):
+                    x = 0
+                    for k in range(NUM_REQ):
+                        if random.random() < 0.1:
+                            x |= 1 << k
+                    req_vec.next = x
+                    yield delay(10)
+                    s = 0
+                    v = 0
+                    for k in range(NUM_REQ):
+                        if (x >> k) & 1:
+                            s = k
+                            v = 1
+                            break
+                    assert (1<<s)*v == gnt_vec, "gnt_vec: expected {}, detected {}".format((1<<s)*v, gnt_vec)
+                    assert s == gnt_idx, "gnt_idx: expected {}, detected {}".format(s, gnt_idx)
+                    assert v == gnt_vld, "gnt_vld: expected {}, detected {}".format(v, gnt_vld)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for NUM_REQ in [2, 3, 7, 8, 13, 64]:
+                req_vec = Signal(intbv(0)[NUM_REQ:])
+                gnt_vec = Signal(intbv(0)[NUM_REQ:])
+                gnt_idx = Signal(intbv(0, min=0, max=NUM_REQ))
+                gnt_vld = Signal(bool(0))
+
+                dut = getDut(arbiter_priority, req_vec=req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld)
+                stm = stim(NUM_REQ, req_vec, gnt_vec, gnt_idx, gnt_vld)
+                Simulation(dut, stm).run()
+                del dut, stm
+
+    def testTree(self):
+        ''' ARBITER_RPIORITY: The priority tree used in conversion, simulated directly '''
+        for NUM_REQ in [1, 2, 3, 7, 8, 13, 64]:
+            req_vec = Signal(intbv(0)[NUM_REQ:])
+            vld = Signal(bool(0))
+            idx = Signal(intbv(0)[max(1, len(intbv(0, min=0, max=NUM_REQ))):])
+
+            def stim():
+                @instance
+                def _inst():
+                    for _ in range(300):
+                        x = random.getrandbits(NUM_REQ) & random.getrandbits(NUM_REQ)
+                        req_vec.next = x
+                        yield delay(10)
+                        s = ((x & -x).bit_length() - 1) if x else 0
+                        assert s == idx, "idx: expected {}, detected {}".format(s, idx)
+                        assert (x != 0) == vld, "vld: expected {}, detected {}".format(x != 0, vld)
+                    raise StopSimulation
+                return _inst
+
+            Simulation(_prio_tree(req_vec, vld, idx), stim()).run()
+
+    def testBehavioral(self):
+        ''' ARBITER_RPIORITY: The RTL and the behavioral model, simulated side by side, grant the same requests '''
+        for NUM_REQ in [1, 2, 3, 7, 8, 13, 64]:
+            req_vec = Signal(intbv(0)[NUM_REQ:])
+            gnt_vec = [Signal(intbv(0)[NUM_REQ:]) for _ in range(2)]
+            gnt_idx = [Signal(intbv(0, min=0, max=NUM_REQ)) for _ in range(2)]
+            gnt_vld = [Signal(bool(0)) for _ in range(2)]
+
+            def stim():
+                @instance
+                def _inst():
+                    for _ in range(300):
+                        req_vec.next = random.getrandbits(NUM_REQ) & random.getrandbits(NUM_REQ)
+                        yield delay(10)
+                        assert gnt_vec[0] == gnt_vec[1], "gnt_vec: RTL {}, model {}".format(gnt_vec[0], gnt_vec[1])
+                        assert gnt_idx[0] == gnt_idx[1], "gnt_idx: RTL {}, model {}".format(gnt_idx[0], gnt_idx[1])
+                        assert gnt_vld[0] == gnt_vld[1], "gnt_vld: RTL {}, model {}".format(gnt_vld[0], gnt_vld[1])
+                    raise StopSimulation
+                return _inst
+
+            self.assertFalse(behavioral.is_enabled())
+            rtl = arbiter_priority(req_vec, gnt_vec=gnt_vec[0], gnt_idx=gnt_idx[0], gnt_vld=gnt_vld[0])
+            model = behavioral.arbiter_priority(req_vec, gnt_vec=gnt_vec[1], gnt_idx=gnt_idx[1], gnt_vld=gnt_vld[1])
+            Simulation(rtl, model, stim()).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.arbiter import arbiter_roundrobin_pp, arbiter
+import myhdl_lib.simulation as sim
+
+
+def roundrobin(req, ptr, N):
+    ''' Index of the first request after ptr, in round robin order '''
+    for i in range(ptr+1, ptr+1+N):
+        if (req >> (i % N)) & 1:
+            return i % N, True
+    return 0, False
+
+
+class TestArbiterRoundrobinPP(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def testRandom(self):
+        ''' ARBITER_ROUNDROBIN_PP: Random requests and grant ready, combinatorial and registered grant '''
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(N, REGISTERED, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy):
+            @instance
+            def _inst():
+                req_vec.next = 0
+                gnt_rdy.next = 0
+                yield rst.pulse(5)
+                ptr = N-1
+                idx_r, vld_r = 0, False
+                for req_p in [0.5, 0.1, 0.9, 1]:
+                    for _ in range(200):
+                        req_vec.next = sum(1 << i for i in range(N) if random.random() < req_p)
+                        gnt_rdy.next = random.random() < 0.7
+                        yield delay(1)
+                        if REGISTERED:
+                            idx, vld = idx_r, vld_r
+                        else:
+                            idx, vld = roundrobin(int(req_vec), ptr, N)
+                        assert gnt_vld == vld, "gnt_vld: expected {}, detected {}".format(vld, gnt_vld)
+                        if vld:
+                            assert gnt_idx == idx, "gnt_idx: expected {}, detected {}".format(idx, gnt_idx)
+                            assert gnt_vec == (1 << idx), "gnt_vec: expected {}, detected {}".format(1 << idx, gnt_vec)
+                        else:
+                            assert gnt_vec == 0
+                        yield clk.posedge
+                        req = int(req_vec)
+                        if gnt_rdy and vld:
+                            ptr = idx
+                            req &= ~(1 << idx)
+                        if REGISTERED:
+                            idx_r, vld_r = roundrobin(req, ptr, N)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for N in [2, 5, 8, 64]:
+                for REGISTERED in [False, True]:
+                    req_vec = Signal(intbv(0)[N:])
+                    gnt_vec = Signal(intbv(0)[N:])
+                    gnt_idx = Signal(intbv(0, min=0, max=N))
+                    gnt_vld = Signal(bool(0))
+                    gnt_rdy = Signal(bool(0))
+                    clkgen = clk.gen()
+                    dut = getDut(arbiter_roundrobin_pp, rst=rst, clk=clk, req_vec=req_vec, gnt_vec=gnt_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy, REGISTERED=REGISTERED)
+                    stm = stim(N, REGISTERED, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy)
+                    Simulation(clkgen, dut, stm).run()
+                    del clkgen, dut, stm
+
+    def testArbiterType(self):
+        ''' ARBITER_ROUNDROBIN_PP: Selected by the arbiter wrapper '''
+        N = 4
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+        req_vec = Signal(intbv(0)[N:])
+        gnt_idx = Signal(intbv(0, min=0, max=N))
+        gnt_vld = Signal(bool(0))
+        gnt_rdy = Signal(bool(1))
+
+        def stim():
+            @instance
+            def _inst():
+                yield rst.pulse(5)
+                req_vec.next = 0b1011
+                for idx in [0, 1, 3, 0, 1]:
+                    yield delay(1)
+                    assert gnt_vld and gnt_idx == idx, "gnt_idx: expected {}, detected {}".format(idx, gnt_idx)
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        dut = arbiter(rst, clk, req_vec, gnt_idx=gnt_idx, gnt_vld=gnt_vld, gnt_rdy=gnt_rdy, ARBITER_TYPE="roundrobin_pp")
+        Simulation(clk.gen(), dut, stim()).run()
+        self.assertRaises(AssertionError, arbiter, rst, clk, req_vec, gnt_idx=gnt_idx, ARBITER_TYPE="unknown")
+        self.assertRaises(AssertionError, arbiter, rst, clk, req_vec, gnt_idx=gnt_idx, ARBITER_TYPE="roundrobin", REGISTERED=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.arbiter import arbiter_weighted_rr, arbiter
+import myhdl_lib.simulation as sim
+
+
+def arbiter_weighted_rr_3(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, w0, w1, w2):
+    ''' Needed when arbiter_weighted_rr with weights signals is co-simulated as top level '''
+    _arb = arbiter_weighted_rr(rst, clk, req_vec, gnt_vec, gnt_idx, gnt_vld, gnt_rdy, weights=[w0, w1, w2])
+    return _arb
+
+
+class TestArbiterWeightedRR(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        N = 3
+        self.N = N
+        self.req_vec = Signal(intbv(0)[N:])
+        self.gnt_vec = Signal(intbv(0)[N:])
+        self.gnt_idx = Signal(intbv(0, min=0, max=N))
+        self.gnt_vld = Signal(bool(0))
+        self.gnt_rdy = Signal(bool(0))
+        self.ls_w = [Signal(intbv(0)[3:]) for _ in range(N)]
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+
+    def stim(self, ls_weights, grants=None):
+        ''' Random requests and grant ready, compared to a model; ls_weights - list of weights lists, applied in turn.
+            If grants is a list, the requests are always active, gnt_rdy is 1, and the grants are collected in it '''
+        N = self.N
+
+        @instance
+        def _inst():
+            for i in range(N):
+                self.ls_w[i].next = ls_weights[0][i]
+            self.req_vec.next = 0
+            self.gnt_rdy.next = 0
+            yield self.rst.pulse(5)
+            cur, credit, ptr = 0, 0, N-1
+            for weights in ls_weights:
+                for i in range(N):
+                    self.ls_w[i].next = weights[i]
+                for _ in range(300):
+                    if grants == None:
+                        req = random.randrange(2**N)
+                        self.req_vec.next = req
+                        self.gnt_rdy.next = random.random() < 0.7
+                    else:
+                        req = 2**N-1
+                        self.req_vec.next = req
+                        self.gnt_rdy.next = 1
+                    yield delay(1)
+                    hold = ((req >> cur) & 1) and credit != 0
+                    if hold:
+                        idx, vld = cur, True
+                    else:
+                        idx, vld = 0, False
+                        for i in range(ptr+1, ptr+1+N):
+                            if (req >> (i % N)) & 1:
+                                idx, vld = i % N, True
+                                break
+                    assert self.gnt_vld == vld, "gnt_vld: expected {}, detected {}".format(vld, self.gnt_vld)
+                    if vld:
+                        assert self.gnt_idx == idx, "gnt_idx: expected {}, detected {}".format(idx, self.gnt_idx)
+                        assert self.gnt_vec == (1 << idx), "gnt_vec: expected {}, detected {}".format(1 << idx, self.gnt_vec)
+                        if grants != None:
+                            grants.append(idx)
+                    yield self.clk.posedge
+                    if self.gnt_rdy and vld:
+                        if hold:
+                            credit -= 1
+                        else:
+                            cur, ptr = idx, idx
+                            credit = max(weights[idx] - 1, 0)
+                    elif not (req >> cur) & 1:
+                        credit = 0
+            raise StopSimulation
+        return _inst
+
+    def testRandom(self):
+        ''' ARBITER_WEIGHTED_RR: Random requests and grant ready, constant and signal weights '''
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for weights in [[1, 1, 1], [3, 1, 2], [0, 4, 1]]:
+                dut = getDut(arbiter_weighted_rr, rst=self.rst, clk=self.clk, req_vec=self.req_vec, gnt_vec=self.gnt_vec, gnt_idx=self.gnt_idx, gnt_vld=self.gnt_vld, gnt_rdy=self.gnt_rdy, weights=weights)
+                Simulation(self.clk.gen(), dut, self.stim([weights])).run()
+                del dut
+
+            ls_weights = [[1, 2, 3], [7, 1, 0], [2, 2, 5]]
+            dut = getDut(arbiter_weighted_rr_3, rst=self.rst, clk=self.clk, req_vec=self.req_vec, gnt_vec=self.gnt_vec, gnt_idx=self.gnt_idx, gnt_vld=self.gnt_vld, gnt_rdy=self.gnt_rdy,
+                         w0=self.ls_w[0], w1=self.ls_w[1], w2=self.ls_w[2])
+            Simulation(self.clk.gen(), dut, self.stim(ls_weights)).run()
+            del dut
+
+    def testBandwidth(self):
+        ''' ARBITER_WEIGHTED_RR: All requests active, the grants are shared in proportion to the weights '''
+        weights = [1, 3, 2]
+        grants = []
+        dut = arbiter(self.rst, self.clk, self.req_vec, self.gnt_vec, self.gnt_idx, self.gnt_vld, self.gnt_rdy, ARBITER_TYPE="weighted_rr", weights=weights)
+        Simulation(self.clk.gen(), dut, self.stim([weights], grants)).run()
+        assert grants[:12] == [0, 1, 1, 1, 2, 2, 0, 1, 1, 1, 2, 2], "Grants: {}".format(grants[:12])
+        self.assertRaises(AssertionError, arbiter, self.rst, self.clk, self.req_vec, ARBITER_TYPE="roundrobin", weights=weights)
+        self.assertRaises(AssertionError, arbiter_weighted_rr, self.rst, self.clk, self.req_vec, weights=[1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib import behavioral
+from myhdl_lib.fifo import fifo
+from myhdl_lib.mem import *
+from myhdl_lib.arbiter import arbiter_priority, arbiter_roundrobin, arbiter_matrix
+from myhdl_lib.handshake import hs_arbmux, hs_arbdemux
+import myhdl_lib.simulation as sim
+
+
+def _rnd(s, p=0.5):
+    ''' Random value for signal s; a bool signal is 1 with probability p '''
+    if isinstance(s.val, bool):
+        return random.random() < p
+    return random.randrange(s.min if s.min != None else 0, s.max if s.max != None else 2**len(s))
+
+
+class TestBehavioral(unittest.TestCase):
+    ''' Runs the RTL and the behavioral model of a component side by side on the same random inputs and compares the
+        outputs. The inputs change and the outputs are compared at odd times, the clock edges happen at even times.
+    '''
+
+    CYCLES = 400
+
+    def setUp(self):
+        self.clka = sim.Clock(val=0, period=20, units="ns")
+        self.clkb = sim.Clock(val=0, period=28, units="ns")
+        self.clkgen = [self.clka.gen(), self.clkb.gen()]
+        self.rst = Signal(bool(0))
+
+    def tearDown(self):
+        behavioral.disable()
+
+    def compare(self, name, ins, outs, get, constrain=None):
+        ''' Builds the RTL and the behavioral instance of a component and compares their outputs
+                ins  - list of (signal, p) random inputs, p is the probability of 1 for bool signals
+                outs - dict name:signal or name:list of signals, the RTL outputs; copies are made for the model
+                get  - function that returns an instance of the component given a dict of outputs
+                constrain - optional function called after the inputs are randomized, may change the inputs
+        '''
+        def copy(o):
+            if isinstance(o, list):
+                return [Signal(s.val) for s in o]
+            return Signal(o.val)
+
+        def flat(d):
+            ls = []
+            for k in sorted(d.keys()):
+                ls += d[k] if isinstance(d[k], list) else [d[k]]
+            return ls
+
+        beh_outs = dict((k, copy(o)) for k, o in outs.items())
+        rtl = get(outs)
+        behavioral.enable()
+        beh = get(beh_outs)
+        behavioral.disable()
+
+        @instance
+        def stim():
+            yield delay(1)
+            for i in range(self.CYCLES):
+                for s, p in ins:
+                    s.next = _rnd(s, p)
+                if constrain: constrain()
+                yield delay(2)
+                for r, b in zip(flat(outs), flat(beh_outs)):
+                    self.assertEqual(r, b, "{}: t={}, RTL={}, model={}".format(name, now(), r, b))
+                yield delay(random.choice([2, 4, 6]))
+            raise StopSimulation
+
+        Simulation(self.clkgen, rtl, beh, stim).run(quiet=1)
+
+    def compareFunc(self, func, ins, outs, constrain=None, **kwargs):
+        ''' Compares func with all ports passed by name: ins - dict name:(signal, p), kwargs - the other arguments '''
+        kw = dict(kwargs)
+        for k, (s, _) in ins.items():
+            kw[k] = s
+
+        def get(o):
+            return func(**dict(kw, **o))
+
+        self.compare(func.func_name, ins.values(), outs, get, constrain)
+
+    def testEnable(self):
+        ''' BEHAVIORAL: Elaboration selects the RTL or the behavioral model '''
+        clk, we = self.clka, Signal(bool(0))
+        addr, di, do = Signal(intbv(0)[4:]), Signal(intbv(0)[8:]), Signal(intbv(0)[8:])
+        self.assertEqual(len(ram_sp_ar(clk, we, addr, di, do)), 2)
+        behavioral.enable()
+        self.assertEqual(len([ram_sp_ar(clk, we, addr, di, do)]), 1)
+        behavioral.disable()
+        getDut = sim.DUTer()
+        getDut.enableBehavioral()
+        dut = getDut(ram_sp_ar, clk=clk, we=we, addr=addr, di=di, do=do)
+        self.assertEqual(len([dut]), 1)
+        self.assertFalse(behavioral.is_enabled())
+
+    def testFifo(self):
+        ''' BEHAVIORAL: fifo '''
+        for read_latency in [0, 1, 2]:
+            for depth in [1, 2, 5, 8]:
+                for p in [0.2, 0.8]:
+                    ins = {"rst": (self.rst, 0.02), "we": (Signal(bool(0)), p), "re": (Signal(bool(0)), 1-p),
+                           "din": (Signal(intbv(0)[8:]), None)}
+                    outs = {"full": Signal(bool(0)), "empty": Signal(bool(0)), "dout": Signal(intbv(0)[8:]),
+                            "afull": Signal(bool(0)), "aempty": Signal(bool(0)), "ovf": Signal(bool(0)), "udf": Signal(bool(0)),
+                            "count": Signal(intbv(0, min=0, max=depth+1)), "count_max": Signal(intbv(0, min=0, max=depth+1))}
+                    self.compareFunc(fifo, ins, outs, clk=self.clka, depth=depth, afull_th=random.randint(0, depth), aempty_th=random.randint(0, depth), read_latency=read_latency)
+
+    def testRamSp(self):
+        ''' BEHAVIORAL: ram_sp_rf, ram_sp_wf, ram_sp_ar '''
+        for func in [ram_sp_rf, ram_sp_wf, ram_sp_ar]:
+            ins = {"we": (Signal(bool(0)), 0.5), "addr": (Signal(intbv(0)[3:]), None), "di": (Signal(intbv(0)[8:]), None)}
+            outs = {"do": Signal(intbv(0)[8:])}
+            self.compareFunc(func, ins, outs, clk=self.clka)
+
+    def testRamSdp(self):
+        ''' BEHAVIORAL: ram_sdp_rf, ram_sdp_wf, ram_sdp_ar '''
+        for func in [ram_sdp_rf, ram_sdp_wf, ram_sdp_ar]:
+            ins = {"we": (Signal(bool(0)), 0.5), "addrw": (Signal(intbv(0)[3:]), None), "addrr": (Signal(intbv(0)[3:]), None),
+                   "di": (Signal(intbv(0)[8:]), None)}
+            outs = {"do": Signal(intbv(0)[8:])}
+            self.compareFunc(func, ins, outs, clk=self.clka)
+
+    def testRamDp(self):
+        ''' BEHAVIORAL: ram_dp_rf, ram_dp_wf, ram_dp_ar '''
+        for func in [ram_dp_rf, ram_dp_wf, ram_dp_ar]:
+            ins = {"wea": (Signal(bool(0)), 0.5), "web": (Signal(bool(0)), 0.5),
+                   "addra": (Signal(intbv(0)[2:]), None), "addrb": (Signal(intbv(0)[2:]), None),
+                   "dia": (Signal(intbv(0)[8:]), None), "dib": (Signal(intbv(0)[8:]), None)}
+            outs = {"doa": Signal(intbv(0)[8:]), "dob": Signal(intbv(0)[8:])}
+
+            def no_collision(wea=ins["wea"][0], web=ins["web"][0], addra=ins["addra"][0], addrb=ins["addrb"][0]):
+                # Writing the same address from both ports at the same time is undefined
+                if wea.next and web.next and addra.next == addrb.next:
+                    web.next = 0
+
+            self.compareFunc(func, ins, outs, no_collision, clka=self.clka, clkb=self.clkb)
+
+    def testArbiter(self):
+        ''' BEHAVIORAL: arbiter_priority, arbiter_roundrobin, arbiter_matrix '''
+        for N in [1, 3, 8]:
+            outs = {"gnt_vec": Signal(intbv(0)[N:]), "gnt_idx": Signal(intbv(0, min=0, max=N)), "gnt_vld": Signal(bool(0))}
+            self.compareFunc(arbiter_priority, {"req_vec": (Signal(intbv(0)[N:]), None)}, outs)
+
+            ins = {"rst": (self.rst, 0.02), "req_vec": (Signal(intbv(0)[N:]), None), "gnt_rdy": (Signal(bool(0)), 0.5)}
+            outs = {"gnt_vec": Signal(intbv(0)[N:]), "gnt_idx": Signal(intbv(0, min=0, max=N)), "gnt_vld": Signal(bool(0))}
+            self.compareFunc(arbiter_roundrobin, ins, outs, clk=self.clka)
+
+            ins = {"rst": (self.rst, 0.02), "req_vec": (Signal(intbv(0)[N:]), None), "gnt_rdy": (Signal(bool(0)), 0.5)}
+            outs = {"gnt_vec": Signal(intbv(0)[N:]), "gnt_idx": Signal(intbv(0, min=0, max=N)), "gnt_vld": Signal(bool(0))}
+            self.compareFunc(arbiter_matrix, ins, outs, clk=self.clka)
+
+    def testHsArb(self):
+        ''' BEHAVIORAL: hs_arbmux, hs_arbdemux '''
+        N = 4
+        for arb_type in behavioral.ARBITER_TYPES:
+            # The handshake tuples mix inputs and outputs: pass all outputs as one list
+            for mux in [True, False]:
+                hs_in = [Signal(bool(0)) for _ in range(N+1)]
+                outs = {"out": [Signal(bool(0)) for _ in range(N+1)] + [Signal(intbv(0, min=0, max=N))]}
+
+                def get(o):
+                    out = o["out"]
+                    if mux:
+                        return hs_arbmux(self.rst, self.clka, zip(out[:N], hs_in[:N]), (hs_in[N], out[N]), out[N+1], ARBITER_TYPE=arb_type)
+                    return hs_arbdemux(self.rst, self.clka, (out[N], hs_in[N]), zip(hs_in[:N], out[:N]), out[N+1], ARBITER_TYPE=arb_type)
+
+                ins = [(s, 0.5) for s in hs_in] + [(self.rst, 0.02)]
+                self.compare("hs_arbmux" if mux else "hs_arbdemux", ins, outs, get)
+
+    def testHsArbData(self):
+        ''' BEHAVIORAL: hs_arbmux, hs_arbdemux with data '''
+        N = 3
+        for arb_type in behavioral.ARBITER_TYPES:
+            for mux in [True, False]:
+                hs_in = [Signal(bool(0)) for _ in range(N+1)]
+                dat_in = [Signal(intbv(0)[8:]) for _ in range(N if mux else 1)]
+                outs = {"out": [Signal(bool(0)) for _ in range(N+1)] + [Signal(intbv(0, min=0, max=N))],
+                        "dat": [Signal(intbv(0)[8:]) for _ in range(1 if mux else N)]}
+
+                def get(o):
+                    out, dat = o["out"], o["dat"]
+                    if mux:
+                        return hs_arbmux(self.rst, self.clka, zip(out[:N], hs_in[:N], dat_in), (hs_in[N], out[N], dat[0]), out[N+1], ARBITER_TYPE=arb_type)
+                    return hs_arbdemux(self.rst, self.clka, (out[N], hs_in[N], dat_in[0]), zip(hs_in[:N], out[:N], dat), out[N+1], ARBITER_TYPE=arb_type)
+
+                ins = [(s, 0.5) for s in hs_in] + [(s, None) for s in dat_in] + [(self.rst, 0.02)]
+                self.compare("hs_arbmux" if mux else "hs_arbdemux", ins, outs, get)
+
+    def testHsArbDemuxMixed(self):
+        ''' BEHAVIORAL: hs_arbdemux, outputs with and without data '''
+        N = 4
+        for arb_type in behavioral.ARBITER_TYPES:
+            hs_in = [Signal(bool(0)) for _ in range(N+1)]
+            dat_in = [Signal(intbv(0)[8:])]
+            outs = {"out": [Signal(bool(0)) for _ in range(N+1)] + [Signal(intbv(0, min=0, max=N))],
+                    "dat": [Signal(intbv(0)[8:]) for _ in range(2)]}
+
+            def get(o):
+                out, dat = o["out"], o["dat"]
+                # Data only on the outputs 1 and 3
+                ls_hso = [(hs_in[0], out[0]), (hs_in[1], out[1], dat[0]), (hs_in[2], out[2]), (hs_in[3], out[3], dat[1])]
+                return hs_arbdemux(self.rst, self.clka, (out[N], hs_in[N], dat_in[0]), ls_hso, out[N+1], ARBITER_TYPE=arb_type)
+
+            ins = [(s, 0.5) for s in hs_in] + [(s, None) for s in dat_in] + [(self.rst, 0.02)]
+            self.compare("hs_arbdemux", ins, outs, get)
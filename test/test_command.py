@@ -0,0 +1,47 @@
+import unittest
+import time
+
+import myhdl_lib.simulation as sim
+
+
+class TestCommand(unittest.TestCase):
+
+    def testRunCommand(self):
+        ''' COMMAND: Output and exit code '''
+        r = sim.run_command("echo out; echo err >&2")
+        self.assertEqual(r.returncode, 0)
+        self.assertEqual(r.stdout, "out\n")
+        self.assertEqual(r.stderr, "err\n")
+        assert r.elapsed >= 0
+
+        with self.assertRaises(sim.CommandError) as cm:
+            sim.run_command("echo failed >&2; exit 3")
+        self.assertEqual(cm.exception.result.returncode, 3)
+        self.assertEqual(cm.exception.result.stderr, "failed\n")
+        assert "failed" in str(cm.exception)
+
+    def testRunCommandCwd(self):
+        ''' COMMAND: Working directory '''
+        r = sim.run_command("pwd", cwd="/")
+        self.assertEqual(r.stdout, "/\n")
+        self.assertEqual(r.cwd, "/")
+
+    def testRunCommands(self):
+        ''' COMMAND: Concurrent execution '''
+        N = 4
+        t0 = time.time()
+        results = sim.run_commands(["sleep 0.5; echo {}".format(i) for i in range(N)])
+        assert time.time() - t0 < 0.5*N
+        self.assertEqual([r.stdout for r in results], ["{}\n".format(i) for i in range(N)])
+
+        with self.assertRaises(sim.CommandError) as cm:
+            sim.run_commands(["true", "exit 1", "exit 2"])
+        self.assertEqual(cm.exception.result.returncode, 1)
+
+        results = sim.run_commands(["pwd", "pwd"], cwd=["/", "/tmp"])
+        self.assertEqual([r.stdout for r in results], ["/\n", "/tmp\n"])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
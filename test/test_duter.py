@@ -0,0 +1,160 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from myhdl import *
+from myhdl import CosimulationError
+from myhdl_lib.fifo import fifo
+import myhdl_lib.simulation as sim
+
+
+class TestDUTer(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.work_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        self.log = os.path.join(self.cache_dir, "analyze.log")
+
+        self.getDut = sim.DUTer()
+        # "Analyzes" the design by copying it; counts the analyze runs
+        self.getDut.registerSimulator(
+            name="copy",
+            hdl="Verilog",
+            analyze_cmd="echo {topname} >> " + self.log + "; cp {topname}.v {topname}.o",
+            simulate_cmd="true",
+            artifacts=["{topname}.o"]
+        )
+        self.getDut.selectSimulator("copy")
+
+        self.kwargs = dict(rst=Signal(bool(0)),
+                           clk=Signal(bool(0)),
+                           full=Signal(bool(0)),
+                           we=Signal(bool(0)),
+                           din=Signal(intbv(0)[8:]),
+                           empty=Signal(bool(0)),
+                           re=Signal(bool(0)),
+                           dout=Signal(intbv(0)[8:]))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.work_dir)
+
+    def analyzeCount(self):
+        if not os.path.exists(self.log):
+            return 0
+        with open(self.log) as f:
+            return len(f.readlines())
+
+    def cacheEntries(self):
+        return [e for e in os.listdir(self.cache_dir) if os.path.isdir(os.path.join(self.cache_dir, e))]
+
+    def getCosim(self, **kwargs):
+        ''' Converts, analyzes (or restores from the cache) and starts the co-simulation of a fifo in the work
+            directory. The simulate command of the test simulators is not a simulator, so starting it fails.
+        '''
+        os.chdir(self.work_dir)
+        try:
+            with self.assertRaises(CosimulationError):
+                self.getDut(fifo, **dict(self.kwargs, **kwargs))
+        finally:
+            os.chdir(self.cwd)
+
+    def testCache(self):
+        ''' DUTER: A cached design is restored without analyze, a changed design or command is a new entry '''
+        self.getDut.enableCache(self.cache_dir)
+        artifact = os.path.join(self.work_dir, "fifo.o")
+
+        self.getCosim(depth=4)
+        self.assertEqual(self.analyzeCount(), 1)
+        self.assertEqual(len(self.cacheEntries()), 1)
+        with open(artifact) as f:
+            compiled = f.read()
+
+        # Same design: the artifacts are restored from the cache
+        os.remove(artifact)
+        self.getCosim(depth=4)
+        self.assertEqual(self.analyzeCount(), 1)
+        with open(artifact) as f:
+            self.assertEqual(f.read(), compiled)
+        self.assertEqual([p for _, p, _ in self.getDut.getTiming()], ["convert", "analyze", "convert", "cache"])
+
+        # Changed HDL
+        self.getCosim(depth=8)
+        self.assertEqual(self.analyzeCount(), 2)
+        self.assertEqual(len(self.cacheEntries()), 2)
+
+        # Changed command string
+        self.getDut.registerSimulator(
+            name="copy_v2",
+            hdl="Verilog",
+            analyze_cmd="echo {topname} >> " + self.log + "; cp {topname}.v {topname}.o; true",
+            simulate_cmd="true",
+            artifacts=["{topname}.o"]
+        )
+        self.getDut.selectSimulator("copy_v2")
+        self.getCosim(depth=4)
+        self.assertEqual(self.analyzeCount(), 3)
+        self.assertEqual(len(self.cacheEntries()), 3)
+
+        # Without the cache the design is always analyzed
+        self.getDut.disableCache()
+        self.getCosim(depth=4)
+        self.assertEqual(self.analyzeCount(), 4)
+        self.assertEqual(len(self.cacheEntries()), 3)
+
+    def testAnalyzeError(self):
+        ''' DUTER: A failing analyze command raises CommandError with its output, and nothing is cached '''
+        self.getDut.enableCache(self.cache_dir)
+        self.getDut.registerSimulator(name="broken", hdl="Verilog", analyze_cmd="echo syntax error >&2; false", simulate_cmd="true", artifacts=["{topname}.o"])
+        self.getDut.selectSimulator("broken")
+        os.chdir(self.work_dir)
+        with self.assertRaises(sim.CommandError) as cm:
+            self.getDut(fifo, **self.kwargs)
+        self.assertEqual(cm.exception.result.returncode, 1)
+        self.assertEqual(cm.exception.result.stderr, "syntax error\n")
+        self.assertEqual(self.cacheEntries(), [])
+
+        # A failing elaborate command too
+        self.getDut.registerSimulator(name="broken_elab", hdl="Verilog", analyze_cmd="cp {topname}.v {topname}.o", elaborate_cmd="false", simulate_cmd="true", artifacts=["{topname}.o"])
+        self.getDut.selectSimulator("broken_elab")
+        with self.assertRaises(sim.CommandError):
+            self.getDut(fifo, **self.kwargs)
+        self.assertEqual(self.cacheEntries(), [])
+
+    def testPrecompileSweep(self):
+        ''' DUTER: Precompile a parameter sweep into the cache '''
+        self.getDut.enableCache(self.cache_dir)
+
+        self.getDut.precompileSweep(fifo, self.kwargs, {"depth": [4, 8, 4], "width": [8]})
+        self.assertEqual(self.analyzeCount(), 2)
+        self.assertEqual(len(self.cacheEntries()), 2)
+
+        # Compiled designs are not compiled again
+        self.getDut.precompileSweep(fifo, self.kwargs, {"depth": [4, 8, 16]})
+        self.assertEqual(self.analyzeCount(), 3)
+        self.assertEqual(len(self.cacheEntries()), 3)
+
+        phases = [p for _, p, _ in self.getDut.getTiming()]
+        self.assertEqual(phases.count("convert"), 6)
+        self.assertEqual(phases.count("analyze"), 3)
+        self.assertEqual(sorted(self.getDut.getTimingTotals().keys()), ["analyze", "convert"])
+
+    def testPrecompileErrors(self):
+        ''' DUTER: Precompile errors '''
+        with self.assertRaises(ValueError):
+            self.getDut.precompile([(fifo, self.kwargs)])
+
+        self.getDut.enableCache(self.cache_dir)
+        self.getDut.registerSimulator(name="broken", hdl="Verilog", analyze_cmd="exit 1", simulate_cmd="true", artifacts=["{topname}.o"])
+        self.getDut.selectSimulator("broken")
+        with self.assertRaises(sim.CommandError):
+            self.getDut.precompile([(fifo, self.kwargs)])
+        self.assertEqual(self.cacheEntries(), [])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import itertools
+import random
 
 from myhdl import *
 from myhdl_lib.fifo import fifo
@@ -697,6 +698,71 @@ class TestFifo(unittest.TestCase):
                 del dut, stm
 
 
+    def testReadLatency(self):
+        ''' FIFO: Synchronous read RAM with prefetch stage, random write and read '''
+        DEPTH = [1, 2, 5, 8]
+
+        def stim(DEPTH, READ_LATENCY):
+            @instance
+            def _inst():
+                fifo_model = []
+
+                yield self.reset()
+                yield self.fifo_state_check(aFull=0, aEmpty=1, aCount=0)
+
+                # Random writes and reads, then writes only, then reads only
+                for we_p, re_p in [(0.5, 0.5), (0.8, 0.3), (0.3, 0.8), (1, 0), (0, 1)]:
+                    for i in range(100):
+                        self.we.next = random.random() < we_p
+                        self.re.next = random.random() < re_p
+                        self.din.next = random.randrange(128)
+                        empty = self.empty.val
+                        yield self.clk.posedge
+                        if self.re and not empty:
+                            assert self.dout==fifo_model.pop(0)
+                        if self.we and not self.full:
+                            fifo_model.append(int(self.din))
+                        yield delay(1)
+                        assert self.full==(len(fifo_model)==DEPTH), "Full: expected={}, detected={}".format(len(fifo_model)==DEPTH, self.full)
+                        assert self.count==len(fifo_model), "Count: expected={}, detected={}".format(len(fifo_model), self.count)
+                        if not self.empty:
+                            assert self.dout==fifo_model[0], "Dout: expected={}, detected={}".format(fifo_model[0], self.dout)
+                        if re_p == 1 and i > 0:
+                            # Reads at every clock cycle drain the fifo without bubbles
+                            assert self.empty==(len(fifo_model)==0), "Empty: expected={}, detected={}".format(len(fifo_model)==0, self.empty)
+                        if we_p == 1 and i > READ_LATENCY:
+                            assert not self.empty
+                self.we.next = 0
+                self.re.next = 0
+                yield self.clk.posedge
+
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for rl in [1, 2]:
+                for dpt in DEPTH:
+                    dut = getDut( fifo,
+                                  rst=self.rst,
+                                  clk=self.clk,
+                                  full=self.full,
+                                  we=self.we,
+                                  din=self.din,
+                                  empty=self.empty,
+                                  re=self.re,
+                                  dout=self.dout,
+                                  count=self.count,
+                                  depth=dpt,
+                                  read_latency=rl
+                                )
+                    stm = stim(dpt, rl)
+                    Simulation(self.clkgen, dut, stm).run()
+                    del dut, stm
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testFifo']
     unittest.main()
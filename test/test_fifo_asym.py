@@ -0,0 +1,113 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.fifo_asym import fifo_asym
+import myhdl_lib.simulation as sim
+
+
+class TestFifoAsym(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        COUNT_MAX = 41
+
+        self.full = Signal(bool(0))
+        self.we = Signal(bool(0))
+        self.empty = Signal(bool(0))
+        self.re = Signal(bool(0))
+        self.afull = Signal(bool(0))
+        self.aempty = Signal(bool(0))
+        self.wcount = Signal(intbv(0, min=0, max=COUNT_MAX))
+        self.rcount = Signal(intbv(0, min=0, max=COUNT_MAX))
+        self.ovf = Signal(bool(0))
+        self.udf = Signal(bool(0))
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+        self.clkgen = self.clk.gen()
+
+    def tearDown(self):
+        pass
+
+    def reset(self):
+        yield self.rst.pulse(5)
+
+    def testWriteRead(self):
+        ''' FIFO_ASYM: Random write and read, narrow to wide and wide to narrow '''
+        CONFIG = [(8, 16, 2), (8, 32, 3), (8, 32, 5), (16, 8, 2), (32, 8, 3), (24, 8, 4)]
+
+        def stim(din, dout, DEPTH):
+            W = min(len(din), len(dout))
+            R = max(len(din), len(dout)) // W
+            WR = 1 if len(din) < len(dout) else R
+            RR = R if len(din) < len(dout) else 1
+            CELLS = DEPTH*R
+
+            @instance
+            def _inst():
+                cells = []      # narrow words, first word first
+                ovf, udf = 0, 0
+
+                yield self.reset()
+                for we_p, re_p in [(0.5, 0.5), (0.8, 0.3), (0.3, 0.8), (1, 0), (0, 1)]:
+                    for _ in range(80):
+                        self.we.next = random.random() < we_p
+                        self.re.next = random.random() < re_p
+                        din.next = random.randrange(2**len(din))
+                        yield delay(1)
+                        n = len(cells)
+                        assert self.wcount==(n + WR - 1)//WR, "WCount: expected={}, detected={}".format((n + WR - 1)//WR, self.wcount)
+                        assert self.rcount==n//RR, "RCount: expected={}, detected={}".format(n//RR, self.rcount)
+                        assert self.full==(CELLS - n < WR), "Full: expected={}, detected={}".format(CELLS - n < WR, self.full)
+                        assert self.empty==(n < RR), "Empty: expected={}, detected={}".format(n < RR, self.empty)
+                        assert self.afull==((CELLS - n)//WR <= (CELLS//WR)//2), "AFull: detected={}".format(self.afull)
+                        assert self.aempty==(n//RR <= (CELLS//RR)//2), "AEmpty: detected={}".format(self.aempty)
+                        assert self.ovf==ovf and self.udf==udf
+                        if n >= RR:
+                            expected = sum(cells[i] << (W*i) for i in range(RR))
+                            assert dout==expected, "Dout: expected={}, detected={}".format(expected, dout)
+                        yield self.clk.posedge
+                        if self.re:
+                            if n >= RR:
+                                del cells[:RR]
+                            else:
+                                udf = 1
+                        if self.we:
+                            if CELLS - n >= WR:
+                                cells.extend([(int(din) >> (W*i)) & (2**W-1) for i in range(WR)])
+                            else:
+                                ovf = 1
+                self.we.next = 0
+                self.re.next = 0
+                yield self.clk.posedge
+
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for w_din, w_dout, DEPTH in CONFIG:
+                din = Signal(intbv(0)[w_din:])
+                dout = Signal(intbv(0)[w_dout:])
+                dut = getDut(fifo_asym, rst=self.rst, clk=self.clk, full=self.full, we=self.we, din=din, empty=self.empty, re=self.re, dout=dout,
+                             afull=self.afull, aempty=self.aempty, ovf=self.ovf, udf=self.udf, wcount=self.wcount, rcount=self.rcount, depth=DEPTH)
+                stm = stim(din, dout, DEPTH)
+                Simulation(self.clkgen, dut, stm).run()
+                del dut, stm
+
+    def testParameters(self):
+        ''' FIFO_ASYM: Width ratio and depth checks '''
+        dut = lambda w_din, w_dout, depth: fifo_asym(self.rst, self.clk, self.full, self.we, Signal(intbv(0)[w_din:]), self.empty, self.re, Signal(intbv(0)[w_dout:]), depth=depth)
+        self.assertRaises(AssertionError, dut, 8, 12, 2)
+        self.assertRaises(AssertionError, dut, 8, 8, 2)
+        self.assertRaises(AssertionError, dut, 8, 16, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,10 @@
 import unittest
 import itertools
+import random
+import os
+import re
+import shutil
+import tempfile
 
 from myhdl import *
 from myhdl_lib.fifo_async import fifo_async
@@ -336,6 +341,232 @@ class TestFifoAsync(unittest.TestCase):
                 del dut, stm
 
 
+    def testReadLatency(self):
+        ''' FIFO_Async: Synchronous read RAM with prefetch stage, random write and read '''
+        DEPTH = [4, 8]
+
+        def stim(DEPTH):
+            fifo_model = []
+            done = [False]
+
+            @instance
+            def _write():
+                yield self.wreset()
+                for we_p in [0.5, 0.9, 0.3, 1]:
+                    for _ in range(150):
+                        self.we.next = random.random() < we_p
+                        self.wdata.next = random.randrange(128)
+                        yield self.wclk.posedge
+                        if self.we and not self.wfull:
+                            fifo_model.append(int(self.wdata))
+                        yield delay(1)
+                self.we.next = 0
+                done[0] = True
+
+            @instance
+            def _read():
+                yield self.rreset()
+                while not done[0] or fifo_model:
+                    self.re.next = random.random() < 0.7
+                    yield self.rclk.posedge
+                    if self.re and not self.rempty:
+                        assert self.rdata==fifo_model.pop(0)
+                    yield delay(1)
+                    if not self.rempty:
+                        assert self.rdata==fifo_model[0], "Dout: expected={}, detected={}".format(fifo_model[0], self.rdata)
+                raise StopSimulation
+
+            return _write, _read
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for rl in [1, 2]:
+                for dpt in DEPTH:
+                    dut = getDut( fifo_async,
+                                  wrst=self.wrst,
+                                  rrst=self.rrst,
+                                  wclk=self.wclk,
+                                  rclk=self.rclk,
+                                  wfull=self.wfull,
+                                  we=self.we,
+                                  wdata=self.wdata,
+                                  rempty=self.rempty,
+                                  re=self.re,
+                                  rdata=self.rdata,
+                                  depth=dpt,
+                                  read_latency=rl
+                                )
+                    stm = stim(dpt)
+                    Simulation(self.wclkgen, self.rclkgen, dut, stm).run()
+                    del dut, stm
+
+    def testDepthSyncStages(self):
+        ''' FIFO_Async: Depth not a power of 2 and 2 to 4 synchronizer stages, random write and read '''
+        CONFIG = [(5, 2), (6, 3), (12, 4), (4, 3)]
+
+        def stim(DEPTH, READ_LATENCY):
+            # Words held when full: the prefetch stage frees RAM cells
+            WORDS = DEPTH + (READ_LATENCY+1 if READ_LATENCY else 0)
+            fifo_model = []
+            done = [False]
+
+            @instance
+            def _write():
+                yield self.wreset()
+                yield delay(200)
+                # Fill: exactly WORDS words are written
+                for _ in range(WORDS+30):
+                    self.we.next = 1
+                    self.wdata.next = random.randrange(128)
+                    yield self.wclk.posedge
+                    if not self.wfull:
+                        fifo_model.append(int(self.wdata))
+                    yield delay(1)
+                assert len(fifo_model) == WORDS, "Words: expected={}, detected={}".format(WORDS, len(fifo_model))
+                assert self.wfull
+                done[0] = True
+                for we_p in [0.5, 0.9, 0.3]:
+                    for _ in range(100):
+                        self.we.next = random.random() < we_p
+                        self.wdata.next = random.randrange(128)
+                        yield self.wclk.posedge
+                        if self.we and not self.wfull:
+                            fifo_model.append(int(self.wdata))
+                        yield delay(1)
+                self.we.next = 0
+                done[0] = 2
+
+            @instance
+            def _read():
+                yield self.rreset()
+                while not done[0]:
+                    yield self.rclk.posedge
+                while done[0] != 2 or fifo_model:
+                    self.re.next = random.random() < 0.6
+                    yield self.rclk.posedge
+                    if self.re and not self.rempty:
+                        assert self.rdata==fifo_model.pop(0)
+                    yield delay(1)
+                    if not self.rempty:
+                        assert self.rdata==fifo_model[0], "Dout: expected={}, detected={}".format(fifo_model[0], self.rdata)
+                raise StopSimulation
+
+            return _write, _read
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for dpt, sync in CONFIG:
+                for rl in [0, 1]:
+                    dut = getDut( fifo_async,
+                                  wrst=self.wrst,
+                                  rrst=self.rrst,
+                                  wclk=self.wclk,
+                                  rclk=self.rclk,
+                                  wfull=self.wfull,
+                                  we=self.we,
+                                  wdata=self.wdata,
+                                  rempty=self.rempty,
+                                  re=self.re,
+                                  rdata=self.rdata,
+                                  depth=dpt,
+                                  read_latency=rl,
+                                  sync_stages=sync
+                                )
+                    stm = stim(dpt, rl)
+                    Simulation(self.wclkgen, self.rclkgen, dut, stm).run()
+                    del dut, stm
+
+    def testCountAlmostFlags(self):
+        ''' FIFO_Async: Write and read side counts and almost flags, thresholds as signals '''
+        DEPTH = 6
+        wafull, raempty = [Signal(bool(0)) for _ in range(2)]
+        wcount, rcount, wafull_th, raempty_th = [Signal(intbv(0, min=0, max=DEPTH+1)) for _ in range(4)]
+
+        def stim():
+            @instance
+            def _inst():
+                wafull_th.next = 2
+                raempty_th.next = 1
+                yield self.rreset()
+                yield self.wreset()
+                yield delay(1)
+                assert wcount==0 and rcount==0 and not wafull and raempty
+                for n in range(1, DEPTH+1):
+                    yield self.fifo_write(n)
+                    yield delay(1)
+                    assert wcount==n, "WCount: expected={}, detected={}".format(n, wcount)
+                    assert wafull==(DEPTH-n <= 2), "WAFull: expected={}, detected={}".format(DEPTH-n <= 2, wafull)
+                    for _ in range(4): yield self.rclk.posedge
+                    yield delay(1)
+                    assert rcount==n, "RCount: expected={}, detected={}".format(n, rcount)
+                    assert raempty==(n <= 1), "RAEmpty: expected={}, detected={}".format(n <= 1, raempty)
+                for n in range(DEPTH-1, -1, -1):
+                    yield self.fifo_read()
+                    yield delay(1)
+                    assert rcount==n, "RCount: expected={}, detected={}".format(n, rcount)
+                    assert raempty==(n <= 1), "RAEmpty: expected={}, detected={}".format(n <= 1, raempty)
+                    for _ in range(4): yield self.wclk.posedge
+                    yield delay(1)
+                    assert wcount==n, "WCount: expected={}, detected={}".format(n, wcount)
+                    assert wafull==(DEPTH-n <= 2), "WAFull: expected={}, detected={}".format(DEPTH-n <= 2, wafull)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = getDut( fifo_async,
+                          wrst=self.wrst,
+                          rrst=self.rrst,
+                          wclk=self.wclk,
+                          rclk=self.rclk,
+                          wfull=self.wfull,
+                          we=self.we,
+                          wdata=self.wdata,
+                          rempty=self.rempty,
+                          re=self.re,
+                          rdata=self.rdata,
+                          wafull=wafull,
+                          raempty=raempty,
+                          wafull_th=wafull_th,
+                          raempty_th=raempty_th,
+                          wcount=wcount,
+                          rcount=rcount,
+                          depth=DEPTH
+                        )
+            stm = stim()
+            Simulation(self.wclkgen, self.rclkgen, dut, stm).run()
+            del dut, stm
+
+    def testParameters(self):
+        ''' FIFO_Async: Depth and synchronizer stages checks '''
+        dut = lambda depth, sync_stages: fifo_async(self.wrst, self.rrst, self.wclk, self.rclk, self.wfull, self.we, self.wdata, self.rempty, self.re, self.rdata, depth=depth, sync_stages=sync_stages)
+        self.assertRaises(AssertionError, dut, 3, 2)
+        self.assertRaises(AssertionError, dut, 6, 1)
+        self.assertRaises(AssertionError, dut, 6, 5)
+
+    def testMemoryDepth(self):
+        ''' FIFO_Async: The memory of a depth that is not a power of 2 has depth words '''
+        wdata, rdata = Signal(intbv(0)[8:]), Signal(intbv(0)[8:])
+        tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for read_latency in [0, 1]:
+                toVerilog(fifo_async, self.wrst, self.rrst, self.wclk, self.rclk, self.wfull, self.we, wdata, self.rempty, self.re, rdata, depth=600, read_latency=read_latency)
+                with open("fifo_async.v") as f:
+                    v = f.read()
+                self.assertEqual(re.findall(r"reg \[7:0\] \w*memL \[0:(\d+)-1\];", v), ["600"])
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+
+
 
 if __name__ == '__main__':
     #import sys;sys.argv = ['', 'Test.testFifo']
@@ -0,0 +1,233 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.fifo import fifo
+from myhdl_lib.fifo_async import fifo_async
+from myhdl_lib.fifo_beh import fifo_beh
+from myhdl_lib.afifo_beh import afifo_beh
+import myhdl_lib.simulation as sim
+
+
+class TestFifoBeh(unittest.TestCase):
+    ''' Compares the behavioral model with the RTL of fifo under random traffic '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        DATA_RANGE_MAX = 128
+        DEPTH_MAX = 101
+
+        self.full = Signal(bool(0))
+        self.we = Signal(bool(0))
+        self.din = Signal(intbv(0, min=0, max=DATA_RANGE_MAX))
+        self.empty = Signal(bool(0))
+        self.re = Signal(bool(0))
+        self.dout = Signal(intbv(0, min=0, max=DATA_RANGE_MAX))
+        self.afull = Signal(bool(0))
+        self.aempty = Signal(bool(0))
+        self.count = Signal(intbv(0, min=0, max=DEPTH_MAX))
+        self.count_max = Signal(intbv(0, min=0, max=DEPTH_MAX))
+        self.ovf = Signal(bool(0))
+        self.udf = Signal(bool(0))
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+        self.clkgen = self.clk.gen()
+
+    def check(self, m):
+        assert m.isFull()==self.full, "Full: expected={}, detected={}".format(m.isFull(), self.full)
+        assert m.isEmpty()==self.empty, "Empty: expected={}, detected={}".format(m.isEmpty(), self.empty)
+        assert m.isAFull()==self.afull, "AFull: expected={}, detected={}".format(m.isAFull(), self.afull)
+        assert m.isAEmpty()==self.aempty, "AEmpty: expected={}, detected={}".format(m.isAEmpty(), self.aempty)
+        assert m.getCount()==self.count, "Count: expected={}, detected={}".format(m.getCount(), self.count)
+        assert m.getCountMax()==self.count_max, "CountMax: expected={}, detected={}".format(m.getCountMax(), self.count_max)
+        assert m.isOvf()==self.ovf, "Overflow: expected={}, detected={}".format(m.isOvf(), self.ovf)
+        assert m.isUdf()==self.udf, "Underflow: expected={}, detected={}".format(m.isUdf(), self.udf)
+        if not m.isEmpty():
+            assert m.getDout()==self.dout, "Dout: expected={}, detected={}".format(m.getDout(), self.dout)
+
+    def testRandom(self):
+        ''' FIFO_BEH: Random traffic, model vs RTL '''
+        DEPTH = [1, 2, 5, 8]
+        CYCLES = 400
+
+        def stim(DEPTH, AFULL_TH, AEMPTY_TH):
+            @instance
+            def _inst():
+                m = fifo_beh(DEPTH, afull_th=AFULL_TH, aempty_th=AEMPTY_TH)
+                yield self.rst.pulse(5)
+                yield delay(1)
+                self.check(m)
+
+                for i in range(CYCLES):
+                    # Vary the write/read ratio to visit both full and empty
+                    p = 0.8 if (i//50)%2 else 0.2
+                    we = random.random() < p
+                    re = random.random() < 1-p
+                    val = random.randrange(self.din.max)
+                    self.we.next = we
+                    self.re.next = re
+                    self.din.next = val
+                    yield self.clk.posedge
+                    if we and re:
+                        m.write_read(val)
+                    elif we:
+                        m.write(val)
+                    elif re:
+                        m.read()
+                    else:
+                        m.idle()
+                    yield delay(1)
+                    self.check(m)
+
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for dpt in DEPTH:
+                afull_th = random.randint(0, dpt)
+                aempty_th = random.randint(0, dpt)
+                dut = getDut(fifo,
+                             rst=self.rst,
+                             clk=self.clk,
+                             full=self.full,
+                             we=self.we,
+                             din=self.din,
+                             empty=self.empty,
+                             re=self.re,
+                             dout=self.dout,
+                             afull=self.afull,
+                             aempty=self.aempty,
+                             count=self.count,
+                             afull_th=afull_th,
+                             aempty_th=aempty_th,
+                             ovf=self.ovf,
+                             udf=self.udf,
+                             count_max=self.count_max,
+                             depth=dpt,
+                             width=None)
+                stm = stim(dpt, afull_th, aempty_th)
+                Simulation(self.clkgen, dut, stm).run()
+                del dut, stm
+
+
+class TestAFifoBeh(unittest.TestCase):
+    ''' Compares the behavioral model with the RTL of fifo_async under random traffic '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        DATA_RANGE_MAX = 128
+
+        self.wfull = Signal(bool(0))
+        self.we = Signal(bool(0))
+        self.wdata = Signal(intbv(0, min=0, max=DATA_RANGE_MAX))
+        self.rempty = Signal(bool(0))
+        self.re = Signal(bool(0))
+        self.rdata = Signal(intbv(0, min=0, max=DATA_RANGE_MAX))
+        self.wafull = Signal(bool(0))
+        self.raempty = Signal(bool(0))
+        self.wcount = Signal(intbv(0, min=0, max=17))
+        self.rcount = Signal(intbv(0, min=0, max=17))
+
+        # Even periods: edges of the two clocks are either simultaneous or at least 2ns apart
+        self.wclk = sim.Clock(val=0, period=10, units="ns")
+        self.rclk = sim.Clock(val=0, period=14, units="ns")
+        self.wrst = sim.ResetSync(clk=self.wclk, val=0, active=1)
+        self.rrst = sim.ResetSync(clk=self.rclk, val=0, active=1)
+        self.wclkgen = self.wclk.gen()
+        self.rclkgen = self.rclk.gen()
+
+    def check(self, m):
+        assert m.isFull()==self.wfull, "Full: expected={}, detected={}".format(m.isFull(), self.wfull)
+        assert m.isEmpty()==self.rempty, "Empty: expected={}, detected={}".format(m.isEmpty(), self.rempty)
+        if not m.isEmpty():
+            assert m.getDout()==self.rdata, "Dout: expected={}, detected={}".format(m.getDout(), self.rdata)
+        assert m.isAFull()==self.wafull, "AFull: expected={}, detected={}".format(m.isAFull(), self.wafull)
+        assert m.isAEmpty()==self.raempty, "AEmpty: expected={}, detected={}".format(m.isAEmpty(), self.raempty)
+        assert m.getWCount()==self.wcount, "WCount: expected={}, detected={}".format(m.getWCount(), self.wcount)
+        assert m.getRCount()==self.rcount, "RCount: expected={}, detected={}".format(m.getRCount(), self.rcount)
+
+    def testRandom(self):
+        ''' AFIFO_BEH: Random traffic, model vs RTL '''
+        CONFIG = [(4, 2, None, None), (8, 2, 1, 6), (5, 2, None, None), (6, 3, 2, 1), (12, 4, None, None)]
+        EDGES = 600
+
+        def stim(DEPTH, SYNC_STAGES, AFULL_TH, AEMPTY_TH):
+            last_edge = {}
+
+            @always(self.wclk.posedge)
+            def _wmon():
+                last_edge["w"] = now()
+
+            @always(self.rclk.posedge)
+            def _rmon():
+                last_edge["r"] = now()
+
+            @instance
+            def _inst():
+                m = afifo_beh(DEPTH, SYNC_STAGES, AFULL_TH, AEMPTY_TH)
+                yield self.rrst.pulse(5)
+                yield self.wrst.pulse(5)
+
+                we, val, re = False, 0, False
+                for i in range(EDGES):
+                    yield self.wclk.posedge, self.rclk.posedge
+                    t = now()
+                    # Inputs sampled at this edge; drive the next ones
+                    we_s, val_s, re_s = we, val, re
+                    p = 0.8 if (i//60)%2 else 0.2
+                    we = random.random() < p
+                    re = random.random() < 1-p
+                    val = random.randrange(self.wdata.max)
+                    self.we.next = we
+                    self.re.next = re
+                    self.wdata.next = val
+                    yield delay(1)
+                    m.edge(wclk=(last_edge.get("w")==t), rclk=(last_edge.get("r")==t), we=we_s, wdata=val_s, re=re_s)
+                    self.check(m)
+
+                raise StopSimulation
+            return _wmon, _rmon, _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for dpt, sync, afull_th, aempty_th in CONFIG:
+                dut = getDut(fifo_async,
+                             wrst=self.wrst,
+                             rrst=self.rrst,
+                             wclk=self.wclk,
+                             rclk=self.rclk,
+                             wfull=self.wfull,
+                             we=self.we,
+                             wdata=self.wdata,
+                             rempty=self.rempty,
+                             re=self.re,
+                             rdata=self.rdata,
+                             wafull=self.wafull,
+                             raempty=self.raempty,
+                             wafull_th=afull_th,
+                             raempty_th=aempty_th,
+                             wcount=self.wcount,
+                             rcount=self.rcount,
+                             depth=dpt,
+                             width=None,
+                             sync_stages=sync)
+                stm = stim(dpt, sync, afull_th, aempty_th)
+                Simulation(self.wclkgen, self.rclkgen, dut, stm).run()
+                del dut, stm
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.fifo_multi import fifo_multi
+import myhdl_lib.simulation as sim
+
+
+def fifo_multi_2(rst, clk, full, we, din0, din1, empty, re, dout0, dout1, afull, aempty, ovf, udf, count, count_max, depth):
+    return fifo_multi(rst, clk, full, we, [din0, din1], empty, re, [dout0, dout1], afull=afull, aempty=aempty, ovf=ovf, udf=udf, count=count, count_max=count_max, depth=depth)
+
+def fifo_multi_4(rst, clk, full, we, din0, din1, din2, din3, empty, re, dout0, dout1, dout2, dout3, afull, aempty, ovf, udf, count, count_max, depth):
+    return fifo_multi(rst, clk, full, we, [din0, din1, din2, din3], empty, re, [dout0, dout1, dout2, dout3], afull=afull, aempty=aempty, ovf=ovf, udf=udf, count=count, count_max=count_max, depth=depth)
+
+
+class TestFifoMulti(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        K_MAX = 4
+        DEPTH_MAX = 33
+
+        self.full = Signal(bool(0))
+        self.we = Signal(intbv(0, min=0, max=K_MAX+1))
+        self.din = [Signal(intbv(0)[8:]) for _ in range(K_MAX)]
+        self.empty = Signal(bool(0))
+        self.re = Signal(intbv(0, min=0, max=K_MAX+1))
+        self.dout = [Signal(intbv(0)[8:]) for _ in range(K_MAX)]
+        self.afull = Signal(bool(0))
+        self.aempty = Signal(bool(0))
+        self.count = Signal(intbv(0, min=0, max=DEPTH_MAX))
+        self.count_max = Signal(intbv(0, min=0, max=DEPTH_MAX))
+        self.ovf = Signal(bool(0))
+        self.udf = Signal(bool(0))
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+        self.clkgen = self.clk.gen()
+
+    def tearDown(self):
+        pass
+
+    def reset(self):
+        yield self.rst.pulse(5)
+
+    def getDut(self, getDut, K, depth):
+        kw = dict(rst=self.rst, clk=self.clk, full=self.full, we=self.we, empty=self.empty, re=self.re, afull=self.afull, aempty=self.aempty,
+                  ovf=self.ovf, udf=self.udf, count=self.count, count_max=self.count_max, depth=depth)
+        for i in range(K):
+            kw["din{}".format(i)] = self.din[i]
+            kw["dout{}".format(i)] = self.dout[i]
+        return getDut({2: fifo_multi_2, 4: fifo_multi_4}[K], **kw)
+
+    def fifo_check(self, K, DEPTH, fifo_model, count_max, ovf, udf):
+        yield delay(1)
+        n = len(fifo_model)
+        assert self.count==n, "Count: expected={}, detected={}".format(n, self.count)
+        assert self.full==(DEPTH-n < K), "Full: expected={}, detected={}".format(DEPTH-n < K, self.full)
+        assert self.empty==(n==0), "Empty: expected={}, detected={}".format(n==0, self.empty)
+        assert self.afull==(DEPTH-n <= DEPTH//2), "AFull: expected={}, detected={}".format(DEPTH-n <= DEPTH//2, self.afull)
+        assert self.aempty==(n <= DEPTH//2), "AEmpty: expected={}, detected={}".format(n <= DEPTH//2, self.aempty)
+        assert self.count_max==count_max, "CountMax: expected={}, detected={}".format(count_max, self.count_max)
+        assert self.ovf==ovf, "Overflow: expected={}, detected={}".format(ovf, self.ovf)
+        assert self.udf==udf, "Underflow: expected={}, detected={}".format(udf, self.udf)
+        for i in range(min(K, n)):
+            assert self.dout[i]==fifo_model[i], "Dout[{}]: expected={}, detected={}".format(i, fifo_model[i], self.dout[i])
+
+    def testWriteRead(self):
+        ''' FIFO_MULTI: Random number of words written and read per clock cycle '''
+        CONFIG = [(2, 4), (2, 6), (4, 8), (4, 12), (4, 16)]
+
+        def stim(K, DEPTH):
+            @instance
+            def _inst():
+                fifo_model = []
+                count_max = 0
+
+                yield self.reset()
+                yield self.fifo_check(K, DEPTH, fifo_model, count_max, 0, 0)
+
+                # Random writes and reads that fit, then writes only, then reads only
+                for we_p, re_p in [(0.5, 0.5), (0.8, 0.3), (0.3, 0.8), (1, 0), (0, 1)]:
+                    for _ in range(60):
+                        n = len(fifo_model)
+                        we = random.randint(1, K) if random.random() < we_p else 0
+                        re = random.randint(1, K) if random.random() < re_p else 0
+                        self.we.next = min(we, DEPTH - n)
+                        self.re.next = min(re, n)
+                        for i in range(K):
+                            self.din[i].next = random.randrange(256)
+                        yield self.clk.posedge
+                        del fifo_model[:int(self.re)]
+                        fifo_model.extend([int(self.din[i]) for i in range(int(self.we))])
+                        count_max = max(count_max, len(fifo_model))
+                        yield self.fifo_check(K, DEPTH, fifo_model, count_max, 0, 0)
+                self.we.next = 0
+                self.re.next = 0
+                yield self.clk.posedge
+
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for K, DEPTH in CONFIG:
+                dut = self.getDut(getDut, K, DEPTH)
+                stm = stim(K, DEPTH)
+                Simulation(self.clkgen, dut, stm).run()
+                del dut, stm
+
+    def testOverflowUnderflow(self):
+        ''' FIFO_MULTI: A write that does not fit and a read of more words than available are ignored and flagged '''
+        K, DEPTH = 4, 8
+
+        def stim():
+            @instance
+            def _inst():
+                fifo_model = []
+
+                yield self.reset()
+                # Read from an empty fifo
+                self.re.next = 1
+                yield self.clk.posedge
+                self.re.next = 0
+                yield self.fifo_check(K, DEPTH, fifo_model, 0, 0, 1)
+                # Fill up to 6 words
+                for we in [4, 2]:
+                    self.we.next = we
+                    for i in range(K):
+                        self.din[i].next = len(fifo_model) + i
+                    yield self.clk.posedge
+                    fifo_model.extend(range(len(fifo_model), len(fifo_model) + we))
+                self.we.next = 0
+                yield self.fifo_check(K, DEPTH, fifo_model, 6, 0, 1)
+                # Write of 3 words does not fit, even with a simultaneous read
+                self.we.next = 3
+                self.re.next = 2
+                yield self.clk.posedge
+                self.we.next = 0
+                self.re.next = 0
+                del fifo_model[:2]
+                yield self.fifo_check(K, DEPTH, fifo_model, 6, 1, 1)
+                # Read of 4 words from 4 words
+                self.re.next = 4
+                yield self.clk.posedge
+                self.re.next = 0
+                del fifo_model[:4]
+                yield self.fifo_check(K, DEPTH, fifo_model, 6, 1, 1)
+                # Reset clears the flags
+                yield self.reset()
+                yield self.fifo_check(K, DEPTH, [], 0, 0, 0)
+
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = self.getDut(getDut, K, DEPTH)
+            stm = stim()
+            Simulation(self.clkgen, dut, stm).run()
+            del dut, stm
+
+    def testParameters(self):
+        ''' FIFO_MULTI: Number of words and depth checks '''
+        dut = lambda K, depth: fifo_multi(self.rst, self.clk, self.full, self.we, self.din[:K], self.empty, self.re, self.dout[:K], depth=depth)
+        self.assertRaises(AssertionError, dut, 3, 12)
+        self.assertRaises(AssertionError, dut, 4, 4)
+        self.assertRaises(AssertionError, dut, 4, 10)
+        self.assertRaises(AssertionError, fifo_multi, self.rst, self.clk, self.full, self.we, self.din[:4], self.empty, self.re, self.dout[:2])
+
+
+if __name__ == "__main__":
+    unittest.main()
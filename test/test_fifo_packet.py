@@ -0,0 +1,201 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.fifo_packet import fifo_packet
+import myhdl_lib.simulation as sim
+
+
+class TestFifoPacket(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        DEPTH_MAX = 65
+
+        self.rx_vld, self.rx_sop, self.rx_eop, self.rx_err = [Signal(bool(0)) for _ in range(4)]
+        self.tx_rdy, self.tx_vld, self.tx_sop, self.tx_eop, self.tx_err = [Signal(bool(0)) for _ in range(5)]
+        self.rx_dat, self.tx_dat = [Signal(intbv(0)[16:]) for _ in range(2)]
+        self.rx_mty, self.tx_mty = [Signal(intbv(0)[1:]) for _ in range(2)]
+        self.pkt_count = Signal(intbv(0, min=0, max=DEPTH_MAX))
+        self.pkt_rdy = Signal(bool(0))
+        self.drop = Signal(bool(0))
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+        self.clkgen = self.clk.gen()
+
+    def tearDown(self):
+        pass
+
+    def reset(self):
+        yield self.rst.pulse(5)
+
+    def packets(self, n, err_p):
+        ''' Random packets: lists of (dat, mty) words and an error flag '''
+        pkts = []
+        for _ in range(n):
+            words = [(random.randrange(2**16), 0) for _ in range(random.randint(1, 5))]
+            words[-1] = (words[-1][0], random.randrange(2))
+            pkts.append((words, random.random() < err_p))
+        return pkts
+
+    def send(self, pkts, vld_p, eop_cycle):
+        ''' Writes the packets, eop_cycle collects the clock cycle of every eop '''
+        for words, err in pkts:
+            for i, (dat, mty) in enumerate(words):
+                while random.random() > vld_p:
+                    self.rx_vld.next = 0
+                    yield self.clk.posedge
+                self.rx_vld.next = 1
+                self.rx_sop.next = (i == 0)
+                self.rx_eop.next = (i == len(words) - 1)
+                self.rx_dat.next = dat
+                self.rx_mty.next = mty if (i == len(words) - 1) else 0
+                self.rx_err.next = err and (i == len(words) - 1)
+                yield self.clk.posedge
+            eop_cycle.append(now())
+        self.rx_vld.next = 0
+        self.rx_sop.next = 0
+        self.rx_eop.next = 0
+        self.rx_err.next = 0
+
+    def monitor(self, rcvd, drops):
+        ''' Collects the read packets and counts the drop pulses '''
+        @instance
+        def _inst():
+            words = []
+            while True:
+                yield self.clk.posedge
+                if self.drop:
+                    drops.append(now())
+                if self.tx_vld and self.tx_rdy:
+                    if self.tx_sop:
+                        assert words == [], "Missing eop"
+                    else:
+                        assert words != [], "Missing sop"
+                    words.append((int(self.tx_dat), int(self.tx_mty) if self.tx_eop else 0))
+                    if self.tx_eop:
+                        rcvd.append((words, bool(self.tx_err), now()))
+                        words = []
+        return _inst
+
+    def getDut(self, getDut, depth, cut_through):
+        kw = dict(rst=self.rst, clk=self.clk, rx_vld=self.rx_vld, rx_sop=self.rx_sop, rx_eop=self.rx_eop, rx_dat=self.rx_dat, rx_mty=self.rx_mty, rx_err=self.rx_err,
+                  tx_rdy=self.tx_rdy, tx_vld=self.tx_vld, tx_sop=self.tx_sop, tx_eop=self.tx_eop, tx_dat=self.tx_dat, tx_mty=self.tx_mty,
+                  pkt_count=self.pkt_count, pkt_rdy=self.pkt_rdy, drop=self.drop, depth=depth, cut_through=cut_through)
+        if cut_through:
+            kw["tx_err"] = self.tx_err
+        return getDut(fifo_packet, **kw)
+
+    def testStoreAndForward(self):
+        ''' FIFO_PACKET: Store-and-forward, packets with errors and packets that do not fit are dropped '''
+        def stim(rcvd, drops):
+            rdy_p = [0]
+
+            @instance
+            def rdy_gen():
+                while True:
+                    self.tx_rdy.next = random.random() < rdy_p[0]
+                    yield self.clk.posedge
+                    yield delay(1)
+                    assert self.pkt_rdy == (self.pkt_count != 0)
+                    assert not self.tx_vld or self.pkt_rdy, "A packet is read before its eop"
+
+            @instance
+            def _inst():
+                yield self.reset()
+
+                # No reads: the good packets are stored, the bad ones dropped
+                pkts = self.packets(6, 0.3)
+                yield self.send(pkts, 0.7, [])
+                yield self.clk.posedge
+                yield delay(1)
+                good = [words for words, err in pkts if not err]
+                assert self.pkt_count == len(good), "PktCount: expected={}, detected={}".format(len(good), self.pkt_count)
+                assert self.pkt_rdy == (len(good) > 0)
+                assert len(drops) == len(pkts) - len(good)
+                rdy_p[0] = 1
+                for _ in range(40):
+                    yield self.clk.posedge
+                assert [words for words, _, _ in rcvd] == good
+                assert self.pkt_count == 0 and not self.pkt_rdy and not self.tx_vld
+
+                # Random reads: every packet is read completely after its eop, or dropped
+                del rcvd[:], drops[:]
+                for vld_p, p in [(0.5, 0.8), (1, 0.5), (1, 0.2)]:
+                    pkts = self.packets(30, 0.1)
+                    eop_cycle = []
+                    rdy_p[0] = p
+                    yield self.send(pkts, vld_p, eop_cycle)
+                    rdy_p[0] = 1
+                    for _ in range(40):
+                        yield self.clk.posedge
+                    i = 0
+                    for words, err, cycle in rcvd:
+                        while pkts[i][0] != words:
+                            i += 1
+                        assert not pkts[i][1], "A packet with an error is read"
+                        assert cycle > eop_cycle[i]
+                        i += 1
+                    assert len(rcvd) + len(drops) == len(pkts), "Packets: sent={}, read={}, dropped={}".format(len(pkts), len(rcvd), len(drops))
+                    if vld_p < 1:
+                        assert len(rcvd) == len([pkt for pkt in pkts if not pkt[1]])
+                    del rcvd[:], drops[:]
+
+                raise StopSimulation
+            return _inst, rdy_gen
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            rcvd, drops = [], []
+            dut = self.getDut(getDut, 32, False)
+            Simulation(self.clkgen, dut, self.monitor(rcvd, drops), stim(rcvd, drops)).run()
+            del dut
+
+    def testCutThrough(self):
+        ''' FIFO_PACKET: Cut-through, the words are read in the clock cycle after they are written '''
+        def stim(rcvd, drops):
+            @instance
+            def _inst():
+                yield self.reset()
+                self.tx_rdy.next = 1
+
+                pkts = self.packets(30, 0.3)
+                eop_cycle = []
+                yield self.send(pkts, 0.7, eop_cycle)
+                for _ in range(10):
+                    yield self.clk.posedge
+                assert [(words, err) for words, err, _ in rcvd] == pkts
+                assert [cycle for _, _, cycle in rcvd] == [cycle + 10 for cycle in eop_cycle], "Cut-through latency"
+                assert drops == []
+                assert self.pkt_count == 0
+
+                # No reads: the packets are counted as they are written, the overflow is dropped
+                self.tx_rdy.next = 0
+                del rcvd[:]
+                yield self.send([([(i, 0)], False) for i in range(10)], 1, [])
+                yield self.clk.posedge
+                yield delay(1)
+                assert self.pkt_count == 8 and self.pkt_rdy
+                assert len(drops) == 2
+
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            rcvd, drops = [], []
+            dut = self.getDut(getDut, 8, True)
+            Simulation(self.clkgen, dut, self.monitor(rcvd, drops), stim(rcvd, drops)).run()
+            del dut
+
+
+if __name__ == "__main__":
+    unittest.main()
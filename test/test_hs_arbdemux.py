@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
 from myhdl_lib.handshake import hs_arbdemux
+from myhdl_lib.utils import assign
 import myhdl_lib.simulation as sim
 from myhdl_lib.utils import assign
 
@@ -14,7 +16,7 @@ class TestArbDemux(unittest.TestCase):
         cls.simulators = ["myhdl", "icarus"]
 
     @staticmethod
-    def hs_arbdemux_top(rst, clk, i_rdy, i_vld, o0_rdy, o0_vld, o1_rdy, o1_vld, o2_rdy, o2_vld, sel, ARBITER_TYPE):
+    def hs_arbdemux_top(rst, clk, i_rdy, i_vld, o0_rdy, o0_vld, o1_rdy, o1_vld, o2_rdy, o2_vld, sel, ARBITER_TYPE, weights=None, quantums=None):
         ''' Needed when hs_arbdemux is co-simulated as top level'''
 
         hsi_rdy = Signal(bool(0))
@@ -42,7 +44,7 @@ class TestArbDemux(unittest.TestCase):
         hsi = (hsi_rdy, hsi_vld)
         ls_hso = [(hso0_rdy, hso0_vld), (hso1_rdy, hso1_vld), (hso2_rdy, hso2_vld)]
 
-        _inst = hs_arbdemux(clk=clk, rst=rst, hsi=hsi, ls_hso=ls_hso, sel=sel, ARBITER_TYPE=ARBITER_TYPE)
+        _inst = hs_arbdemux(clk=clk, rst=rst, hsi=hsi, ls_hso=ls_hso, sel=sel, ARBITER_TYPE=ARBITER_TYPE, weights=weights, quantums=quantums)
 
         return instances()
 
@@ -208,6 +210,200 @@ class TestArbDemux(unittest.TestCase):
             del clkgen, dut, stm
 
 
+    def testArbDemux3Random(self):
+        ''' HS_ARBDEMUX: 3 outputs, random valid and ready, the roundrobin_pp and matrix arbiters compared to a model '''
+        NUM_OUTPUTS = 3
+
+        hsi_rdy = Signal(bool(0))
+        hsi_vld = Signal(bool(0))
+        hsi = (hsi_rdy, hsi_vld)
+
+        ls_hso_rdy = [Signal(bool(0)) for _ in range(NUM_OUTPUTS)]
+        ls_hso_vld = [Signal(bool(0)) for _ in range(NUM_OUTPUTS)]
+        ls_hso = zip(ls_hso_rdy, ls_hso_vld)
+
+        sel = Signal(intbv(0, min=0, max=NUM_OUTPUTS))
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(ARBITER_TYPE):
+            @instance
+            def _inst():
+                for i in range(NUM_OUTPUTS):
+                    ls_hso_rdy[i].next = 0
+                hsi_vld.next = 0
+                yield rst.pulse(10)
+                prio = NUM_OUTPUTS-1
+                order = list(range(NUM_OUTPUTS))
+                for _ in range(300):
+                    for i in range(NUM_OUTPUTS):
+                        ls_hso_rdy[i].next = random.random() < 0.5
+                    hsi_vld.next = random.random() < 0.7
+                    yield delay(1)
+                    req = [bool(r) for r in ls_hso_rdy]
+                    if any(req):
+                        if ARBITER_TYPE == "matrix":
+                            # Least recently granted
+                            s = [j for j in order if req[j]][0]
+                        else:
+                            s = [j % NUM_OUTPUTS for j in range(prio+1, prio+1+NUM_OUTPUTS) if req[j % NUM_OUTPUTS]][0]
+                        assert s==sel, "{}: sel: expected {}, detected {}".format(ARBITER_TYPE, s, sel)
+                    assert any(req)==hsi_rdy, "{}: hsi_rdy: expected {}, detected {}".format(ARBITER_TYPE, any(req), hsi_rdy)
+                    for k in range(NUM_OUTPUTS):
+                        vld = (k==sel) and bool(hsi_vld)
+                        assert vld==ls_hso_vld[k], "{}: hso_vld[{}]: expected {}, detected {}".format(ARBITER_TYPE, k, vld, ls_hso_vld[k])
+                    if hsi_vld and hsi_rdy:
+                        prio = int(sel)
+                        order.remove(prio)
+                        order.append(prio)
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for ARBITER_TYPE in ["roundrobin_pp", "matrix"]:
+                argl = {"rst":rst, "clk":clk,
+                        "i_rdy":hsi[0], "i_vld":hsi[1],
+                        "o0_rdy":ls_hso[0][0], "o0_vld":ls_hso[0][1],
+                        "o1_rdy":ls_hso[1][0], "o1_vld":ls_hso[1][1],
+                        "o2_rdy":ls_hso[2][0], "o2_vld":ls_hso[2][1],
+                        "sel":sel, "ARBITER_TYPE":ARBITER_TYPE}
+                clkgen = clk.gen()
+                dut = getDut(self.hs_arbdemux_top, **argl)
+                stm = stim(ARBITER_TYPE)
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+
+    def testArbDemux3Shares(self):
+        "HS_ARBDEMUX: 3 outputs, weighted_rr and deficit_rr arbiters share the transfers in proportion to the weights and quantums, with no idle clock cycles"
+
+        NUM_OUTPUTS = 3
+        SHARES = [2, 1, 3]
+
+        hsi_rdy = Signal(bool(0))
+        hsi_vld = Signal(bool(0))
+        hsi = (hsi_rdy, hsi_vld)
+
+        ls_hso_rdy = [Signal(bool(0)) for _ in range(NUM_OUTPUTS)]
+        ls_hso_vld = [Signal(bool(0)) for _ in range(NUM_OUTPUTS)]
+        ls_hso = zip(ls_hso_rdy, ls_hso_vld)
+
+        sel = Signal(intbv(0, min=0, max=NUM_OUTPUTS))
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(transfers, offered):
+            @instance
+            def _inst():
+                for i in range(NUM_OUTPUTS):
+                    ls_hso_rdy[i].next = 0
+                hsi_vld.next = 0
+                yield rst.pulse(10)
+                for i in range(NUM_OUTPUTS):
+                    ls_hso_rdy[i].next = 1
+                for _ in range(600):
+                    hsi_vld.next = random.random() < 0.8
+                    yield delay(1)
+                    for k in range(NUM_OUTPUTS):
+                        if k != sel:
+                            assert 0==ls_hso_vld[k], "hso_vld[{}]: expected {}, detected {}".format(k, 0, ls_hso_vld[k])
+                    assert not ls_hso_vld[sel] or hsi_rdy, "hso_vld[{}] without hsi_rdy".format(int(sel))
+                    if hsi_vld and hsi_rdy:
+                        transfers[sel] += 1
+                    if hsi_vld:
+                        offered[0] += 1
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for ARBITER_TYPE, param in [("weighted_rr", "weights"), ("deficit_rr", "quantums")]:
+                argl = {"rst":rst, "clk":clk,
+                        "i_rdy":hsi[0], "i_vld":hsi[1],
+                        "o0_rdy":ls_hso[0][0], "o0_vld":ls_hso[0][1],
+                        "o1_rdy":ls_hso[1][0], "o1_vld":ls_hso[1][1],
+                        "o2_rdy":ls_hso[2][0], "o2_vld":ls_hso[2][1],
+                        "sel":sel, "ARBITER_TYPE":ARBITER_TYPE, param:SHARES}
+                offered = [0]
+                transfers = [0]*NUM_OUTPUTS
+                clkgen = clk.gen()
+                dut=getDut(self.hs_arbdemux_top, **argl)
+                stm = stim(transfers, offered)
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+                # A transfer in every clock cycle the input side is ready, also when the turn changes
+                assert sum(transfers) == offered[0], "{}: {} transfers in {} clock cycles".format(ARBITER_TYPE, sum(transfers), offered[0])
+                for i in range(NUM_OUTPUTS):
+                    share = float(transfers[i]) / sum(transfers)
+                    expected = float(SHARES[i]) / sum(SHARES)
+                    assert abs(share - expected) < 0.05, "{}: share of output {}: expected {}, detected {}".format(ARBITER_TYPE, i, expected, share)
+
+
+    def testArbDemux3Data(self):
+        "HS_ARBDEMUX: 3 outputs with data, all outputs get the input data"
+
+        NUM_OUTPUTS = 3
+
+        def hs_arbdemux_data_top(rst, clk, i_rdy, i_vld, i_dat, o0_rdy, o0_vld, o0_dat, o1_rdy, o1_vld, o1_dat, o2_rdy, o2_vld, o2_dat, sel, ARBITER_TYPE):
+            ''' Needed when hs_arbdemux is co-simulated as top level'''
+            ls_o = [(o0_rdy, o0_vld, o0_dat), (o1_rdy, o1_vld, o1_dat), (o2_rdy, o2_vld, o2_dat)]
+            ls_hso = [(Signal(bool(0)), Signal(bool(0)), Signal(intbv(0)[16:])) for _ in range(NUM_OUTPUTS)]
+
+            _assign_o = list(a for p, hso in zip(ls_o, ls_hso) for a in (assign(hso[0], p[0]), assign(p[1], hso[1]), assign(p[2], hso[2])))
+
+            _inst = hs_arbdemux(rst=rst, clk=clk, hsi=(i_rdy, i_vld, i_dat), ls_hso=ls_hso, sel=sel, ARBITER_TYPE=ARBITER_TYPE)
+
+            return instances()
+
+        ls_rdy = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_vld = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_dat = [Signal(intbv(0)[16:]) for _ in range(NUM_OUTPUTS+1)]
+        sel = Signal(intbv(0, min=0, max=NUM_OUTPUTS))
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim():
+            @instance
+            def _inst():
+                yield rst.pulse(10)
+                for _ in range(200):
+                    for i in range(NUM_OUTPUTS):
+                        ls_rdy[i].next = random.random() < 0.7
+                    ls_vld[NUM_OUTPUTS].next = random.random() < 0.7
+                    ls_dat[NUM_OUTPUTS].next = random.randrange(2**16)
+                    yield delay(1)
+                    for i in range(NUM_OUTPUTS):
+                        assert ls_dat[i] == ls_dat[NUM_OUTPUTS], "hso_dat[{}]: expected {}, detected {}".format(i, ls_dat[NUM_OUTPUTS], ls_dat[i])
+                        if i != sel:
+                            assert not ls_vld[i], "hso_vld[{}]: expected 0, detected {}".format(i, ls_vld[i])
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for ARBITER_TYPE in ["priority", "roundrobin", "deficit_rr"]:
+                argl = {"rst":rst, "clk":clk, "i_rdy":ls_rdy[NUM_OUTPUTS], "i_vld":ls_vld[NUM_OUTPUTS], "i_dat":ls_dat[NUM_OUTPUTS], "sel":sel, "ARBITER_TYPE":ARBITER_TYPE}
+                for i in range(NUM_OUTPUTS):
+                    argl.update({"o{}_rdy".format(i):ls_rdy[i], "o{}_vld".format(i):ls_vld[i], "o{}_dat".format(i):ls_dat[i]})
+                clkgen = clk.gen()
+                dut = getDut(hs_arbdemux_data_top, **argl)
+                stm = stim()
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
 from myhdl_lib.handshake import hs_arbmux
+from myhdl_lib.utils import assign
 import myhdl_lib.simulation as sim
 
 
@@ -12,7 +14,7 @@ class TestArbMux(unittest.TestCase):
         cls.simulators = ["myhdl", "icarus"]
 
     @staticmethod
-    def hs_arbmux_top(rst, clk, i0_rdy, i0_vld, i1_rdy, i1_vld, i2_rdy, i2_vld, o_rdy, o_vld, sel, ARBITER_TYPE):
+    def hs_arbmux_top(rst, clk, i0_rdy, i0_vld, i1_rdy, i1_vld, i2_rdy, i2_vld, o_rdy, o_vld, sel, ARBITER_TYPE, weights=None, quantums=None):
         ''' Needed when hs_arbmux is co-simulated as top level'''
 
         hsi0_rdy = Signal(bool(0))
@@ -40,7 +42,7 @@ class TestArbMux(unittest.TestCase):
         ls_hsi = [(hsi0_rdy, hsi0_vld), (hsi1_rdy, hsi1_vld), (hsi2_rdy, hsi2_vld)]
         hso = (hso_rdy, hso_vld)
 
-        _inst = hs_arbmux(rst=rst, clk=clk, ls_hsi=ls_hsi, hso=hso, sel=sel, ARBITER_TYPE=ARBITER_TYPE)
+        _inst = hs_arbmux(rst=rst, clk=clk, ls_hsi=ls_hsi, hso=hso, sel=sel, ARBITER_TYPE=ARBITER_TYPE, weights=weights, quantums=quantums)
 
         return instances()
 
@@ -209,6 +211,198 @@ class TestArbMux(unittest.TestCase):
             del clkgen, dut, stm
 
 
+    def testArbMux3Random(self):
+        "HS_ARBMUX: 3 inputs, random valid and ready, the roundrobin_pp and matrix arbiters compared to a model"
+
+        NUM_INPUTS = 3
+
+        ls_hsi_rdy = [Signal(bool(0)) for _ in range(NUM_INPUTS)]
+        ls_hsi_vld = [Signal(bool(0)) for _ in range(NUM_INPUTS)]
+        ls_hsi = zip(ls_hsi_rdy, ls_hsi_vld)
+
+        hso_rdy = Signal(bool(0))
+        hso_vld = Signal(bool(0))
+        hso = (hso_rdy, hso_vld)
+
+        sel = Signal(intbv(0, min=0, max=NUM_INPUTS))
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(ARBITER_TYPE):
+            @instance
+            def _inst():
+                for i in range(NUM_INPUTS):
+                    ls_hsi_vld[i].next = 0
+                hso_rdy.next = 0
+                yield rst.pulse(10)
+                prio = NUM_INPUTS-1
+                order = list(range(NUM_INPUTS))
+                for _ in range(300):
+                    for i in range(NUM_INPUTS):
+                        ls_hsi_vld[i].next = random.random() < 0.5
+                    hso_rdy.next = random.random() < 0.7
+                    yield delay(1)
+                    req = [bool(v) for v in ls_hsi_vld]
+                    if any(req):
+                        if ARBITER_TYPE == "matrix":
+                            # Least recently granted
+                            s = [j for j in order if req[j]][0]
+                        else:
+                            s = [j % NUM_INPUTS for j in range(prio+1, prio+1+NUM_INPUTS) if req[j % NUM_INPUTS]][0]
+                        assert s==sel, "{}: sel: expected {}, detected {}".format(ARBITER_TYPE, s, sel)
+                    assert any(req)==hso_vld, "{}: hso_vld: expected {}, detected {}".format(ARBITER_TYPE, any(req), hso_vld)
+                    for k in range(NUM_INPUTS):
+                        rdy = (k==sel) and bool(hso_rdy)
+                        assert rdy==ls_hsi_rdy[k], "{}: hsi_rdy[{}]: expected {}, detected {}".format(ARBITER_TYPE, k, rdy, ls_hsi_rdy[k])
+                    if hso_vld and hso_rdy:
+                        prio = int(sel)
+                        order.remove(prio)
+                        order.append(prio)
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for ARBITER_TYPE in ["roundrobin_pp", "matrix"]:
+                argl = {"rst":rst, "clk":clk,
+                        "i0_rdy":ls_hsi[0][0], "i0_vld":ls_hsi[0][1],
+                        "i1_rdy":ls_hsi[1][0], "i1_vld":ls_hsi[1][1],
+                        "i2_rdy":ls_hsi[2][0], "i2_vld":ls_hsi[2][1],
+                        "o_rdy":hso[0], "o_vld":hso[1], "sel":sel, "ARBITER_TYPE":ARBITER_TYPE}
+                clkgen = clk.gen()
+                dut=getDut(self.hs_arbmux_top, **argl)
+                stm = stim(ARBITER_TYPE)
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+
+
+    def testArbMux3Shares(self):
+        "HS_ARBMUX: 3 inputs, weighted_rr and deficit_rr arbiters share the transfers in proportion to the weights and quantums, with no idle clock cycles"
+
+        NUM_INPUTS = 3
+        SHARES = [1, 3, 2]
+
+        ls_hsi_rdy = [Signal(bool(0)) for _ in range(NUM_INPUTS)]
+        ls_hsi_vld = [Signal(bool(0)) for _ in range(NUM_INPUTS)]
+        ls_hsi = zip(ls_hsi_rdy, ls_hsi_vld)
+
+        hso_rdy = Signal(bool(0))
+        hso_vld = Signal(bool(0))
+        hso = (hso_rdy, hso_vld)
+
+        sel = Signal(intbv(0, min=0, max=NUM_INPUTS))
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim(transfers, offered):
+            @instance
+            def _inst():
+                for i in range(NUM_INPUTS):
+                    ls_hsi_vld[i].next = 0
+                hso_rdy.next = 0
+                yield rst.pulse(10)
+                for i in range(NUM_INPUTS):
+                    ls_hsi_vld[i].next = 1
+                for _ in range(600):
+                    hso_rdy.next = random.random() < 0.8
+                    yield delay(1)
+                    for k in range(NUM_INPUTS):
+                        if k != sel:
+                            assert 0==ls_hsi_rdy[k], "hsi_rdy[{}]: expected {}, detected {}".format(k, 0, ls_hsi_rdy[k])
+                    assert not ls_hsi_rdy[sel] or hso_vld, "hsi_rdy[{}] without hso_vld".format(int(sel))
+                    if hso_vld and hso_rdy:
+                        transfers[sel] += 1
+                    if hso_rdy:
+                        offered[0] += 1
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for ARBITER_TYPE, param in [("weighted_rr", "weights"), ("deficit_rr", "quantums")]:
+                argl = {"rst":rst, "clk":clk,
+                        "i0_rdy":ls_hsi[0][0], "i0_vld":ls_hsi[0][1],
+                        "i1_rdy":ls_hsi[1][0], "i1_vld":ls_hsi[1][1],
+                        "i2_rdy":ls_hsi[2][0], "i2_vld":ls_hsi[2][1],
+                        "o_rdy":hso[0], "o_vld":hso[1], "sel":sel, "ARBITER_TYPE":ARBITER_TYPE, param:SHARES}
+                offered = [0]
+                transfers = [0]*NUM_INPUTS
+                clkgen = clk.gen()
+                dut=getDut(self.hs_arbmux_top, **argl)
+                stm = stim(transfers, offered)
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+                # A transfer in every clock cycle the output side is ready, also when the turn changes
+                assert sum(transfers) == offered[0], "{}: {} transfers in {} clock cycles".format(ARBITER_TYPE, sum(transfers), offered[0])
+                for i in range(NUM_INPUTS):
+                    share = float(transfers[i]) / sum(transfers)
+                    expected = float(SHARES[i]) / sum(SHARES)
+                    assert abs(share - expected) < 0.05, "{}: share of input {}: expected {}, detected {}".format(ARBITER_TYPE, i, expected, share)
+
+
+    def testArbMux3Data(self):
+        "HS_ARBMUX: 3 inputs with data, the output gets the data of the selected input"
+
+        NUM_INPUTS = 3
+
+        def hs_arbmux_data_top(rst, clk, i0_rdy, i0_vld, i0_dat, i1_rdy, i1_vld, i1_dat, i2_rdy, i2_vld, i2_dat, o_rdy, o_vld, o_dat, sel, ARBITER_TYPE):
+            ''' Needed when hs_arbmux is co-simulated as top level'''
+            ls_i = [(i0_rdy, i0_vld, i0_dat), (i1_rdy, i1_vld, i1_dat), (i2_rdy, i2_vld, i2_dat)]
+            ls_hsi = [(Signal(bool(0)), Signal(bool(0)), Signal(intbv(0)[16:])) for _ in range(NUM_INPUTS)]
+
+            _assign_i = list(a for p, hsi in zip(ls_i, ls_hsi) for a in (assign(p[0], hsi[0]), assign(hsi[1], p[1]), assign(hsi[2], p[2])))
+
+            _inst = hs_arbmux(rst=rst, clk=clk, ls_hsi=ls_hsi, hso=(o_rdy, o_vld, o_dat), sel=sel, ARBITER_TYPE=ARBITER_TYPE)
+
+            return instances()
+
+        ls_rdy = [Signal(bool(0)) for _ in range(NUM_INPUTS+1)]
+        ls_vld = [Signal(bool(0)) for _ in range(NUM_INPUTS+1)]
+        ls_dat = [Signal(intbv(0)[16:]) for _ in range(NUM_INPUTS+1)]
+        sel = Signal(intbv(0, min=0, max=NUM_INPUTS))
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        def stim():
+            @instance
+            def _inst():
+                yield rst.pulse(10)
+                for _ in range(200):
+                    for i in range(NUM_INPUTS):
+                        ls_vld[i].next = random.random() < 0.7
+                        ls_dat[i].next = random.randrange(2**16)
+                    ls_rdy[NUM_INPUTS].next = random.random() < 0.7
+                    yield delay(1)
+                    if ls_vld[NUM_INPUTS]:
+                        assert ls_dat[NUM_INPUTS] == ls_dat[sel], "hso_dat: expected {}, detected {}".format(ls_dat[sel], ls_dat[NUM_INPUTS])
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for ARBITER_TYPE in ["priority", "roundrobin", "deficit_rr"]:
+                argl = {"rst":rst, "clk":clk, "o_rdy":ls_rdy[NUM_INPUTS], "o_vld":ls_vld[NUM_INPUTS], "o_dat":ls_dat[NUM_INPUTS], "sel":sel, "ARBITER_TYPE":ARBITER_TYPE}
+                for i in range(NUM_INPUTS):
+                    argl.update({"i{}_rdy".format(i):ls_rdy[i], "i{}_vld".format(i):ls_vld[i], "i{}_dat".format(i):ls_dat[i]})
+                clkgen = clk.gen()
+                dut = getDut(hs_arbmux_data_top, **argl)
+                stm = stim()
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
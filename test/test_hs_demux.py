@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
 from myhdl_lib.handshake import hs_demux
+from myhdl_lib.utils import assign
 import myhdl_lib.simulation as sim
 
 
@@ -113,6 +115,60 @@ class TestHSDemux(unittest.TestCase):
             del dut, stm
 
 
+    def testHSDemux3Data(self):
+        ''' HS_DEMUX: 3 outputs with data, all outputs get the input data '''
+        NUM_OUTPUTS = 3
+
+        def hs_demux_data_top(sel, i_rdy, i_vld, i_dat, o0_rdy, o0_vld, o0_dat, o1_rdy, o1_vld, o1_dat, o2_rdy, o2_vld, o2_dat):
+            ''' Needed when hs_demux is co-simulated as top level'''
+            ls_o = [(o0_rdy, o0_vld, o0_dat), (o1_rdy, o1_vld, o1_dat), (o2_rdy, o2_vld, o2_dat)]
+            hsi = (i_rdy, i_vld, i_dat)
+            ls_hso = [(Signal(bool(0)), Signal(bool(0)), Signal(intbv(0)[16:])) for _ in range(NUM_OUTPUTS)]
+
+            _assign_o = list(a for p, hso in zip(ls_o, ls_hso) for a in (assign(hso[0], p[0]), assign(p[1], hso[1]), assign(p[2], hso[2])))
+
+            _inst = hs_demux(sel, hsi, ls_hso)
+
+            return instances()
+
+        ls_rdy = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_vld = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_dat = [Signal(intbv(0)[16:]) for _ in range(NUM_OUTPUTS+1)]
+        sel = Signal(intbv(0, min=0, max=NUM_OUTPUTS))
+
+        argl = {"sel":sel}
+        for i, p in enumerate(["o0", "o1", "o2", "i"]):
+            argl.update({p+"_rdy":ls_rdy[i], p+"_vld":ls_vld[i], p+"_dat":ls_dat[i]})
+
+        def stim():
+            @instance
+            def _inst():
+                for _ in range(50):
+                    sel.next = random.randrange(NUM_OUTPUTS)
+                    for i in range(NUM_OUTPUTS):
+                        ls_rdy[i].next = random.randrange(2)
+                    ls_vld[NUM_OUTPUTS].next = random.randrange(2)
+                    ls_dat[NUM_OUTPUTS].next = random.randrange(2**16)
+                    yield delay(10)
+                    s = int(sel)
+                    assert ls_rdy[NUM_OUTPUTS] == ls_rdy[s], "hsi_rdy: expected {}, detected {}".format(ls_rdy[s], ls_rdy[NUM_OUTPUTS])
+                    for i in range(NUM_OUTPUTS):
+                        vld = ls_vld[NUM_OUTPUTS] if (i == s) else 0
+                        assert ls_vld[i] == vld, "hso_vld[{}]: expected {}, detected {}".format(i, vld, ls_vld[i])
+                        assert ls_dat[i] == ls_dat[NUM_OUTPUTS], "hso_dat[{}]: expected {}, detected {}".format(i, ls_dat[NUM_OUTPUTS], ls_dat[i])
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = getDut(hs_demux_data_top, **argl)
+            stm = stim()
+            Simulation(dut, stm).run()
+            del dut, stm
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
 from myhdl_lib.handshake import hs_fork
+from myhdl_lib.utils import assign
 import myhdl_lib.simulation as sim
 
 class TestHSFork(unittest.TestCase):
@@ -106,6 +108,48 @@ class TestHSFork(unittest.TestCase):
             del dut, stm
 
 
+    def testHSFork3Data(self):
+        ''' HS_FORK: 3 outputs, two with data '''
+        def hs_fork_data_top(i_rdy, i_vld, i_dat, o0_rdy, o0_vld, o0_dat, o1_rdy, o1_vld, o2_rdy, o2_vld, o2_dat):
+            ''' Needed when hs_fork is co-simulated as top level'''
+            ls_o = [(o0_rdy, o0_vld, o0_dat), (o1_rdy, o1_vld), (o2_rdy, o2_vld, o2_dat)]
+            ls_hso = [tuple(Signal(p.val) for p in o) for o in ls_o]
+
+            _assign_o = list(a for o, hso in zip(ls_o, ls_hso) for a in [assign(hso[0], o[0]), assign(o[1], hso[1])] + [assign(p, q) for p, q in zip(o[2:], hso[2:])])
+
+            _inst = hs_fork(hsi=(i_rdy, i_vld, i_dat), ls_hso=ls_hso)
+            return instances()
+
+        i_rdy, i_vld, o0_rdy, o0_vld, o1_rdy, o1_vld, o2_rdy, o2_vld = [Signal(bool(0)) for _ in range(8)]
+        i_dat, o0_dat, o2_dat = [Signal(intbv(0)[16:]) for _ in range(3)]
+
+        def stim():
+            @instance
+            def _inst():
+                for _ in range(50):
+                    i_vld.next = random.randrange(2)
+                    o0_rdy.next = random.randrange(2)
+                    o1_rdy.next = random.randrange(2)
+                    o2_rdy.next = random.randrange(2)
+                    i_dat.next = random.randrange(2**16)
+                    yield delay(10)
+                    all_rdy = o0_rdy and o1_rdy and o2_rdy
+                    assert i_rdy == all_rdy
+                    assert o0_vld == (all_rdy and i_vld) and o1_vld == o0_vld and o2_vld == o0_vld
+                    assert o0_dat == i_dat and o2_dat == i_dat, "hso_dat: expected {}, detected {} {}".format(i_dat, o0_dat, o2_dat)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = getDut(hs_fork_data_top, i_rdy=i_rdy, i_vld=i_vld, i_dat=i_dat, o0_rdy=o0_rdy, o0_vld=o0_vld, o0_dat=o0_dat, o1_rdy=o1_rdy, o1_vld=o1_vld, o2_rdy=o2_rdy, o2_vld=o2_vld, o2_dat=o2_dat)
+            stm = stim()
+            Simulation(dut, stm).run()
+            del dut, stm
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
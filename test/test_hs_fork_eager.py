@@ -0,0 +1,135 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.handshake import hs_fork_eager
+from myhdl_lib.utils import assign
+import myhdl_lib.simulation as sim
+
+
+NUM_OUTPUTS = 3
+
+
+def hs_fork_eager_top(rst, clk, i_rdy, i_vld, i_dat, o0_rdy, o0_vld, o0_dat, o1_rdy, o1_vld, o1_dat, o2_rdy, o2_vld, o2_dat):
+    ''' Needed when hs_fork_eager is co-simulated as top level'''
+    ls_o = [(o0_rdy, o0_vld, o0_dat), (o1_rdy, o1_vld, o1_dat), (o2_rdy, o2_vld, o2_dat)]
+    ls_hso = [(Signal(bool(0)), Signal(bool(0)), Signal(intbv(0)[16:])) for _ in range(NUM_OUTPUTS)]
+
+    _assign_o = list(a for p, hso in zip(ls_o, ls_hso) for a in (assign(hso[0], p[0]), assign(p[1], hso[1]), assign(p[2], hso[2])))
+
+    _inst = hs_fork_eager(rst=rst, clk=clk, hsi=(i_rdy, i_vld, i_dat), ls_hso=ls_hso)
+
+    return instances()
+
+
+class TestHSForkEager(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def testRandom(self):
+        ''' HS_FORK_EAGER: 3 outputs, random valid and ready, every output takes every input word once and in order '''
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        ls_rdy = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_vld = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_dat = [Signal(intbv(0)[16:]) for _ in range(NUM_OUTPUTS+1)]
+
+        argl = {"rst":rst, "clk":clk, "i_rdy":ls_rdy[NUM_OUTPUTS], "i_vld":ls_vld[NUM_OUTPUTS], "i_dat":ls_dat[NUM_OUTPUTS]}
+        for i in range(NUM_OUTPUTS):
+            argl.update({"o{}_rdy".format(i):ls_rdy[i], "o{}_vld".format(i):ls_vld[i], "o{}_dat".format(i):ls_dat[i]})
+
+        def stim(vld_p, rdy_p):
+            @instance
+            def _inst():
+                yield rst.pulse(5)
+                sent = []
+                rcvd = [[] for _ in range(NUM_OUTPUTS)]
+                done = [False]*NUM_OUTPUTS
+                for _ in range(400):
+                    # The input holds its data until it is consumed
+                    if not any(done):
+                        ls_vld[NUM_OUTPUTS].next = random.random() < vld_p
+                        ls_dat[NUM_OUTPUTS].next = random.randrange(2**16)
+                    for i in range(NUM_OUTPUTS):
+                        ls_rdy[i].next = random.random() < rdy_p[i]
+                    yield delay(1)
+                    vld = bool(ls_vld[NUM_OUTPUTS])
+                    taken = [done[i] or bool(ls_rdy[i]) for i in range(NUM_OUTPUTS)]
+                    assert ls_rdy[NUM_OUTPUTS] == all(taken), "hsi_rdy: expected {}, detected {}".format(all(taken), ls_rdy[NUM_OUTPUTS])
+                    for i in range(NUM_OUTPUTS):
+                        assert ls_vld[i] == (vld and not done[i]), "hso_vld[{}]: expected {}, detected {}".format(i, vld and not done[i], ls_vld[i])
+                        assert ls_dat[i] == ls_dat[NUM_OUTPUTS], "hso_dat[{}]: expected {}, detected {}".format(i, ls_dat[NUM_OUTPUTS], ls_dat[i])
+                        if ls_vld[i] and ls_rdy[i]:
+                            rcvd[i].append(int(ls_dat[i]))
+                    if vld and all(taken):
+                        sent.append(int(ls_dat[NUM_OUTPUTS]))
+                        done = [False]*NUM_OUTPUTS
+                    elif vld:
+                        done = taken
+                    yield clk.posedge
+                for i in range(NUM_OUTPUTS):
+                    assert rcvd[i][:len(sent)] == sent, "Output {}: data lost, duplicated or reordered".format(i)
+                    assert len(rcvd[i]) - len(sent) <= 1
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for vld_p, rdy_p in [(0.5, [0.5, 0.5, 0.5]), (1, [0.9, 0.3, 0.6]), (1, [1, 1, 1])]:
+                clkgen = clk.gen()
+                dut = getDut(hs_fork_eager_top, **argl)
+                stm = stim(vld_p, rdy_p)
+                Simulation(clkgen, dut, stm).run()
+                del clkgen, dut, stm
+
+    def testThroughput(self):
+        ''' HS_FORK_EAGER: The input is consumed at the rate of the slowest output on average, not at the rate of all outputs ready together '''
+        clk = sim.Clock(val=0, period=10, units="ns")
+        rst = sim.ResetSync(clk=clk, val=0, active=1)
+
+        ls_rdy = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_vld = [Signal(bool(0)) for _ in range(NUM_OUTPUTS+1)]
+        ls_dat = [Signal(intbv(0)[16:]) for _ in range(NUM_OUTPUTS+1)]
+
+        argl = {"rst":rst, "clk":clk, "i_rdy":ls_rdy[NUM_OUTPUTS], "i_vld":ls_vld[NUM_OUTPUTS], "i_dat":ls_dat[NUM_OUTPUTS]}
+        for i in range(NUM_OUTPUTS):
+            argl.update({"o{}_rdy".format(i):ls_rdy[i], "o{}_vld".format(i):ls_vld[i], "o{}_dat".format(i):ls_dat[i]})
+
+        CYCLES = 1000
+
+        def stim(transfers):
+            @instance
+            def _inst():
+                yield rst.pulse(5)
+                ls_vld[NUM_OUTPUTS].next = 1
+                for _ in range(CYCLES):
+                    for i in range(NUM_OUTPUTS):
+                        ls_rdy[i].next = random.random() < 0.7
+                    yield delay(1)
+                    if ls_rdy[NUM_OUTPUTS]:
+                        transfers[0] += 1
+                    yield clk.posedge
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            transfers = [0]
+            clkgen = clk.gen()
+            dut = getDut(hs_fork_eager_top, **argl)
+            stm = stim(transfers)
+            Simulation(clkgen, dut, stm).run()
+            del clkgen, dut, stm
+            # All three outputs ready together: 0.7**3 = 0.34 transfers per cycle; eager: about 0.55
+            assert float(transfers[0]) / CYCLES > 0.45, "Throughput: {} transfers in {} cycles".format(transfers[0], CYCLES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
 from myhdl_lib.handshake import hs_join
+from myhdl_lib.utils import assign
 import myhdl_lib.simulation as sim
 
 class TestHSJoin(unittest.TestCase):
@@ -106,6 +108,49 @@ class TestHSJoin(unittest.TestCase):
             del dut, stm
 
 
+    def testHSJoin2Data(self):
+        ''' HS_JOIN: 2 inputs with data, the output data is the list of the input data '''
+        def hs_join_data_top(i0_rdy, i0_vld, i0_dat, i1_rdy, i1_vld, i1_dat, o_rdy, o_vld, o_dat0, o_dat1):
+            ''' Needed when hs_join is co-simulated as top level'''
+            ls_i = [(i0_rdy, i0_vld, i0_dat), (i1_rdy, i1_vld, i1_dat)]
+            ls_hsi = [(Signal(bool(0)), Signal(bool(0)), Signal(p[2].val)) for p in ls_i]
+            ls_dat = [Signal(o_dat0.val), Signal(o_dat1.val)]
+
+            _assign_i = list(a for p, hsi in zip(ls_i, ls_hsi) for a in (assign(p[0], hsi[0]), assign(hsi[1], p[1]), assign(hsi[2], p[2])))
+            _assign_o = [assign(o_dat0, ls_dat[0]), assign(o_dat1, ls_dat[1])]
+
+            _inst = hs_join(ls_hsi=ls_hsi, hso=(o_rdy, o_vld, ls_dat))
+            return instances()
+
+        i0_rdy, i0_vld, i1_rdy, i1_vld, o_rdy, o_vld = [Signal(bool(0)) for _ in range(6)]
+        i0_dat, o_dat0 = [Signal(intbv(0)[8:]) for _ in range(2)]
+        i1_dat, o_dat1 = [Signal(intbv(0)[12:]) for _ in range(2)]
+
+        def stim():
+            @instance
+            def _inst():
+                for _ in range(50):
+                    i0_vld.next = random.randrange(2)
+                    i1_vld.next = random.randrange(2)
+                    o_rdy.next = random.randrange(2)
+                    i0_dat.next = random.randrange(2**8)
+                    i1_dat.next = random.randrange(2**12)
+                    yield delay(10)
+                    assert o_vld == (i0_vld and i1_vld)
+                    assert i0_rdy == (i0_vld and i1_vld and o_rdy) and i1_rdy == i0_rdy
+                    assert o_dat0 == i0_dat and o_dat1 == i1_dat, "hso_dat: expected {} {}, detected {} {}".format(i0_dat, i1_dat, o_dat0, o_dat1)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = getDut(hs_join_data_top, i0_rdy=i0_rdy, i0_vld=i0_vld, i0_dat=i0_dat, i1_rdy=i1_rdy, i1_vld=i1_vld, i1_dat=i1_dat, o_rdy=o_rdy, o_vld=o_vld, o_dat0=o_dat0, o_dat1=o_dat1)
+            stm = stim()
+            Simulation(dut, stm).run()
+            del dut, stm
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
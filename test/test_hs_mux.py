@@ -1,7 +1,9 @@
 import unittest
+import random
 
 from myhdl import *
 from myhdl_lib.handshake import hs_mux
+from myhdl_lib.utils import assign
 import myhdl_lib.simulation as sim
 
 
@@ -113,6 +115,72 @@ class TestHSMux(unittest.TestCase):
             del dut, stm
 
 
+    def testHSMux3Data(self):
+        ''' HS_MUX: 3 inputs with data, two data signals per interface '''
+        NUM_INPUTS = 3
+
+        def hs_mux_data_top(sel, i0_rdy, i0_vld, i0_dat, i0_flg, i1_rdy, i1_vld, i1_dat, i1_flg, i2_rdy, i2_vld, i2_dat, i2_flg, o_rdy, o_vld, o_dat, o_flg):
+            ''' Needed when hs_mux is co-simulated as top level'''
+            ls_i = [(i0_rdy, i0_vld, i0_dat, i0_flg), (i1_rdy, i1_vld, i1_dat, i1_flg), (i2_rdy, i2_vld, i2_dat, i2_flg)]
+            ls_hsi = [(Signal(bool(0)), Signal(bool(0)), [Signal(intbv(0)[16:]), Signal(bool(0))]) for _ in range(NUM_INPUTS)]
+            hso = (Signal(bool(0)), Signal(bool(0)), [Signal(intbv(0)[16:]), Signal(bool(0))])
+
+            _assign_i = list(a for p, hsi in zip(ls_i, ls_hsi) for a in (assign(p[0], hsi[0]), assign(hsi[1], p[1]), assign(hsi[2][0], p[2]), assign(hsi[2][1], p[3])))
+            _assign_o = [assign(hso[0], o_rdy), assign(o_vld, hso[1]), assign(o_dat, hso[2][0]), assign(o_flg, hso[2][1])]
+
+            _inst = hs_mux(sel=sel, ls_hsi=ls_hsi, hso=hso)
+
+            return instances()
+
+        ls_rdy = [Signal(bool(0)) for _ in range(NUM_INPUTS+1)]
+        ls_vld = [Signal(bool(0)) for _ in range(NUM_INPUTS+1)]
+        ls_dat = [Signal(intbv(0)[16:]) for _ in range(NUM_INPUTS+1)]
+        ls_flg = [Signal(bool(0)) for _ in range(NUM_INPUTS+1)]
+        sel = Signal(intbv(0, min=0, max=NUM_INPUTS))
+
+        argl = {"sel":sel}
+        for i, p in enumerate(["i0", "i1", "i2", "o"]):
+            argl.update({p+"_rdy":ls_rdy[i], p+"_vld":ls_vld[i], p+"_dat":ls_dat[i], p+"_flg":ls_flg[i]})
+
+        def stim():
+            @instance
+            def _inst():
+                for _ in range(50):
+                    sel.next = random.randrange(NUM_INPUTS)
+                    for i in range(NUM_INPUTS):
+                        ls_vld[i].next = random.randrange(2)
+                        ls_dat[i].next = random.randrange(2**16)
+                        ls_flg[i].next = random.randrange(2)
+                    ls_rdy[NUM_INPUTS].next = random.randrange(2)
+                    yield delay(10)
+                    s = int(sel)
+                    assert ls_vld[NUM_INPUTS] == ls_vld[s], "hso_vld: expected {}, detected {}".format(ls_vld[s], ls_vld[NUM_INPUTS])
+                    assert ls_dat[NUM_INPUTS] == ls_dat[s], "hso_dat: expected {}, detected {}".format(ls_dat[s], ls_dat[NUM_INPUTS])
+                    assert ls_flg[NUM_INPUTS] == ls_flg[s], "hso_flg: expected {}, detected {}".format(ls_flg[s], ls_flg[NUM_INPUTS])
+                    for i in range(NUM_INPUTS):
+                        rdy = ls_rdy[NUM_INPUTS] if (i == s) else 0
+                        assert ls_rdy[i] == rdy, "hsi_rdy[{}]: expected {}, detected {}".format(i, rdy, ls_rdy[i])
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = getDut(hs_mux_data_top, **argl)
+            stm = stim()
+            Simulation(dut, stm).run()
+            del dut, stm
+
+
+    def testHSMuxDataGenerators(self):
+        ''' HS_MUX: In simulation the data is routed by the same generator as ready and valid '''
+        ls_hsi = [(Signal(bool(0)), Signal(bool(0)), [Signal(intbv(0)[16:]), Signal(bool(0))]) for _ in range(3)]
+        hso = (Signal(bool(0)), Signal(bool(0)), [Signal(intbv(0)[16:]), Signal(bool(0))])
+        sel = Signal(intbv(0, min=0, max=3))
+        self.assertEqual(len(hs_mux(sel, ls_hsi, hso)), 1)
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
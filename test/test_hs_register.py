@@ -0,0 +1,105 @@
+import unittest
+import random
+
+from myhdl import *
+from myhdl_lib.handshake import hs_register
+import myhdl_lib.simulation as sim
+
+
+def hs_register_top(rst, clk, i_rdy, i_vld, di, o_rdy, o_vld, do, REG_TYPE):
+    ''' Needed when hs_register is co-simulated as top level'''
+    _inst = hs_register(rst, clk, (i_rdy, i_vld), (o_rdy, o_vld), di, do, REG_TYPE=REG_TYPE)
+    return _inst
+
+
+class TestHsRegister(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        self.i_rdy, self.i_vld, self.o_rdy, self.o_vld = [Signal(bool(0)) for _ in range(4)]
+        self.di = Signal(intbv(0)[16:])
+        self.do = Signal(intbv(0)[16:])
+
+        self.clk = sim.Clock(val=0, period=10, units="ns")
+        self.rst = sim.ResetSync(clk=self.clk, val=0, active=1)
+
+    def getDut(self, getDut, REG_TYPE):
+        return getDut(hs_register_top, rst=self.rst, clk=self.clk, i_rdy=self.i_rdy, i_vld=self.i_vld, di=self.di, o_rdy=self.o_rdy, o_vld=self.o_vld, do=self.do, REG_TYPE=REG_TYPE)
+
+    def testRandom(self):
+        ''' HS_REGISTER: Random valid and ready, the data is transferred in order, without loss '''
+        def stim(REG_TYPE):
+            @instance
+            def _inst():
+                sent, rcvd = [], []
+                cnt = 0
+                yield self.rst.pulse(5)
+                for vld_p, rdy_p in [(0.5, 0.5), (1, 0.3), (0.3, 1), (1, 1)]:
+                    for _ in range(200):
+                        self.i_vld.next = random.random() < vld_p
+                        self.o_rdy.next = random.random() < rdy_p
+                        self.di.next = cnt
+                        yield delay(1)
+                        i_rdy, o_vld, do = bool(self.i_rdy), bool(self.o_vld), int(self.do)
+                        # The registered signals do not depend on the other side in the same clock cycle
+                        self.o_rdy.next = not self.o_rdy
+                        self.i_vld.next = not self.i_vld
+                        yield delay(1)
+                        if REG_TYPE in ("backward", "full"):
+                            assert self.i_rdy == i_rdy, "i_rdy depends on o_rdy"
+                        if REG_TYPE in ("forward", "full"):
+                            assert self.o_vld == o_vld and self.do == do, "o_vld depends on i_vld"
+                        self.o_rdy.next = not self.o_rdy
+                        self.i_vld.next = not self.i_vld
+                        yield self.clk.posedge
+                        if self.i_vld and self.i_rdy:
+                            sent.append(cnt)
+                            cnt = (cnt + 1) % 2**16
+                        if self.o_vld and self.o_rdy:
+                            rcvd.append(int(self.do))
+                self.i_vld.next = 0
+                self.o_rdy.next = 1
+                for _ in range(4):
+                    yield self.clk.posedge
+                    if self.o_vld and self.o_rdy:
+                        rcvd.append(int(self.do))
+                assert rcvd == sent, "Data: sent {}, received {}".format(len(sent), len(rcvd))
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for REG_TYPE in ["forward", "backward", "full"]:
+                dut = self.getDut(getDut, REG_TYPE)
+                Simulation(self.clk.gen(), dut, stim(REG_TYPE)).run()
+                del dut
+
+    def testThroughput(self):
+        ''' HS_REGISTER: Valid and ready always active, one transfer per clock cycle '''
+        def stim(REG_TYPE):
+            @instance
+            def _inst():
+                yield self.rst.pulse(5)
+                self.i_vld.next = 1
+                self.o_rdy.next = 1
+                yield self.clk.posedge
+                for _ in range(20):
+                    yield self.clk.posedge
+                    assert self.i_rdy and self.o_vld, "{}: no transfer".format(REG_TYPE)
+                raise StopSimulation
+            return _inst
+
+        for REG_TYPE in ["forward", "backward", "full"]:
+            dut = hs_register(self.rst, self.clk, (self.i_rdy, self.i_vld), (self.o_rdy, self.o_vld), REG_TYPE=REG_TYPE)
+            Simulation(self.clk.gen(), dut, stim(REG_TYPE)).run()
+        self.assertRaises(AssertionError, hs_register, self.rst, self.clk, (self.i_rdy, self.i_vld), (self.o_rdy, self.o_vld), REG_TYPE="skid")
+        self.assertRaises(AssertionError, hs_register, self.rst, self.clk, (self.i_rdy, self.i_vld), (self.o_rdy, self.o_vld), di=self.di)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,14 @@
 import unittest
 import random
+import os
+import time
+import shutil
+import tempfile
 
 from myhdl import *
-from myhdl_lib.mem import rom, ram_sp_rf, ram_sp_wf, ram_sp_ar,ram_sdp_rf, ram_sdp_wf, ram_sdp_ar, ram_dp_rf, ram_dp_wf, ram_dp_ar
+from myhdl_lib.mem import rom, ram_sp_rf, ram_sp_wf, ram_sp_ar,ram_sdp_rf, ram_sdp_wf, ram_sdp_ar, ram_dp_rf, ram_dp_wf, ram_dp_ar, ram_mp
+from myhdl_lib.mem import set_mem_backend, get_mem_backend
+from myhdl_lib.mem_image import mem_image
 import myhdl_lib.simulation as sim
 
 def mem_fill(clk, we, addr, di, content):
@@ -40,6 +46,46 @@ def mem_write_and_read(clk, we, addrw, addrr, di, do, content_wr, content_rd, AS
     di.next = 0
 
 
+def mem_verify_pipelined(clk, addr, do, content, LATENCY):
+    ''' Reads an address per clock cycle, checks the data LATENCY clock cycles later, LATENCY >= 1 '''
+    for a in range(len(content) + LATENCY - 1):
+        addr.next = a % len(content)
+        yield clk.posedge
+        yield delay(1)
+        if a >= LATENCY - 1:
+            d = content[a - LATENCY + 1]
+            assert d==do, "Verify@addr {}, latency {}: expected={}, detected={}".format(a - LATENCY + 1, LATENCY, d, do)
+    addr.next = 0
+
+def mem_write_bytes(clk, we, addr, di, content, N, do=None):
+    ''' N byte-enable writes of random data to random addresses, content is updated with the written bytes;
+        if do is set, checks the write-first output '''
+    NB = len(we)
+    for _ in range(N):
+        a = random.randrange(len(content))
+        m = random.randrange(2**NB)
+        d = random.randrange(2**len(di))
+        we.next = m
+        addr.next = a
+        di.next = d
+        yield clk.posedge
+        mask = sum(0xFF << 8*i for i in range(NB) if (m >> i) & 1)
+        content[a] = (content[a] & ~mask) | (d & mask)
+        if do != None:
+            yield delay(1)
+            assert content[a]==do, "Write-first@addr {}: we={}, expected={}, detected={}".format(a, m, content[a], do)
+    we.next = 0
+    addr.next = 0
+    di.next = 0
+
+
+def ram_mp_1w4r(clk, we, addrw, di, addrr0, addrr1, addrr2, addrr3, do0, do1, do2, do3, READ):
+    return ram_mp(clk, we, addrw, di, [addrr0, addrr1, addrr2, addrr3], [do0, do1, do2, do3], READ=READ)
+
+def ram_mp_3w2r(clk, we0, we1, we2, addrw0, addrw1, addrw2, di0, di1, di2, addrr0, addrr1, do0, do1, READ):
+    return ram_mp(clk, [we0, we1, we2], [addrw0, addrw1, addrw2], [di0, di1, di2], [addrr0, addrr1], [do0, do1], READ=READ)
+
+
 class TestMem(unittest.TestCase):
 
     @classmethod
@@ -80,6 +126,150 @@ class TestMem(unittest.TestCase):
             del dut, stm
 
 
+    def testRomReadmemh(self):
+        ''' ROM: $readmemh, combinatorial and registered output '''
+        DATA_RANGE_MIN = -128
+        DATA_RANGE_MAX = 127
+        ADDR_MAX = 100
+
+        addr = Signal(intbv(0, min=0, max=ADDR_MAX))
+        dout = Signal(intbv(0, min=DATA_RANGE_MIN, max=DATA_RANGE_MAX+1))
+        CONTENT = tuple([random.randint(DATA_RANGE_MIN, DATA_RANGE_MAX) for _ in range(ADDR_MAX)])
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        clkgen = clk.gen()
+
+        def stim(REGISTERED):
+            @instance
+            def _inst():
+                yield clk.negedge
+                for a in range(ADDR_MAX):
+                    addr.next = a
+                    if REGISTERED:
+                        yield clk.posedge
+                    yield delay(1)
+                    assert CONTENT[a]==dout, "At addr {}: expected {}, detected {}".format(a, CONTENT[a], dout)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for content in [CONTENT, mem_image(CONTENT)]:
+                for registered in [False, True]:
+                    kw = dict(addr=addr, dout=dout, CONTENT=content, READMEMH=True)
+                    if registered:
+                        kw["clk"] = clk
+                    dut = getDut(rom, **kw)
+                    Simulation(clkgen, dut, stim(registered)).run()
+                    del dut
+
+            # Registered output, case statement
+            dut = getDut(rom, addr=addr, dout=dout, CONTENT=CONTENT, clk=clk)
+            Simulation(clkgen, dut, stim(True)).run()
+            del dut
+
+    def testRomImageCase(self):
+        ''' ROM: Hex file or buffer converted as a case statement, READMEMH=False '''
+        DATA_RANGE_MIN = -128
+        DATA_RANGE_MAX = 127
+        ADDR_MAX = 100
+
+        addr = Signal(intbv(0, min=0, max=ADDR_MAX))
+        dout = Signal(intbv(0, min=DATA_RANGE_MIN, max=DATA_RANGE_MAX+1))
+        CONTENT = tuple([random.randint(DATA_RANGE_MIN, DATA_RANGE_MAX) for _ in range(ADDR_MAX)])
+
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "rom.hex")
+        with open(path, "w") as f:
+            f.write("".join("{:02x}\n".format(d & 0xFF) for d in CONTENT))
+
+        def stim():
+            @instance
+            def _inst():
+                for a in range(ADDR_MAX):
+                    addr.next = a
+                    yield delay(1)
+                    assert CONTENT[a]==dout, "At addr {}: expected {}, detected {}".format(a, CONTENT[a], dout)
+                raise StopSimulation
+            return _inst
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            toVerilog(rom, addr, dout, path, READMEMH=False)
+            with open("rom.v") as f:
+                v = f.read()
+            self.assertIn("case (", v)
+            self.assertNotIn('$readmemh("', v)
+
+            getDut = sim.DUTer()
+            for s in self.simulators:
+                getDut.selectSimulator(s)
+                for content in [path, bytearray(d & 0xFF for d in CONTENT)]:
+                    dut = getDut(rom, addr=addr, dout=dout, CONTENT=content, READMEMH=False)
+                    Simulation(dut, stim()).run()
+                    del dut
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+
+    def testRomConvertVhdl(self):
+        ''' ROM: toVHDL converts an image-backed ROM as a case statement '''
+        addr = Signal(intbv(0)[4:])
+        dout = Signal(intbv(0)[8:])
+        clk = Signal(bool(0))
+        CONTENT = [random.randrange(2**8) for _ in range(16)]
+
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "rom.hex")
+        with open(path, "w") as f:
+            f.write("".join("{:02x}\n".format(d) for d in CONTENT))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for content, READMEMH in [(path, None), (bytearray(CONTENT), True)]:
+                for c in [None, clk]:
+                    toVHDL(rom, addr, dout, content, clk=c, READMEMH=READMEMH)
+                    with open("rom.vhd") as f:
+                        v = f.read()
+                    self.assertIn("case to_integer(addr) is", v)
+                    for a in range(15):
+                        self.assertIn('when {} => dout <= "{:08b}";'.format(a, CONTENT[a]), v)
+                    self.assertIn('when others => dout <= "{:08b}";'.format(CONTENT[15]), v)
+            self.assertEqual(sorted(f for f in os.listdir(tmp) if f.endswith(".hex")), ["rom.hex"])
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+
+    def testRomConvert(self):
+        ''' ROM: $readmemh conversion of a large ROM '''
+        ADDR_WIDTH = 16
+        DATA_WIDTH = 16
+
+        addr = Signal(intbv(0)[ADDR_WIDTH:])
+        dout = Signal(intbv(0)[DATA_WIDTH:])
+        clk = Signal(bool(0))
+        CONTENT = tuple([random.randrange(2**DATA_WIDTH) for _ in range(2**ADDR_WIDTH)])
+
+        tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            t = time.time()
+            toVerilog(rom, addr, dout, CONTENT, clk=clk, READMEMH=True)
+            self.assertLess(time.time() - t, 10)
+            with open("rom.v") as f:
+                v = f.read()
+            self.assertNotIn("case (", v)
+            self.assertIn("always @(posedge clk)", v)
+            hexfile = v.split('$readmemh("')[1].split('"')[0]
+            self.assertEqual(tuple(mem_image(hexfile).words(2**ADDR_WIDTH, DATA_WIDTH)), CONTENT)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+
     def testRamSpRf(self):
         ''' RAM: Single-Port, Read-First '''
         DATA_RANGE_MIN = 0
@@ -451,6 +641,271 @@ class TestMem(unittest.TestCase):
             Simulation(clkagen, clkbgen, dut, stm).run()
             del dut, stm
 
+    def testRamByteEnable(self):
+        ''' RAM: Byte-enable writes, all RAMs '''
+        ADDR_WIDTH = 4
+        NB = 4
+
+        clka = sim.Clock(val=0, period=10, units="ns")
+        clkb = sim.Clock(val=0, period=14, units="ns")
+        clkgen = [clka.gen(), clkb.gen()]
+
+        wea, web = [Signal(intbv(0)[NB:]) for _ in range(2)]
+        addra, addrb = [Signal(intbv(0)[ADDR_WIDTH:]) for _ in range(2)]
+        dia, dib, doa, dob = [Signal(intbv(0)[8*NB:]) for _ in range(4)]
+
+        def stim(func):
+            ASYNC_RD = func.func_name.endswith("_ar")
+            WF = func.func_name.endswith("_wf")
+
+            @instance
+            def _inst():
+                content = 2**ADDR_WIDTH*[0]
+                yield clka.posedge
+                if func.func_name.startswith("ram_sp_"):
+                    yield mem_write_bytes(clka, wea, addra, dia, content, 100, doa if WF else None)
+                    yield mem_verify(clka, addra, doa, content, ASYNC_RD)
+                elif func.func_name.startswith("ram_sdp_"):
+                    yield mem_write_bytes(clka, wea, addra, dia, content, 100)
+                    yield mem_verify(clka, addrb, doa, content, ASYNC_RD)
+                else:
+                    yield mem_write_bytes(clka, wea, addra, dia, content, 100, doa if WF else None)
+                    yield mem_verify(clkb, addrb, dob, content, ASYNC_RD)
+                    yield mem_write_bytes(clkb, web, addrb, dib, content, 100, dob if WF else None)
+                    yield mem_verify(clka, addra, doa, content, ASYNC_RD)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for func in [ram_sp_rf, ram_sp_wf, ram_sp_ar]:
+                dut = getDut(func, clk=clka, we=wea, addr=addra, di=dia, do=doa)
+                Simulation(clkgen, dut, stim(func)).run()
+                del dut
+            for func in [ram_sdp_rf, ram_sdp_wf, ram_sdp_ar]:
+                dut = getDut(func, clk=clka, we=wea, addrw=addra, addrr=addrb, di=dia, do=doa)
+                Simulation(clkgen, dut, stim(func)).run()
+                del dut
+            for func in [ram_dp_rf, ram_dp_wf, ram_dp_ar]:
+                dut = getDut(func, clka=clka, clkb=clkb, wea=wea, web=web, addra=addra, addrb=addrb, dia=dia, dib=dib, doa=doa, dob=dob)
+                Simulation(clkgen, dut, stim(func)).run()
+                del dut
+
+    def testRamReadLatency(self):
+        ''' RAM: Read latency, output registers, all RAMs '''
+        ADDR_WIDTH = 5
+
+        clka = sim.Clock(val=0, period=10, units="ns")
+        clkb = sim.Clock(val=0, period=14, units="ns")
+        clkgen = [clka.gen(), clkb.gen()]
+
+        wea, web = [Signal(bool(0)) for _ in range(2)]
+        addra, addrb = [Signal(intbv(0)[ADDR_WIDTH:]) for _ in range(2)]
+        dia, dib, doa, dob = [Signal(intbv(0)[8:]) for _ in range(4)]
+
+        def stim(func, LATENCY):
+            @instance
+            def _inst():
+                content = [random.randrange(256) for _ in range(2**ADDR_WIDTH)]
+                yield clka.posedge
+                yield mem_fill(clka, wea, addra, dia, content)
+                if func.func_name.startswith("ram_sp_"):
+                    yield mem_verify_pipelined(clka, addra, doa, content, LATENCY)
+                elif func.func_name.startswith("ram_sdp_"):
+                    yield mem_verify_pipelined(clka, addrb, doa, content, LATENCY)
+                else:
+                    yield mem_verify_pipelined(clkb, addrb, dob, content, LATENCY)
+                    yield mem_verify_pipelined(clka, addra, doa, content, LATENCY)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for LATENCY in [1, 2]:
+                for func in [ram_sp_rf, ram_sp_wf, ram_sp_ar]:
+                    dut = getDut(func, clk=clka, we=wea, addr=addra, di=dia, do=doa, READ_LATENCY=LATENCY)
+                    Simulation(clkgen, dut, stim(func, LATENCY)).run()
+                    del dut
+                for func in [ram_sdp_rf, ram_sdp_wf, ram_sdp_ar]:
+                    dut = getDut(func, clk=clka, we=wea, addrw=addra, addrr=addrb, di=dia, do=doa, READ_LATENCY=LATENCY)
+                    Simulation(clkgen, dut, stim(func, LATENCY)).run()
+                    del dut
+                for func in [ram_dp_rf, ram_dp_wf, ram_dp_ar]:
+                    dut = getDut(func, clka=clka, clkb=clkb, wea=wea, web=web, addra=addra, addrb=addrb, dia=dia, dib=dib, doa=doa, dob=dob, READ_LATENCY=LATENCY)
+                    Simulation(clkgen, dut, stim(func, LATENCY)).run()
+                    del dut
+
+        self.assertRaises(AssertionError, ram_sp_rf, clka, wea, addra, dia, doa, READ_LATENCY=0)
+
+    def testRamMp(self):
+        ''' RAM: Multi-Port, replicated and live value table, random writes and reads '''
+        ADDR_WIDTH = 3
+        M, N = 3, 4
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        clkgen = clk.gen()
+
+        we = [Signal(bool(0)) for _ in range(M)]
+        addrw = [Signal(intbv(0)[ADDR_WIDTH:]) for _ in range(M)]
+        di = [Signal(intbv(0)[8:]) for _ in range(M)]
+        addrr = [Signal(intbv(0)[ADDR_WIDTH:]) for _ in range(N)]
+        do = [Signal(intbv(0)[8:]) for _ in range(N)]
+
+        def stim(NW, NR, READ):
+            @instance
+            def _inst():
+                content = 2**ADDR_WIDTH*[0]
+                for _ in range(300):
+                    for w in range(NW):
+                        we[w].next = random.random() < 0.6
+                        addrw[w].next = random.randrange(2**ADDR_WIDTH)
+                        di[w].next = random.randrange(256)
+                    for r in range(NR):
+                        addrr[r].next = random.randrange(2**ADDR_WIDTH)
+                    yield delay(1)
+                    expected = [content[int(addrr[r])] for r in range(NR)]
+                    if READ == "ar":
+                        for r in range(NR):
+                            assert expected[r]==do[r], "Read port {}@addr {}: expected={}, detected={}".format(r, addrr[r], expected[r], do[r])
+                    yield clk.posedge
+                    # The write port with the highest index wins
+                    for w in range(NW):
+                        if we[w]:
+                            content[int(addrw[w])] = int(di[w])
+                    yield delay(1)
+                    if READ == "rf":
+                        for r in range(NR):
+                            assert expected[r]==do[r], "Read port {}: expected={}, detected={}".format(r, expected[r], do[r])
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            for READ in ["rf", "ar"]:
+                dut = getDut(ram_mp_1w4r, clk=clk, we=we[0], addrw=addrw[0], di=di[0],
+                             addrr0=addrr[0], addrr1=addrr[1], addrr2=addrr[2], addrr3=addrr[3], do0=do[0], do1=do[1], do2=do[2], do3=do[3], READ=READ)
+                Simulation(clkgen, dut, stim(1, 4, READ)).run()
+                del dut
+                dut = getDut(ram_mp_3w2r, clk=clk, we0=we[0], we1=we[1], we2=we[2], addrw0=addrw[0], addrw1=addrw[1], addrw2=addrw[2], di0=di[0], di1=di[1], di2=di[2],
+                             addrr0=addrr[0], addrr1=addrr[1], do0=do[0], do1=do[1], READ=READ)
+                Simulation(clkgen, dut, stim(3, 2, READ)).run()
+                del dut
+
+    def testRamByteEnableConvert(self):
+        ''' RAM: Byte-enable writes are converted to a write per byte lane '''
+        clk = Signal(bool(0))
+        we = Signal(intbv(0)[4:])
+        addr = Signal(intbv(0)[6:])
+        di, do = Signal(intbv(0)[32:]), Signal(intbv(0)[32:])
+
+        tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for func in [ram_sp_rf, ram_sp_wf, ram_sdp_wf]:
+                if func == ram_sdp_wf:
+                    toVerilog(func, clk, we, addr, addr, di, do, MEM_BACKEND="signals")
+                else:
+                    toVerilog(func, clk, we, addr, di, do, MEM_BACKEND="signals")
+                with open(func.func_name + ".v") as f:
+                    v = f.read()
+                self.assertNotIn("$readmemh", v)
+                for i in range(4):
+                    self.assertIn("if (we[{}]) ".format(i), v)
+                    self.assertIn("[{}:{}] <= di[{}:{}];".format(8*i+7, 8*i, 8*i+7, 8*i), v)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+
+    def testRamConvertVhdl(self):
+        ''' RAM: A RAM with INIT or a byte-enable has no VHDL conversion '''
+        clk = Signal(bool(0))
+        addr = Signal(intbv(0)[6:])
+        di, do = Signal(intbv(0)[32:]), Signal(intbv(0)[32:])
+
+        tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for we, INIT in [(Signal(intbv(0)[4:]), None), (Signal(bool(0)), mem_image([1, 2, 3]))]:
+                for func in [ram_sp_rf, ram_sdp_wf]:
+                    with self.assertRaises(AssertionError) as cm:
+                        if func == ram_sdp_wf:
+                            toVHDL(func, clk, we, addr, addr, di, do, INIT=INIT, MEM_BACKEND="signals")
+                        else:
+                            toVHDL(func, clk, we, addr, di, do, INIT=INIT, MEM_BACKEND="signals")
+                    self.assertIn("only to Verilog", str(cm.exception))
+            # A RAM without INIT and byte-enable is converted
+            toVHDL(ram_sp_rf, clk, Signal(bool(0)), addr, di, do, MEM_BACKEND="signals")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+
+    def testRamByteEnableWidth(self):
+        ''' RAM: A byte-enable needs a bit per byte of data '''
+        clk = Signal(bool(0))
+        addr = Signal(intbv(0)[4:])
+        di, do = Signal(intbv(0)[32:]), Signal(intbv(0)[32:])
+        self.assertRaises(AssertionError, ram_sp_rf, clk, Signal(intbv(0)[3:]), addr, di, do)
+
+
+class TestMemPacked(TestMem):
+    ''' Runs the RAM tests with the packed memory backend '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl"]
+
+    def setUp(self):
+        set_mem_backend("packed")
+
+    def tearDown(self):
+        set_mem_backend("signals")
+
+    def testPackedLarge(self):
+        ''' RAM: Packed backend, large memory, per-instance selection '''
+        ADDR_WIDTH = 16
+        DATA_WIDTH = 72
+
+        set_mem_backend("signals")
+        we = Signal(bool(0))
+        addr = Signal(intbv(0)[ADDR_WIDTH:])
+        di = Signal(intbv(0)[DATA_WIDTH:])
+        do = Signal(intbv(0)[DATA_WIDTH:])
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        clkgen = clk.gen()
+
+        CONTENT = dict((random.randrange(2**ADDR_WIDTH), random.randrange(2**DATA_WIDTH)) for _ in range(100))
+
+        def stim():
+            @instance
+            def _inst():
+                yield clk.posedge
+                for a, d in CONTENT.items():
+                    we.next = 1
+                    addr.next = a
+                    di.next = d
+                    yield clk.posedge
+                we.next = 0
+                for a, d in CONTENT.items():
+                    addr.next = a
+                    yield clk.posedge
+                    yield delay(1)
+                    assert d==do, "Verify@addr {}: expected={}, detected={}".format(a, d, do)
+                raise StopSimulation
+            return _inst
+
+        dut = ram_sp_wf(clk=clk, we=we, addr=addr, di=di, do=do, MEM_BACKEND="packed")
+        assert get_mem_backend()=="signals"
+        Simulation(clkgen, dut, stim()).run()
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
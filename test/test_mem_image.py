@@ -0,0 +1,231 @@
+import unittest
+import random
+import os
+import shutil
+import tempfile
+import binascii
+
+from myhdl import *
+from myhdl_lib.mem import ram_sp_rf, ram_sdp_wf, ram_sdp_ar, ram_dp_ar, set_mem_backend
+from myhdl_lib.mem_image import mem_image, set_readmemh_dir
+import myhdl_lib.simulation as sim
+
+
+def to_bin(content, width):
+    nbytes = (width + 7)//8
+    return "".join(binascii.unhexlify("{:0{}x}".format(d, 2*nbytes))[::-1] for d in content)
+
+
+def to_hex(content, width):
+    return "// test image\n" + "".join("{:x}\n".format(d) for d in content)
+
+
+class TestMemImage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulators = ["myhdl", "icarus"]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        set_mem_backend("signals")
+
+    def content(self, depth, width, n=None):
+        return [random.randrange(2**width) for _ in range(depth if n == None else n)]
+
+    def verify(self, func, width, init, content, dump=None):
+        ''' Reads all the addresses of a simple-dual-port RAM initialized by init and compares with content, then writes
+            new random data and checks the dump '''
+        ADDR_WIDTH = 6
+        expected = content + (2**ADDR_WIDTH - len(content))*[0]
+        new = self.content(2**ADDR_WIDTH, width)
+        init = mem_image.get(init)
+
+        we = Signal(bool(0))
+        addrw = Signal(intbv(0)[ADDR_WIDTH:])
+        addrr = Signal(intbv(0)[ADDR_WIDTH:])
+        di = Signal(intbv(0)[width:])
+        do = Signal(intbv(0)[width:])
+
+        clk = sim.Clock(val=0, period=10, units="ns")
+        clkgen = clk.gen()
+
+        def stim(DUMP):
+            @instance
+            def _inst():
+                for a in range(2**ADDR_WIDTH):
+                    addrr.next = a
+                    yield clk.posedge
+                    yield delay(1)
+                    assert expected[a]==do, "Init@addr {}: expected={}, detected={}".format(a, expected[a], do)
+                for a in range(2**ADDR_WIDTH):
+                    we.next = 1
+                    addrw.next = a
+                    di.next = new[a]
+                    yield clk.posedge
+                we.next = 0
+                yield clk.posedge
+                if DUMP:
+                    init.dump(dump)
+                raise StopSimulation
+            return _inst
+
+        getDut = sim.DUTer()
+
+        for s in self.simulators:
+            getDut.selectSimulator(s)
+            dut = getDut(func, clk=clk, we=we, addrw=addrw, addrr=addrr, di=di, do=do, INIT=init)
+            # In a co-simulation the contents are in the HDL simulator
+            DUMP = (dump != None) and (s == "myhdl")
+            Simulation(clkgen, dut, stim(DUMP)).run()
+            del dut
+
+            if DUMP:
+                self.assertEqual(list(mem_image(dump).words(2**ADDR_WIDTH, width)), new)
+
+    def testHexFile(self):
+        ''' MEM_IMAGE: Hex file '''
+        for width in [8, 13]:
+            content = self.content(40, width)
+            path = os.path.join(self.tmp, "init.hex")
+            with open(path, "w") as f:
+                f.write(to_hex(content, width))
+            for func in [ram_sdp_ar, ram_sdp_wf]:
+                self.verify(func, width, path, content)
+
+    def testBinFile(self):
+        ''' MEM_IMAGE: Binary file, dump '''
+        for width in [8, 12, 32, 72]:
+            content = self.content(64, width)
+            path = os.path.join(self.tmp, "init.bin")
+            with open(path, "wb") as f:
+                f.write(to_bin(content, width))
+            self.verify(ram_sdp_ar, width, mem_image(path), content, dump=os.path.join(self.tmp, "dump.bin"))
+            self.verify(ram_sdp_ar, width, mem_image(path), content, dump=os.path.join(self.tmp, "dump.hex"))
+
+    def testBuffer(self):
+        ''' MEM_IMAGE: Buffers, packed backend '''
+        width = 16
+        content = self.content(20, width)
+        set_mem_backend("packed")
+        self.simulators = ["myhdl"]
+        self.verify(ram_sdp_wf, width, bytearray(to_bin(content, width)), content)
+        self.verify(ram_sdp_ar, width, buffer(to_bin(content, width)), content)
+        self.verify(ram_sdp_ar, width, mem_image(bytearray(to_hex(content, width)), FORMAT="hex"), content, dump=os.path.join(self.tmp, "dump.hex"))
+
+    def testShared(self):
+        ''' MEM_IMAGE: An image shared by two RAMs, dump of each RAM '''
+        width = 8
+        content = self.content(64, width)
+        init = mem_image(bytearray(to_bin(content, width)))
+
+        clk = Signal(bool(0))
+        we = [Signal(bool(0)) for _ in range(2)]
+        addr = Signal(intbv(0)[6:])
+        di = [Signal(intbv(0)[width:]) for _ in range(2)]
+        do = [Signal(intbv(0)[width:]) for _ in range(2)]
+        new = [self.content(64, width) for _ in range(2)]
+        dump = [os.path.join(self.tmp, "dump{}.bin".format(i)) for i in range(2)]
+
+        @instance
+        def stim():
+            for a in range(64):
+                addr.next = a
+                for i in range(2):
+                    we[i].next = 1
+                    di[i].next = new[i][a]
+                clk.next = 1
+                yield delay(5)
+                clk.next = 0
+                yield delay(5)
+            with self.assertRaises(AssertionError):
+                init.dump(dump[0])
+            for i in range(2):
+                init.dump(dump[i], index=i)
+            raise StopSimulation
+
+        rams = [ram_sdp_ar(clk, we[i], addr, addr, di[i], do[i], INIT=init) for i in range(2)]
+        Simulation(rams, stim).run()
+        for i in range(2):
+            self.assertEqual(list(mem_image(dump[i]).words(64, width)), new[i])
+
+    def testLargeBinFile(self):
+        ''' MEM_IMAGE: Binary file larger than the decode chunk '''
+        for width in [16, 24]:
+            content = self.content(70000, width)
+            path = os.path.join(self.tmp, "init.bin")
+            with open(path, "wb") as f:
+                f.write(to_bin(content, width))
+            self.assertEqual(list(mem_image(path).words(2**17, width)), content + (2**17 - len(content))*[0])
+
+    def testHexFormat(self):
+        ''' MEM_IMAGE: $readmemh address directives, comments, x/z digits '''
+        img = mem_image(bytearray("@2 1_0 /* skip\n ff */ 2x\n// 33\n@8 7"), FORMAT="hex")
+        self.assertEqual(list(img.words(10, 8)), [0, 0, 0x10, 0x20, 0, 0, 0, 0, 7, 0])
+
+    def testConvert(self):
+        ''' MEM_IMAGE: Conversion initializes the memory with $readmemh from a file with an absolute path '''
+        content = self.content(16, 8)
+        path = os.path.join(self.tmp, "init.hex")
+        with open(path, "w") as f:
+            f.write(to_hex(content, 8))
+        gen_dir = os.path.join(self.tmp, "gen")
+        os.mkdir(gen_dir)
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        try:
+            clk, we = Signal(bool(0)), Signal(bool(0))
+            addr = [Signal(intbv(0)[4:]) for _ in range(2)]
+            di = [Signal(intbv(0)[8:]) for _ in range(2)]
+            do = [Signal(intbv(0)[8:]) for _ in range(2)]
+
+            def readmemh(INIT, directory=None, name="ram_dp_ar"):
+                toVerilog.directory = directory
+                try:
+                    toVerilog(ram_dp_ar, clk, clk, we, we, addr[0], addr[1], di[0], di[1], do[0], do[1], INIT=INIT)
+                finally:
+                    toVerilog.directory = None
+                with open(os.path.join(directory or "", name + ".v")) as f:
+                    v = f.read()
+                hexfile = v.split('$readmemh("')[1].split('"')[0]
+                self.assertTrue(os.path.isabs(hexfile))
+                self.assertEqual(list(mem_image(hexfile).words(16, 8)), content)
+                return hexfile
+
+            # Generated next to the converted Verilog
+            hexfile = readmemh(bytearray(to_bin(content, 8)))
+            self.assertEqual(os.path.realpath(os.path.dirname(hexfile)), os.path.realpath(self.tmp))
+            hexfile = readmemh(bytearray(to_bin(content, 8)), directory=gen_dir)
+            self.assertEqual(os.path.realpath(os.path.dirname(hexfile)), os.path.realpath(gen_dir))
+            # In the configured directory
+            set_readmemh_dir(gen_dir)
+            try:
+                hexfile = readmemh(bytearray(to_bin(content, 8)))
+            finally:
+                set_readmemh_dir(None)
+            self.assertEqual(os.path.realpath(os.path.dirname(hexfile)), os.path.realpath(gen_dir))
+            # The hex source file
+            self.assertEqual(os.path.realpath(readmemh("init.hex")), os.path.realpath(path))
+        finally:
+            os.chdir(cwd)
+    def testConvertVhdl(self):
+        ''' MEM_IMAGE: toVHDL rejects a RAM initialized from an image, no $readmemh file is generated '''
+        clk, we = Signal(bool(0)), Signal(bool(0))
+        addr = Signal(intbv(0)[4:])
+        di, do = Signal(intbv(0)[8:]), Signal(intbv(0)[8:])
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        try:
+            with self.assertRaises(AssertionError):
+                toVHDL(ram_sdp_ar, clk, we, addr, addr, di, do, INIT=bytearray(to_bin(self.content(16, 8), 8)))
+        finally:
+            os.chdir(cwd)
+        self.assertEqual([f for f in os.listdir(self.tmp) if f.endswith(".hex")], [])
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from myhdl import *
+from myhdl_lib.arbiter import arbiter_priority
+import myhdl_lib.simulation as sim
+
+
+class TestRunner(unittest.TestCase):
+
+    def setUp(self):
+        NUM_REQ = 5
+        self.req_vec = Signal(intbv(0)[NUM_REQ:])
+        self.gnt_vec = Signal(intbv(0)[NUM_REQ:])
+        self.gnt_idx = Signal(intbv(0, min=0, max=NUM_REQ))
+        self.gnt_vld = Signal(bool(0))
+
+    def job(self, expected_idx, name):
+        ''' Returns a job that expects the arbiter to grant expected_idx for each one-hot request '''
+        def stim():
+            @instance
+            def _inst():
+                for i in range(len(self.req_vec)):
+                    self.req_vec.next = 1 << i
+                    yield delay(10)
+                    assert self.gnt_idx == expected_idx(i), "gnt_idx: expected {}, detected {}".format(expected_idx(i), self.gnt_idx)
+                # Each job has its own working directory
+                open("job.txt", "w").close()
+                assert os.listdir(".") == ["job.txt"]
+                raise StopSimulation
+            return _inst
+
+        return sim.SimJob(arbiter_priority,
+                          dict(req_vec=self.req_vec, gnt_vec=self.gnt_vec, gnt_idx=self.gnt_idx, gnt_vld=self.gnt_vld),
+                          stim,
+                          name=name)
+
+    def testPassFail(self):
+        ''' RUNNER: Passed and failed jobs '''
+        jobs = [self.job(lambda i: i, "pass{}".format(n)) for n in range(4)]
+        jobs.append(self.job(lambda i: 0, "fail"))
+
+        results = sim.run_jobs(jobs, processes=2, shared_files=())
+
+        self.assertEqual([r.name for r in results], ["pass0", "pass1", "pass2", "pass3", "fail"])
+        for r in results[:-1]:
+            assert r.passed, r.error
+            assert r.error is None
+            assert r.workdir is None
+            assert r.elapsed >= 0
+        r = results[-1]
+        assert not r.passed
+        assert "AssertionError" in r.error
+        assert os.path.isdir(r.workdir)
+        shutil.rmtree(os.path.dirname(r.workdir))
+
+    def testSetupFail(self):
+        ''' RUNNER: A job whose scratch directory cannot be set up fails, the other jobs run '''
+        cwd = os.getcwd()
+        jobs = [self.job(lambda i: i, "no/such/dir"), self.job(lambda i: i, "pass")]
+
+        workdir = tempfile.mkdtemp()
+        try:
+            results = sim.run_jobs(jobs, processes=1, workdir=workdir, shared_files=())
+        finally:
+            shutil.rmtree(workdir)
+
+        self.assertEqual(os.getcwd(), cwd)
+        r = results[0]
+        assert not r.passed
+        assert "OSError" in r.error, r.error
+        assert r.workdir is None
+        assert results[1].passed, results[1].error
+
+    def testTuples(self):
+        ''' RUNNER: Jobs as (func, kwargs, stimulus) tuples '''
+        j = self.job(lambda i: i, None)
+        results = sim.run_jobs([(j.func, j.kwargs, j.stimulus)], processes=1, shared_files=())
+        self.assertEqual(len(results), 1)
+        assert results[0].passed, results[0].error
+        self.assertEqual(results[0].name, "arbiter_priority")
+        self.assertEqual(results[0].simulator, "myhdl")
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()